@@ -0,0 +1,227 @@
+"""End to end benchmarks of the client against a local stand-in Gerrit.
+
+The stand-in (``tests/fake_gerrit.py``) runs in its own process so that its work
+is neither timed nor traced. It serves ``ChangeInfo`` shaped like
+``benchmarks/payloads.py``, file lists, diffs, patches and a large binary file,
+after an optional latency.
+
+Every scenario reports its best time over ``--rounds`` runs and the peak memory
+allocated by the client during one more run. ``--json`` saves the numbers with
+the commit they were measured on, and ``--compare`` prints the change against
+numbers saved before, e.g. on the parent commit.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_client
+    python -m benchmarks.bench_client --latency 0.005 --json after.json --compare before.json
+
+``--transport httpx`` or ``--transport http2`` runs the scenarios with another
+transport, compare them with the numbers of the default one. The stand-in
+speaks HTTP/2 to the http2 transport, ``bench_transport`` compares the
+transports on a fan-out.
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import subprocess
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from pGerrit.client import GerritClient
+from pGerrit.transport import TRANSPORTS
+from benchmarks import payloads
+
+class BenchGerrit(object):
+    """Options of the stand-in Gerrit of the benchmarks."""
+
+    def __init__(self, changes=500, revisions=3, files=10, file_size=16 * 1024 * 1024, latency=0.0, http2=False):
+        self.changes = changes
+        self.revisions = revisions
+        self.files = files
+        self.file_size = file_size
+        self.latency = latency
+        self.http2 = http2
+
+    def build(self):
+        from tests.fake_gerrit import FakeGerrit
+
+        options = self
+
+        class Gerrit(FakeGerrit):
+            def change_info(self, number):
+                # the routing fields of the stand-in on top of a realistic payload
+                info = payloads.change_info(number, options.revisions, options.files)
+                small = super().change_info(number)
+                for key in ("id", "project", "status", "updated", "topic", "current_revision", "_number"):
+                    info[key] = small[key]
+                return info
+
+            def file_names(self):
+                return super().file_names() + ["big/blob.bin"]
+
+            def file_content(self, number, revision, name):
+                if name == "big/blob.bin":
+                    return blob
+                return super().file_content(number, revision, name)
+
+        blob = bytes(range(256)) * (options.file_size // 256)
+        return Gerrit(changes=self.changes, files=self.files, latency=self.latency, http2=self.http2)
+
+def _serve(options, conn):
+    with options.build() as gerrit:
+        conn.send(gerrit.url)
+        # serve until the benchmarks close the pipe
+        try:
+            conn.recv()
+        except EOFError:
+            pass
+
+def client(url, options, **kwargs):
+    kwargs.setdefault("verify", False)
+    return GerritClient(url, transport=options.transport, **kwargs)
+
+# --- scenarios ------------------------------------------------------------
+# A scenario returns the function to time, everything it needs is set up first.
+
+def query(model):
+    def scenario(url, options):
+        c = client(url, options, cache=False, response_model=model)
+        return lambda: c.change.query(q="", n=options.changes)
+    return scenario
+
+def fanout(url, options):
+    # details of many changes fetched by a pool of threads, without cache
+    c = client(url, options, cache=False, pool_maxsize=options.threads)
+    numbers = range(min(options.fanout, options.changes))
+    def run():
+        with ThreadPoolExecutor(options.threads) as executor:
+            return list(executor.map(lambda n: c.change(n).detail(), numbers))
+    return run
+
+def children(url, options):
+    # changes, revisions and files objects, no request is sent
+    c = client(url, options)
+    def run():
+        return [c.change(n % options.changes).revision("current").file("src/file_%d.txt" % (n % 8))
+                for n in range(10000)]
+    return run
+
+def cached(expire):
+    def scenario(url, options):
+        # expire=0 revalidates every entry with its ETag, otherwise entries are fresh
+        c = client(url, options, cache_expire=expire)
+        numbers = range(min(options.fanout, options.changes))
+        for n in numbers:
+            c.change(n).detail()
+        return lambda: [c.change(n).detail() for n in numbers]
+    return scenario
+
+class _Sink(object):
+    def write(self, chunk):
+        pass
+
+def download(stream):
+    def scenario(url, options):
+        file = client(url, options, cache=False).change(1).current_revision().file("big/blob.bin")
+        if stream:
+            return lambda: file.download(stream=True).save(_Sink())
+        return lambda: len(file.download().content)
+    return scenario
+
+def diff(url, options):
+    file = client(url, options, cache=False).change(1).current_revision().file("src/file_0.txt")
+    return lambda: [file.diff() for _ in range(50)]
+
+SCENARIOS = {
+    "query-namespace": query("namespace"),
+    "query-model": query("model"),
+    "query-dict": query("dict"),
+    "detail-fanout": fanout,
+    "children": children,
+    "cache-hit": cached(3600),
+    "cache-revalidate": cached(0),
+    "diff": diff,
+    "download-stream": download(True),
+    "download-buffered": download(False),
+}
+
+# --- runner ---------------------------------------------------------------
+
+def measure(run, rounds):
+    best = None
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_client", description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help="scenarios to run, all by default: %s" % ", ".join(SCENARIOS))
+    parser.add_argument("--changes", type=int, default=500, help="number of changes of the host")
+    parser.add_argument("--fanout", type=int, default=200, help="number of changes fetched one by one")
+    parser.add_argument("--threads", type=int, default=16, help="threads of the fan-out")
+    parser.add_argument("--file-size", type=int, default=16, help="size in MB of the downloaded file")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the host waits before answering")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="requests", help="how the client sends its requests")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--json", metavar="PATH", help="save the results to this file")
+    parser.add_argument("--compare", metavar="PATH", help="compare with results saved before")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error("unknown scenarios: %s" % ", ".join(sorted(unknown)))
+
+    warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+    options = BenchGerrit(changes=args.changes, file_size=args.file_size * 1024 * 1024, latency=args.latency,
+                          http2=args.transport == "http2")
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(options, child), daemon=True)
+    server.start()
+    url = parent.recv()
+
+    before = {}
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)["scenarios"]
+
+    results = {}
+    print("%-18s %12s %12s %10s" % ("scenario", "time (s)", "peak (MB)", "vs before"))
+    try:
+        for name in args.scenarios or SCENARIOS:
+            seconds, peak = measure(SCENARIOS[name](url, args), args.rounds)
+            results[name] = {"seconds": seconds, "peak_bytes": peak}
+            delta = ""
+            if name in before:
+                delta = "%+.1f%%" % (100.0 * (seconds - before[name]["seconds"]) / before[name]["seconds"])
+            print("%-18s %12.4f %12.1f %10s" % (name, seconds, peak / 1e6, delta))
+    finally:
+        parent.send("stop")
+        server.join(10)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"commit": commit(), "python": platform.python_version(), "options": vars(args),
+                       "scenarios": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
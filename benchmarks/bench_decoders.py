@@ -0,0 +1,45 @@
+"""Decode time of the JSON decoders on a large query and a large diff.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_decoders
+"""
+import time
+
+from pGerrit.restAPIwrapper import GerritRest
+from pGerrit.decoders import XSSI_PREFIX, strip_xssi, get_decoder
+from pGerrit.models import ChangeInfo
+from benchmarks.payloads import query_body, diff_body
+
+def best_of(func, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    payloads = {"query": query_body(), "diff": diff_body()}
+
+    print("%-8s %-18s %12s" % ("payload", "prefix stripping", "time (ms)"))
+    for name, body in payloads.items():
+        print("%-8s %-18s %12.3f" % (name, "bytes.replace", 1000 * best_of(lambda: body.replace(XSSI_PREFIX, b""))))
+        print("%-8s %-18s %12.3f" % (name, "memoryview slice", 1000 * best_of(lambda: strip_xssi(body))))
+
+    print()
+    print("%-8s %-8s %-10s %12s" % ("payload", "decoder", "model", "time (ms)"))
+    for name, body in payloads.items():
+        for decoder_name in ("json", "orjson", "msgspec", "auto"):
+            try:
+                decoder = get_decoder(decoder_name)
+            except ImportError:
+                print("%-8s %-8s %-10s %12s" % (name, decoder_name, "-", "not installed"))
+                continue
+            for response_model in ("namespace", "model", "dict"):
+                elapsed = best_of(lambda: GerritRest.decode(strip_xssi(body), response_model, ChangeInfo, decoder))
+                print("%-8s %-8s %-10s %12.3f" % (name, decoder_name, response_model, 1000 * elapsed))
+
+if __name__ == "__main__":
+    main()
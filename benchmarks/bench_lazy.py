@@ -0,0 +1,63 @@
+"""Scan and filter a large query result, eagerly and with lazy or projected decoding.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_lazy
+"""
+import gc
+import time
+import tracemalloc
+
+import pGerrit.lazy
+from pGerrit.restAPIwrapper import GerritRest
+from pGerrit.decoders import strip_xssi, get_decoder
+from pGerrit.models import ChangeInfo
+from benchmarks.payloads import query_body
+
+def scan(result):
+    # the common workflow: only look at a few fields of every change
+    return [c for c in result if c.status == "NEW" and c._number % 10 == 0]
+
+def measure(func, rounds=3):
+    best = None
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        scan(func())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    scan(result)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, current
+
+def main():
+    body = query_body()
+    decoder = get_decoder("auto")
+    cases = {
+        "eager": lambda: GerritRest.decode(strip_xssi(body), "namespace", ChangeInfo, decoder),
+        "fields": lambda: GerritRest.decode_partial(strip_xssi(body), "namespace", ChangeInfo, decoder,
+                                                    fields=("_number", "status", "updated")),
+        "lazy": lambda: GerritRest.decode_partial(strip_xssi(body), "namespace", ChangeInfo, decoder, lazy=True),
+        "lazy+fields": lambda: GerritRest.decode_partial(strip_xssi(body), "namespace", ChangeInfo, decoder, lazy=True,
+                                                         fields=("_number", "status", "updated")),
+    }
+
+    print("query payload: %.1f MB" % (len(body) / 1e6))
+    print("%-12s %-10s %12s %12s" % ("mode", "splitter", "time (s)", "memory (MB)"))
+    installed = pGerrit.lazy.msgspec
+    for splitter in ("msgspec", "regex"):
+        if splitter == "msgspec" and installed is None:
+            continue
+        pGerrit.lazy.msgspec = installed if splitter == "msgspec" else None
+        for name, func in cases.items():
+            elapsed, memory = measure(func)
+            print("%-12s %-10s %12.3f %12.1f" % (name, splitter, elapsed, memory / 1e6))
+    pGerrit.lazy.msgspec = installed
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Decode time and memory of the response models.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_models
+"""
+import gc
+import time
+import tracemalloc
+
+from pGerrit.restAPIwrapper import GerritRest
+from pGerrit.decoders import strip_xssi
+from pGerrit.models import ChangeInfo
+from benchmarks.payloads import query_body
+
+def measure(body, response_model, rounds=5):
+    best = None
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        GerritRest.decode(strip_xssi(body), response_model, ChangeInfo)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    result = GerritRest.decode(strip_xssi(body), response_model, ChangeInfo)
+    # touch a field of every change, like a scan and filter loop would
+    for change in result:
+        change["status"] if isinstance(change, dict) else change.status
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, current
+
+def main():
+    body = query_body()
+    print("query payload: %.1f MB" % (len(body) / 1e6))
+    print("%-10s %12s %12s" % ("model", "decode (s)", "memory (MB)"))
+    for response_model in ("namespace", "model", "dict"):
+        elapsed, memory = measure(body, response_model)
+        print("%-10s %12.3f %12.1f" % (response_model, elapsed, memory / 1e6))
+
+if __name__ == "__main__":
+    main()
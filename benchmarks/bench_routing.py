@@ -0,0 +1,36 @@
+"""Cost of building an endpoint url, with the precompiled routes and with the
+former url_wrapper which looked the class up with eval() on every call.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_routing
+"""
+import timeit
+
+from pGerrit.client import GerritClient
+from pGerrit.utils import urljoin, urlformat
+
+def legacy_url(func, self, end=None):
+    from pGerrit.change import GerritChange, GerritChangeRevision, GerritChangeRevisionFile, GerritChangeEdit, GerritChangeReviewer
+    from pGerrit.project import GerritProject
+    name = end if end != None else func.__name__
+    cls_d = eval(func.__qualname__.split(".")[-2])
+    args = []
+    for arg_name in cls_d._args:
+        args.append(getattr(self, arg_name))
+    return urljoin(self.host, urlformat(cls_d._endpoint, *args), name)
+
+def main(number=100000):
+    client = GerritClient("https://gerrit.example.com/", cache=False)
+    revision_file = client.change("project~master~I0123456789abcdef").revision("current").file("src/main.py")
+    build_url = type(revision_file).content.__wrapped__
+    original = build_url.__wrapped__
+
+    assert build_url(revision_file) == legacy_url(original, revision_file)
+    legacy = timeit.timeit(lambda: legacy_url(original, revision_file), number=number)
+    compiled = timeit.timeit(lambda: build_url(revision_file), number=number)
+    print("%-10s %10.2f us/call" % ("eval", 1e6 * legacy / number))
+    print("%-10s %10.2f us/call" % ("compiled", 1e6 * compiled / number))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Concurrent fan-out of API calls with every transport of the client.
+
+Sends ``--calls`` change detail requests from ``--threads`` threads, without
+cache, with the ``requests`` transport (HTTP/1.1, a connection per request in
+flight), the ``httpx`` transport over HTTP/1.1 and the ``http2`` transport,
+which multiplexes every request over one connection when the host speaks
+HTTP/2. It reports the time, the calls per second, the latency quantiles of the
+calls and the HTTP versions used.
+
+By default it runs against the local stand-in Gerrit, which speaks HTTP/2 to the
+clients asking for it when ``h2`` is installed. Point ``--url`` to a Gerrit
+behind an HTTP/2 proxy to measure a real host, the changes ``0`` to
+``--changes`` are then expected to exist (or pass ``--numbers``)::
+
+    python -m benchmarks.bench_transport
+    python -m benchmarks.bench_transport --url https://review.example.com --numbers 1000-1200 --auth user:token
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.auth import HTTPBasicAuth
+
+from pGerrit.client import GerritClient
+from pGerrit.transport import TRANSPORTS
+from benchmarks.bench_client import BenchGerrit, _serve
+
+def run(url, transport, numbers, options):
+    auth = HTTPBasicAuth(*options.auth.split(":", 1)) if options.auth else None
+    client = GerritClient(url, auth=auth, verify=not options.insecure, cache=False, coalesce=False, metrics=True,
+                          transport=transport, pool_maxsize=options.threads)
+    # connections are opened by a first round, not timed
+    with ThreadPoolExecutor(options.threads) as executor:
+        list(executor.map(lambda n: client.change(n).detail(), numbers[:options.threads]))
+    client.metrics.reset()
+    versions = getattr(client.session, "http_versions", None)
+    if versions is not None:
+        versions.clear()
+
+    calls = [numbers[i % len(numbers)] for i in range(options.calls)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(options.threads) as executor:
+        list(executor.map(lambda n: client.change(n).detail(), calls))
+    seconds = time.perf_counter() - start
+
+    latency = client.metrics.endpoints["/a/changes/{}/detail"].latency
+    client.session.close()
+    return seconds, latency, ", ".join(sorted(versions)) if versions is not None else "HTTP/1.1"
+
+def numbers_of(value, changes):
+    if not value:
+        return list(range(changes))
+    first, _, last = value.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_transport", description=__doc__.splitlines()[0])
+    parser.add_argument("transports", nargs="*", metavar="transport", help="transports to run, all by default: %s" % ", ".join(TRANSPORTS))
+    parser.add_argument("--url", help="Gerrit to query, the local stand-in by default")
+    parser.add_argument("--auth", metavar="USER:PASSWORD", help="HTTP credentials of the Gerrit")
+    parser.add_argument("--insecure", action="store_true", help="do not verify the certificate of the Gerrit")
+    parser.add_argument("--changes", type=int, default=200, help="number of changes of the stand-in")
+    parser.add_argument("--numbers", metavar="FIRST-LAST", help="changes to fetch, 0 to --changes by default")
+    parser.add_argument("--calls", type=int, default=2000, help="number of calls")
+    parser.add_argument("--threads", type=int, default=32, help="calls in flight at the same time")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the stand-in waits before answering")
+    args = parser.parse_args(argv)
+    unknown = set(args.transports) - set(TRANSPORTS)
+    if unknown:
+        parser.error("unknown transports: %s" % ", ".join(sorted(unknown)))
+
+    warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+    server = parent = None
+    url = args.url
+    if url is None:
+        args.insecure = True
+        # the stand-in speaks HTTP/2 to the http2 transport when it can
+        options = BenchGerrit(changes=args.changes, latency=args.latency, http2=importlib.util.find_spec("h2") is not None)
+        parent, child = multiprocessing.Pipe()
+        server = multiprocessing.Process(target=_serve, args=(options, child), daemon=True)
+        server.start()
+        url = parent.recv()
+
+    numbers = numbers_of(args.numbers, args.changes)
+    print("%-10s %10s %10s %10s %10s  %s" % ("transport", "time (s)", "calls/s", "p50 ms", "p95 ms", "protocol"))
+    try:
+        for transport in args.transports or TRANSPORTS:
+            try:
+                seconds, latency, versions = run(url, transport, numbers, args)
+            except ImportError as e:
+                print("%-10s %s" % (transport, e))
+                continue
+            print("%-10s %10.3f %10.0f %10.1f %10.1f  %s" % (transport, seconds, args.calls / seconds,
+                                                             latency.quantile(0.5) * 1e3, latency.quantile(0.95) * 1e3, versions))
+    finally:
+        if server is not None:
+            parent.send("stop")
+            server.join(10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Synthetic Gerrit payloads shaped like real responses, used by the benchmarks.
+import json
+
+XSSI_PREFIX = b")]}'\n"
+
+def account(i):
+    return {"_account_id": 1000000 + i, "name": "User %d" % i, "email": "user%d@example.com" % i, "username": "user%d" % i}
+
+def file_info(i):
+    return {"status": "M", "lines_inserted": i % 50, "lines_deleted": i % 7, "size_delta": 10 * i, "size": 1000 + i}
+
+def revision_info(change, ps, files=10):
+    return {
+        "kind": "REWORK",
+        "_number": ps,
+        "created": "2024-01-01 00:00:00.000000000",
+        "uploader": account(change % 100),
+        "ref": "refs/changes/%02d/%d/%d" % (change % 100, change, ps),
+        "fetch": {"http": {"url": "https://gerrit.example.com/project", "ref": "refs/changes/%02d/%d/%d" % (change % 100, change, ps)}},
+        "files": {"src/module_%d/file_%d.py" % (change % 20, f): file_info(f) for f in range(files)},
+    }
+
+def change_info(i, revisions=3, files=10):
+    return {
+        "id": "project~master~I%040x" % i,
+        "project": "project/%d" % (i % 20),
+        "branch": "master",
+        "topic": "topic-%d" % (i % 50),
+        "change_id": "I%040x" % i,
+        "subject": "Change number %d doing something useful" % i,
+        "status": "NEW",
+        "created": "2024-01-01 00:00:00.000000000",
+        "updated": "2024-01-02 00:00:00.000000000",
+        "insertions": 10,
+        "deletions": 2,
+        "_number": i,
+        "owner": account(i % 100),
+        "labels": {
+            "Code-Review": {"all": [dict(account(r), value=1) for r in range(3)], "values": {"-2": "No", "-1": "Meh", " 0": "None", "+1": "Ok", "+2": "Yes"}},
+            "Verified": {"approved": account(1), "all": [dict(account(1), value=1)]},
+        },
+        "reviewers": {"REVIEWER": [account(r) for r in range(3)], "CC": [account(7)]},
+        "current_revision": "%040x" % (i * revisions),
+        "revisions": {"%040x" % (i * revisions + r): revision_info(i, r + 1, files) for r in range(revisions)},
+    }
+
+def query_body(count=2000, revisions=3, files=10):
+    """Body of a change query with ALL_REVISIONS, ALL_FILES and DETAILED_LABELS."""
+    changes = [change_info(i, revisions, files) for i in range(count)]
+    changes[-1]["_more_changes"] = True
+    return XSSI_PREFIX + json.dumps(changes).encode()
+
+def diff_body(lines=20000):
+    """Body of a large file diff."""
+    content = [{"ab": ["unchanged line %d of the file" % n for n in range(lines // 2)]},
+               {"a": ["removed line %d" % n for n in range(lines // 4)], "b": ["added line %d" % n for n in range(lines // 4)]}]
+    return XSSI_PREFIX + json.dumps({"meta_a": {"name": "a.txt", "content_type": "text/plain", "lines": lines},
+                                     "meta_b": {"name": "a.txt", "content_type": "text/plain", "lines": lines},
+                                     "change_type": "MODIFIED", "content": content}).encode()
@@ -13,9 +13,9 @@ class GerritAccess(GerritClient):
     """
     _endpoint = "/a/access/{}"
 
-    def __init__(self, host, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
         """See class docstring."""
-        super().__init__(host, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+        super().__init__(host, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
 
     @classmethod
     @GerritRest.get()
@@ -0,0 +1,167 @@
+import asyncio
+import functools
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from pGerrit.client import GerritClient
+from pGerrit.queryDescriptor import QueryDescriptor
+from pGerrit.stream import Download
+
+# returned by next() on the worker threads once an iterator is exhausted
+_DONE = object()
+
+class AsyncGerritClient(object):
+    """
+    An asyncio flavour of :class:`pGerrit.client.GerritClient`.
+
+    It exposes exactly the same endpoints as the synchronous client, every REST call
+    simply becomes awaitable. Calls are run on a thread pool over the shared connection
+    pool of the underlying client, and at most ``max_concurrency`` of them are in flight
+    for the host at the same time.
+
+    Calls returning an iterator, like ``iter_query``, resolve to an async iterator, and
+    ``stream=True`` downloads to an async download: every page or chunk is fetched on the
+    thread pool, the event loop never waits for the network.
+
+    :param str host: The full URL to the server, including the `https://` prefix.
+    :param int max_concurrency: (optional) Maximum number of concurrent requests to the host. Defaults to 32.
+    :param kwargs: (optional) Any other argument accepted by :class:`pGerrit.client.GerritClient`.
+
+    :return: An instance of AsyncGerritClient.
+    :rtype: pGerrit.aio.AsyncGerritClient
+
+    Usage::
+
+        async with AsyncGerritClient("https://xxxx.gerrit.com/", auth=auth) as client:
+            change = client.change(12345)
+            detail, files = await asyncio.gather(
+                change.detail(),
+                change.revision("current").files(),
+            )
+            async for info in await client.change.iter_query(q="status:open"):
+                print(info._number)
+            await (await change.revision("current").patch(stream=True)).save("change.patch")
+    """
+
+    def __init__(self, host, max_concurrency=32, **kwargs):
+        """See class docstring."""
+        kwargs.setdefault("pool_maxsize", max_concurrency)
+        self.client = GerritClient(host, **kwargs)
+        self.max_concurrency = max_concurrency
+        # the workers bound the calls in flight, whatever the event loop awaiting them
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="pGerrit")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shuts down the worker threads. Pending calls are completed first."""
+        self._executor.shutdown(wait=True)
+
+    @property
+    def change(self):
+        """Awaitable counterpart of :attr:`pGerrit.client.GerritClient.change`.
+
+        Usage::
+
+            changes = await client.change.query(q="status:open")
+            detail = await client.change(12345).detail()
+        """
+        return _AsyncProxy(self.client.change, self)
+
+    @property
+    def access(self):
+        """Awaitable counterpart of :attr:`pGerrit.client.GerritClient.access`."""
+        return _AsyncProxy(self.client.access, self)
+
+    @property
+    def project(self):
+        """Awaitable counterpart of :attr:`pGerrit.client.GerritClient.project`."""
+        return _AsyncProxy(self.client.project, self)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        return self._wrap(result)
+
+    def _wrap(self, obj):
+        if isinstance(obj, (GerritClient, QueryDescriptor)):
+            return _AsyncProxy(obj, self)
+        if isinstance(obj, Download):
+            return _AsyncDownload(obj, self)
+        if isinstance(obj, Iterator):
+            return _AsyncIterator(obj, self)
+        return obj
+
+
+class _AsyncIterator(object):
+    """Wraps a synchronous iterator, every step runs on the thread pool of the client."""
+
+    def __init__(self, iterator, owner):
+        self._iterator = iterator
+        self._owner = owner
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_running_loop()
+        item = await loop.run_in_executor(self._owner._executor, next, self._iterator, _DONE)
+        if item is _DONE:
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self):
+        close = getattr(self._iterator, "close", None)
+        if close is not None:
+            await asyncio.get_running_loop().run_in_executor(self._owner._executor, close)
+
+
+class _AsyncDownload(object):
+    """Wraps a :class:`pGerrit.stream.Download`, the body is read on the thread pool of the client."""
+
+    def __init__(self, download, owner):
+        self.download = download
+        self._owner = owner
+
+    def __aiter__(self):
+        return self.iter_chunks()
+
+    def iter_chunks(self, offset=0):
+        return _AsyncIterator(self.download.iter_chunks(offset), self._owner)
+
+    async def save(self, dest, resume=False):
+        return await self._owner._run(self.download.save, dest, resume)
+
+    async def read(self):
+        return await self._owner._run(self.download.read)
+
+
+class _AsyncProxy(object):
+    """Wraps a synchronous client object, turning its REST calls into coroutines."""
+
+    # Methods which only build another object locally, they never hit the network
+    _navigation = ("revision", "current_revision", "file", "reviewer")
+
+    def __init__(self, target, owner):
+        self._target = target
+        self._owner = owner
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if isinstance(attr, (GerritClient, QueryDescriptor)):
+            return _AsyncProxy(attr, self._owner)
+        if not callable(attr):
+            return attr
+        if name in self._navigation:
+            return lambda *args, **kwargs: self._owner._wrap(attr(*args, **kwargs))
+        return functools.partial(self._owner._run, attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._owner._wrap(self._target(*args, **kwargs))
+
+    def __repr__(self):
+        return "<async %r>" % (self._target,)
@@ -0,0 +1,237 @@
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+# Expiration which never expires
+NEVER_EXPIRE = -1
+
+# Data of a revision addressed by its commit SHA-1 can't change
+DEFAULT_URLS_EXPIRE_AFTER = {
+    r"/revisions/[0-9a-f]{40}/(commit|patch|files)(/|$)": NEVER_EXPIRE,
+}
+
+class CacheEntry(object):
+    """A cached response body, with the ETag Gerrit returned for it."""
+    __slots__ = ("body", "etag", "expires")
+
+    def __init__(self, body, etag, expires):
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+    def fresh(self):
+        return self.expires == NEVER_EXPIRE or self.expires > time.time()
+
+class ResponseCache(object):
+    """
+    A size bounded LRU cache of GET responses.
+
+    Once an entry expires it is not dropped: the next request for it is sent with
+    ``If-None-Match`` and a ``304 Not Modified`` from Gerrit makes it fresh again
+    without downloading the body.
+
+    :param int max_size: (optional) Maximum total size of the cached bodies in bytes. Defaults to 64 MB.
+    :param int expire_after: (optional) Number of seconds a response is served without asking Gerrit. Defaults to 3.
+    :param dict urls_expire_after: (optional) Expiration per url, as a dict of regular expressions to
+                                   seconds. ``NEVER_EXPIRE`` keeps the response forever. The first matching
+                                   expression wins, ``DEFAULT_URLS_EXPIRE_AFTER`` applies after them.
+    :param str path: (optional) Path of a SQLite file keeping the cache across runs.
+
+    Usage::
+
+        cache = ResponseCache(expire_after=60, urls_expire_after={r"/detail": 5}, path="gerrit-cache.sqlite")
+        client = GerritClient("https://xxxx.gerrit.com/", cache=cache)
+    """
+
+    def __init__(self, max_size=64 * 1024 * 1024, expire_after=3, urls_expire_after=None, path=None):
+        """See class docstring."""
+        self.max_size = max_size
+        self.expire_after = expire_after
+        patterns = dict(urls_expire_after or {})
+        for pattern, expire in DEFAULT_URLS_EXPIRE_AFTER.items():
+            patterns.setdefault(pattern, expire)
+        self.urls_expire_after = [(re.compile(pattern), expire) for pattern, expire in patterns.items()]
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._db = None
+        if path:
+            # one connection used under the lock of the cache, the timeout and WAL journal let
+            # other processes share the file instead of failing with "database is locked"
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body BLOB, etag TEXT, expires REAL, size INTEGER, accessed REAL)")
+
+    @staticmethod
+    def key(url, params=None):
+        """Returns the cache key of a request."""
+        if not params:
+            return url
+        return url + "?" + urlencode(sorted(params.items()), doseq=True)
+
+    def expiration(self, key):
+        """Returns the timestamp until which a response stored now for ``key`` is fresh."""
+        expire = self.expire_after
+        for pattern, value in self.urls_expire_after:
+            if pattern.search(key):
+                expire = value
+                break
+        return NEVER_EXPIRE if expire == NEVER_EXPIRE else time.time() + expire
+
+    def get(self, key):
+        """Returns the entry of ``key``, fresh or not, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT body, etag, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = CacheEntry(bytes(row[0]), row[1], row[2])
+                    self._insert(key, entry)
+
+            if entry is not None and entry.fresh():
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def set(self, key, body, etag=None):
+        """Stores a response body."""
+        entry = CacheEntry(body, etag, self.expiration(key))
+        with self._lock:
+            self._insert(key, entry)
+            self._persist(key, entry)
+        return entry
+
+    def refresh(self, key, entry):
+        """Makes an entry fresh again after Gerrit confirmed it did not change."""
+        with self._lock:
+            self.revalidated += 1
+            entry.expires = self.expiration(key)
+            self._persist(key, entry)
+
+    def delete(self, key):
+        """Removes an entry."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry.body)
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def invalidate(self, *prefixes):
+        """Removes every entry whose url starts with one of ``prefixes``."""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefixes)]:
+                self.size -= len(self._entries.pop(key).body)
+            if self._db is not None:
+                for prefix in prefixes:
+                    self._db.execute("DELETE FROM responses WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def _insert(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old.body)
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_size and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+
+    def _persist(self, key, entry):
+        if self._db is None:
+            return
+        self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, entry.body, entry.etag, entry.expires, len(entry.body), time.time()))
+        # same bound on disk, the least recently stored responses go first
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_size:
+            self._db.execute("""DELETE FROM responses WHERE key IN (
+                                    SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS total FROM responses)
+                                    WHERE total > ?)""", (self.max_size,))
+
+
+class RevisionStore(object):
+    """
+    An on-disk store of the data of revisions addressed by their commit SHA-1.
+
+    Commit, patch, file list, content, diff and blame of a given commit never change,
+    so they are kept forever. Entries are files written atomically, which makes the
+    store safe to share between the processes of a machine.
+
+    :param str path: (optional) Directory of the store. Defaults to ``$XDG_CACHE_HOME/pGerrit/revisions``.
+
+    Usage::
+
+        client = GerritClient("https://xxxx.gerrit.com/", revision_store=RevisionStore("/var/cache/gerrit"))
+    """
+
+    # Endpoints of a revision which only depend on its commit
+    endpoints = ("commit", "patch", "files", "content", "diff", "blame")
+
+    _immutable = re.compile(r"/revisions/([0-9a-f]{40})/((?:commit|patch|files)(?:/.*)?)$")
+
+    def __init__(self, path=None):
+        """See class docstring."""
+        if path is None:
+            path = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "pGerrit", "revisions")
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, url, params=None):
+        """Returns the path of the entry of a request, or None if its response may change."""
+        m = self._immutable.search(url)
+        # the reviewed flag of files depends on the user
+        if m is None or (params and "reviewed" in params):
+            return None
+        sha, name = m.groups()
+        name = ResponseCache.key(name, params)
+        return os.path.join(self.path, sha[:2], sha[2:], hashlib.sha1(name.encode()).hexdigest())
+
+    def get(self, key):
+        """Returns the stored body of ``key``, or None."""
+        try:
+            with open(key, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return body
+
+    def set(self, key, body):
+        """Stores a body. Concurrent writers of the same entry write the same content."""
+        directory = os.path.dirname(key)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp, key)
+        except BaseException:
+            os.unlink(tmp)
+            raise
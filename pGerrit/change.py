@@ -1,6 +1,66 @@
 from pGerrit.restAPIwrapper import GerritRest
 from pGerrit.client import GerritClient
-from pGerrit.utils import urljoin, urlformat
+from pGerrit.utils import urljoin, urlformat, paginate, getfield, is_sha1
+from pGerrit.models import ChangeInfo, AccountInfo, FileInfo, CommentInfo, MapOf
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import threading
+
+# revision being resolved by the current thread, its commit() must not resolve it again
+_resolving = threading.local()
+
+class RevisionMetadata(object):
+    """
+    Data of a revision fetched once, on first use, and shared by the revision and the
+    objects of its files: the file list, the commit and the project of the change.
+
+    Helpers such as ``is_binary()`` or ``get_history_log()`` read it, so calling them on
+    every file of a revision costs no request after the first one. Create a new revision
+    object to see a newer patch set.
+
+    You won't need to instantiate this Class directly.
+    Use ``pGerrit.change.GerritChangeRevision.metadata``.
+
+    Usage::
+
+        revision = client.change(12345).current_revision()
+        binaries = [name for name in fields(revision.metadata.files) if revision.file(name).is_binary()]
+    """
+
+    def __init__(self, revision):
+        """See class docstring."""
+        self.revision = revision
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, fetch):
+        with self._lock:
+            if name in self._values:
+                return self._values[name]
+        # threads asking at the same time send a single request, see GerritClient(coalesce=True)
+        value = fetch()
+        with self._lock:
+            return self._values.setdefault(name, value)
+
+    @property
+    def files(self):
+        """The files of the revision, as returned by ``files()``."""
+        return self._get("files", self.revision.files)
+
+    @property
+    def commit(self):
+        """The commit of the revision, as returned by ``commit()``."""
+        return self._get("commit", self.revision.commit)
+
+    @property
+    def project(self):
+        """The name of the project of the change."""
+        return self._get("project", lambda: getfield(self.revision.info(), "project"))
+
+    def clear(self):
+        """Forgets the fetched data, it is fetched again on next use."""
+        with self._lock:
+            self._values.clear()
 
 class GerritChange(GerritClient):
     """Class maps /changes/ endpoint of Gerrit REST API
@@ -14,16 +74,15 @@ class GerritChange(GerritClient):
     _endpoint = "/a/changes/{}"
     _args = ["id"]
 
-    def __init__(self, host, gerritID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, gerritID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
         """See class docstring."""
-        super().__init__(host, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+        super().__init__(host, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
         self.id = gerritID
 
         self.args = [host, gerritID]
-        self.kwargs = {"auth": auth, "verify": verify, "adapter":adapter, "cache":cache, "cache_expire":cache_expire}
 
     @classmethod
-    @GerritRest.get()
+    @GerritRest.get(model=ChangeInfo)
     def query(cls, *args, **kwargs):
         """Performs a GET request to query for changes from the Gerrit API.
 
@@ -48,6 +107,31 @@ class GerritChange(GerritClient):
         """
         return urljoin(cls.host, urlformat(GerritChange._endpoint, ""))
 
+    @classmethod
+    def iter_query(cls, page_size=100, prefetch=True, *args, **kwargs):
+        """Lazily iterates over the changes matching a query, one page at a time.
+
+        Pages are requested with the ``S`` and ``n`` options and the walk stops when the
+        last change of a page has no ``_more_changes`` flag. ``S`` and ``n`` given by the
+        caller skip changes and bound the total number of changes, like they do for ``query``.
+
+        :param int page_size: (optional) Number of changes requested per page. Defaults to 100.
+        :param bool prefetch: (optional) Fetch the next page in the background while the
+                              current one is consumed. Defaults to True.
+
+        **Return type**: Iterator[`ChangeInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#change-info>`__]
+
+        Usage::
+
+            for change in client.change.iter_query(q="status:open", page_size=500):
+                print(change._number)
+        """
+        kwargs.pop("no-limit", None)
+        start, limit = kwargs.pop("S", 0), kwargs.pop("n", None)
+        fetch = lambda start, limit: GerritChange.query.__func__(cls, *args, S=start, n=limit, **kwargs)
+        more = lambda items: getfield(items[-1], "_more_changes", False)
+        return paginate(fetch, page_size, more, prefetch=prefetch, start=start, limit=limit)
+
     @classmethod
     @GerritRest.post
     def create(cls, payload=None, *args, **kwargs):
@@ -71,7 +155,100 @@ class GerritChange(GerritClient):
         """
         return urljoin(cls.host, urlformat(GerritChange._endpoint, ""))
 
-    @GerritRest.get()
+    @classmethod
+    def bulk(cls, ids, fields=("detail", "files", "comments"), workers=8):
+        """Fetches several endpoints of many changes at once on a thread pool.
+
+        Every ``field`` is the name of a GET method of GerritChange (``detail``, ``comments``,
+        ``topic``...), or of the current revision for ``files`` and ``commit``. Identical
+        requests are only sent once and a failing request does not abort the batch: its
+        exception is reported in the ``errors`` dict of the change and the field is None.
+        Any other field raises ValueError before a request is sent.
+
+        :param ids: The change ids to fetch.
+        :param fields: (optional) The endpoints to fetch for every change.
+        :param int workers: (optional) Number of requests in flight at the same time. Defaults to 8.
+                            Keep it below the ``pool_maxsize`` of the client.
+
+        :return: One SimpleNamespace per change id, with one attribute per field plus ``errors``.
+        :rtype: Dict[str, SimpleNamespace]
+
+        Usage::
+
+            results = client.change.bulk([1234, 1235], fields=["detail", "files"], workers=16)
+            for change_id, result in results.items():
+                if result.errors:
+                    print(change_id, result.errors)
+                else:
+                    print(result.detail.subject)
+        """
+        for field in fields:
+            endpoint = getattr(GerritChangeRevision if field in GerritChange._revision_fields else GerritChange, field, None)
+            # class methods like query are endpoints of the change list, not of a change
+            if GerritRest.http_method(endpoint) != "GET" or hasattr(endpoint, "__self__"):
+                raise ValueError("%r is not a GET endpoint of a change, bulk only fetches data" % field)
+
+        results = {}
+        calls = {}
+        for change_id in ids:
+            if change_id in results:
+                continue
+            results[change_id] = SimpleNamespace(errors={}, **{field: None for field in fields})
+            change = GerritChange(*cls.args, change_id, **cls.kwargs)
+            for field in fields:
+                target = change.current_revision() if field in GerritChange._revision_fields else change
+                method = getattr(target, field)
+                calls.setdefault(GerritChange._bulk_key(method), (method, []))[1].append((change_id, field))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(method): targets for method, targets in calls.values()}
+            for future, targets in futures.items():
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                for change_id, field in targets:
+                    setattr(results[change_id], field, result)
+                    if error is not None:
+                        results[change_id].errors[field] = error
+        return results
+
+    @classmethod
+    def graph(cls, seeds, relations=("related", "submitted_together"), workers=8, max_changes=None):
+        """Builds the dependency graph of changes, following their relation chains and the changes
+        submitted together with them from a few seed changes.
+
+        Changes are visited breadth first, the requests of several changes being in flight at
+        the same time, and every change is only visited once.
+
+        :param seeds: Numbers or ids of the changes to start from.
+        :param relations: (optional) The relations to follow, ``"related"`` and/or ``"submitted_together"``.
+        :param int workers: (optional) Number of requests in flight at the same time. Defaults to 8.
+        :param int max_changes: (optional) Stop visiting new changes after this number.
+
+        :return: The changes, their dependencies and the changes submitted together.
+        :rtype: pGerrit.graph.ChangeGraph
+
+        Usage::
+
+            graph = client.change.graph([12345], workers=16)
+            for number in graph.submit_order(12345):
+                print(number, graph.nodes[number]["status"])
+        """
+        from pGerrit.graph import build_graph
+        return build_graph(cls, seeds, relations=relations, workers=workers, max_changes=max_changes)
+
+    _revision_fields = ("files", "commit")
+
+    @staticmethod
+    def _bulk_key(method):
+        # The innermost wrapper of an endpoint only builds its url
+        try:
+            return method.__func__.__wrapped__(method.__self__)
+        except Exception:
+            return (id(method.__self__), method.__name__)
+
+    @GerritRest.get(model=ChangeInfo)
     def info(self, *args, **kwargs):
         """Performs a GET request to retrieve information about a change.
 
@@ -88,7 +265,7 @@ class GerritChange(GerritClient):
         """
         return urljoin(self.host, urlformat(GerritChange._endpoint, self.id))
 
-    @GerritRest.get()
+    @GerritRest.get(model=ChangeInfo)
     @GerritRest.url_wrapper()
     def detail(self, *args, **kwargs):
         """Performs a GET request to retrieve detailed information about a change.
@@ -160,7 +337,7 @@ class GerritChange(GerritClient):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(model=ChangeInfo)
     @GerritRest.url_wrapper()
     def submitted_together(self, *args, **kwargs):
         """Performs a GET request to retrieve the list of changes that would be submitted together with a change.
@@ -196,7 +373,7 @@ class GerritChange(GerritClient):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(model=MapOf(CommentInfo))
     @GerritRest.url_wrapper()
     def comments(self, *args, **kwargs):
         """Performs a GET request to retrieve comments on a change.
@@ -214,7 +391,7 @@ class GerritChange(GerritClient):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(model=MapOf(CommentInfo))
     @GerritRest.url_wrapper()
     def robotcomments(self, *args, **kwargs):
         """Performs a GET request to retrieve robot comments on a change.
@@ -232,7 +409,7 @@ class GerritChange(GerritClient):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(model=MapOf(CommentInfo))
     @GerritRest.url_wrapper()
     def drafts(self, *args, **kwargs):
         """Performs a GET request to retrieve draft comments on a change.
@@ -366,12 +543,18 @@ class GerritChange(GerritClient):
             is_merge_change = change.is_merge()
 
         """
-        revision = self.current_revision()
-        if len(revision.commit().parents) == 2:
+        if len(getfield(self._metadata_revision().metadata.commit, "parents")) == 2:
             return True
         else:
             return False
 
+    def _metadata_revision(self):
+        # the revision read by the helpers of a change, created once so that its metadata is fetched once
+        revision = getattr(self, "_current", None)
+        if revision is None:
+            revision = self._current = self.current_revision()
+        return revision
+
 
     def revision(self, revisionID):
         """Creates a GerritChangeRevision object for a specific revision of the change.
@@ -383,7 +566,7 @@ class GerritChange(GerritClient):
             change_revision = change.revision(revisionID)
 
         """
-        return GerritChangeRevision(self.host, self.id, revisionID, auth=self.session.auth, verify=self.verify, adapter=self.adapter, cache=self.cache, cache_expire=self.cache_expire)
+        return GerritChangeRevision(self.host, self.id, revisionID, **self.kwargs)
 
     def current_revision(self):
         """Creates a GerritChangeRevision object for the current revision of the change.
@@ -393,7 +576,7 @@ class GerritChange(GerritClient):
             current_revision = change.current_revision()
 
         """
-        return GerritChangeRevision(self.host, self.id, "current", auth=self.session.auth, verify=self.verify, adapter=self.adapter, cache=self.cache, cache_expire=self.cache_expire)
+        return GerritChangeRevision(self.host, self.id, "current", **self.kwargs)
 
     @property
     def edit(self):
@@ -442,9 +625,9 @@ class GerritChangeEdit(GerritChange):
     _endpoint = "/a/changes/{}/edit/{}"
     _args = ["id", "fileID"]
 
-    def __init__(self, host, gerritID, fileID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, gerritID, fileID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
         """See class docstring."""
-        super().__init__(host, gerritID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+        super().__init__(host, gerritID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
         self.fileID = fileID
 
     @classmethod
@@ -570,13 +753,13 @@ class GerritChangeReviewer(GerritChange):
     _endpoint = "/a/changes/{}/reviewers/{}"
     _args = ["id", "account_id"]
 
-    def __init__(self, host, gerritID, account_id, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, gerritID, account_id, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
         """See class docstring."""
-        super().__init__(host, gerritID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+        super().__init__(host, gerritID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
         self.account_id = account_id
 
     @classmethod
-    @GerritRest.get()
+    @GerritRest.get(model=AccountInfo)
     def query(self, *args, **kwargs):
         """Performs a GET request to retrieve information about the change edit.
 
@@ -586,6 +769,21 @@ class GerritChangeReviewer(GerritChange):
         """
         return urljoin(self.host, urlformat(GerritChangeReviewer._endpoint, self.id, ""))
 
+    @classmethod
+    def iter_query(self, *args, **kwargs):
+        """Iterates over the reviewers of the change.
+
+        Gerrit does not paginate this listing, the iterator is provided so reviewers
+        can be consumed the same way as ``GerritChange.iter_query``.
+
+        Usage::
+
+            for reviewer in change.reviewer.iter_query():
+                print(reviewer.email)
+        """
+        fetch = lambda start, limit: GerritChangeReviewer.query.__func__(self, *args, **kwargs)
+        return paginate(fetch, None, lambda items: False)
+
     @classmethod
     @GerritRest.get()
     def suggest_reviewers(self, *args, **kwargs):
@@ -635,10 +833,42 @@ class GerritChangeRevision(GerritChange):
     _endpoint = "/a/changes/{}/revisions/{}"
     _args = ["id", "revisionID"]
 
-    def __init__(self, host, gerritID, revisionID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, gerritID, revisionID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
         """See class docstring."""
-        super().__init__(host, gerritID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+        super().__init__(host, gerritID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
         self.revisionID = revisionID
+        self.metadata = RevisionMetadata(self)
+
+    def _metadata_revision(self):
+        return self
+
+    def resolve(self):
+        """Resolves the revision id (``"current"``, a patch set number...) to the commit SHA-1 of the revision.
+
+        It is done once, the object keeps addressing the same commit afterwards even if
+        a new patch set is uploaded. With a revision store it happens automatically
+        before reading data which only depends on the commit.
+
+        :return: The commit SHA-1 of the revision.
+        :rtype: str
+
+        Usage::
+
+            sha = change.current_revision().resolve()
+        """
+        owner = self.metadata.revision
+        if owner is not self and not is_sha1(self.revisionID):
+            # the files of a revision share its resolution
+            self.revisionID = owner.resolve()
+            return self.revisionID
+        if not is_sha1(self.revisionID) and getattr(_resolving, "revision", None) is not self:
+            # threads resolving the same revision at once send a single request and set the same SHA-1
+            _resolving.revision = self
+            try:
+                self.revisionID = getfield(self.commit(), "commit")
+            finally:
+                _resolving.revision = None
+        return self.revisionID
 
     @GerritRest.get()
     @GerritRest.url_wrapper()
@@ -730,7 +960,7 @@ class GerritChangeRevision(GerritChange):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(base64=True)
     @GerritRest.url_wrapper()
     def patch(self, *args, **kwargs):
         """Performs a GET request to retrieve the patch for the change revision.
@@ -739,11 +969,31 @@ class GerritChangeRevision(GerritChange):
 
         **Input type**: None
 
-        **Return type**: str (Base64-encoded patch text)
+        **Return type**: str (Base64-encoded patch text), or a :class:`pGerrit.stream.Download`
+        of the decoded patch with ``stream=True``
 
         Usage::
 
             patch_text = revision.patch()
+            revision.patch(stream=True).save("change.patch")
+
+        """
+        pass
+
+    @GerritRest.get(raw=True)
+    @GerritRest.url_wrapper()
+    def archive(self, *args, **kwargs):
+        """Performs a GET request to download the revision as an archive.
+
+        **API URL**: `/a/changes/{change_id}/revisions/{revision_id}/archive <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#get-archive>`__
+
+        **Input type**: ``format`` (``tar``, ``tgz``, ``tbz2`` or ``txz``)
+
+        **Return type**: requests.Response, or a :class:`pGerrit.stream.Download` with ``stream=True``
+
+        Usage::
+
+            revision.archive(format="tgz", stream=True).save("change.tgz")
 
         """
         pass
@@ -784,7 +1034,7 @@ class GerritChangeRevision(GerritChange):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(model=MapOf(CommentInfo))
     @GerritRest.url_wrapper()
     def drafts(self, *args, **kwargs):
         """Performs a GET request to retrieve the draft comments on the change revision.
@@ -802,7 +1052,7 @@ class GerritChangeRevision(GerritChange):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(model=MapOf(CommentInfo))
     @GerritRest.url_wrapper()
     def comments(self, *args, **kwargs):
         """Performs a GET request to retrieve the published comments on the change revision.
@@ -820,7 +1070,7 @@ class GerritChangeRevision(GerritChange):
         """
         pass
 
-    @GerritRest.get()
+    @GerritRest.get(model=MapOf(FileInfo))
     @GerritRest.url_wrapper()
     def files(self, *args, **kwargs):
         """Performs a GET request to retrieve the files of the change revision.
@@ -856,6 +1106,33 @@ class GerritChangeRevision(GerritChange):
         """
         pass
 
+    def materialize(self, dest_dir, workers=8, include_base=False):
+        """Writes the files of the revision to a directory, downloading their contents concurrently.
+
+        Contents are decoded from base64 chunk by chunk straight to disk. A file already
+        in ``dest_dir`` is not downloaded again when its blob SHA-1 is the one Gerrit reports
+        (``FileInfo.new_sha``, Gerrit 3.9+), or when the manifest ``.pgerrit-manifest.json``
+        left by a previous run shows it was written for the same commit and not modified since.
+        Files deleted by the revision are removed if a previous run wrote them.
+        A failing download does not abort the others, it is reported in ``errors``.
+
+        :param str dest_dir: The directory of the files, created if needed.
+        :param int workers: (optional) Number of downloads at the same time. Defaults to 8.
+        :param include_base: (optional) Set to True, or a directory, to also write the files as
+                             they are in the base of the revision, True meaning ``dest_dir + ".base"``.
+
+        :return: A summary with the number of ``files`` downloaded, ``skipped`` and ``deleted``,
+                 the ``bytes`` written, ``seconds``, ``throughput`` in bytes per second and ``errors``.
+        :rtype: types.SimpleNamespace
+
+        Usage::
+
+            result = client.change(12345).current_revision().materialize("/tmp/lint", workers=16)
+            print(result.files, "files,", result.throughput / 1e6, "MB/s")
+        """
+        from pGerrit.materialize import materialize
+        return materialize(self, dest_dir, workers=workers, include_base=include_base)
+
     def file(self, fileID):
         """Get the GerritChangeRevisionFile instance for a specific file in the change revision.
 
@@ -869,7 +1146,10 @@ class GerritChangeRevision(GerritChange):
             file_instance = revision.file(fileID)
 
         """
-        return GerritChangeRevisionFile(self.host, self.id, self.revisionID, fileID, auth=self.session.auth, verify=self.verify, adapter=self.adapter, cache=self.cache, cache_expire=self.cache_expire)
+        file = GerritChangeRevisionFile(self.host, self.id, self.revisionID, fileID, **self.kwargs)
+        # the file list, commit and project of the revision are fetched once for all its files
+        file.metadata = self.metadata
+        return file
 
     def reviewer(self, accountID):
         """Get the GerritChangeRevisionReviewer instance for a specific reviewer of the change revision.
@@ -884,7 +1164,7 @@ class GerritChangeRevision(GerritChange):
             reviewer_instance = revision.reviewer(accountID)
 
         """
-        return GerritChangeRevisionReviewer(self.host, self.id, self.revisionID, accountID, auth=self.session.auth, verify=self.verify, adapter=self.adapter, cache=self.cache, cache_expire=self.cache_expire)
+        return GerritChangeRevisionReviewer(self.host, self.id, self.revisionID, accountID, **self.kwargs)
 
 class GerritChangeRevisionReviewer(GerritChangeRevision):
     """Class maps /a/changes/{change_id}/revisions/{revision_id}/reviewers/{account_id} endpoint of Gerrit REST API
@@ -898,12 +1178,12 @@ class GerritChangeRevisionReviewer(GerritChangeRevision):
     _endpoint = "/a/changes/{}/revisions/{}/reviewers/{}"
     _args = ["id", "accountID", "revisionID", "accountID"]
 
-    def __init__(self, host, gerritID, revisionID, accountID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, gerritID, revisionID, accountID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
         """See class docstring."""
-        super().__init__(host, gerritID, revisionID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+        super().__init__(host, gerritID, revisionID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
         self.accountID = accountID
 
-    @GerritRest.get()
+    @GerritRest.get(model=AccountInfo)
     def list(self, *args, **kwargs):
         """List reviewers of a specific change revision.
 
@@ -949,23 +1229,25 @@ class GerritChangeRevisionFile(GerritChangeRevision):
     _endpoint = "/a/changes/{}/revisions/{}/files/{}"
     _args = ["id", "revisionID", "fileID"]
 
-    def __init__(self, host, gerritID, revisionID, fileID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
-        super().__init__(host, gerritID, revisionID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+    def __init__(self, host, gerritID, revisionID, fileID, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
+        super().__init__(host, gerritID, revisionID, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
         self.fileID = fileID
 
-    @GerritRest.get()
+    @GerritRest.get(base64=True)
     @GerritRest.url_wrapper()
     def content(self, *args, **kwargs):
         """Retrieve the content of a specific file in a change revision.
 
         **API URL**: `/a/changes/{change_id}/revisions/{revision_id}/files/{file_id}/content <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#get-content>`__
 
-        :return: The content of the specified file in the change revision.
+        :return: The Base64-encoded content of the specified file in the change revision,
+                 or a :class:`pGerrit.stream.Download` of the decoded content with ``stream=True``.
         :rtype: str
 
         Usage::
 
             file_content = revision_file.content()
+            data = revision_file.content(stream=True).read()
 
         """
         pass
@@ -994,12 +1276,14 @@ class GerritChangeRevisionFile(GerritChangeRevision):
 
         **API URL**: `/a/changes/{change_id}/revisions/{revision_id}/files/{file_id}/download <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#download-content>`__
 
-        :return: The downloaded content of the specified file in the change revision.
-        :rtype: bytes
+        :return: The downloaded content of the specified file in the change revision,
+                 or a :class:`pGerrit.stream.Download` with ``stream=True``.
+        :rtype: requests.Response
 
         Usage::
 
-            downloaded_content = revision_file.download()
+            downloaded_content = revision_file.download().content
+            revision_file.download(stream=True).save("/tmp/file.bin")
 
         """
         pass
@@ -1032,8 +1316,8 @@ class GerritChangeRevisionFile(GerritChangeRevision):
             is_binary_file = revision_file.is_binary()
 
         """
-        file_info = getattr(self.files(), self.fileID)
-        if hasattr(file_info, "binary") and file_info.binary == True:
+        file_info = getfield(self.metadata.files, self.fileID)
+        if getfield(file_info, "binary") == True:
             return True
         else:
             return False
@@ -1054,6 +1338,6 @@ class GerritChangeRevisionFile(GerritChangeRevision):
             history_log = revision_file.get_history_log(commit='commit_hash')
 
         """
-        project = self.info().project
-        commit = commit or self.commit().commit
+        project = self.metadata.project
+        commit = commit or getfield(self.metadata.commit, "commit")
         return urljoin(self.host, "a/plugins", "gitiles", project, "+log", commit, self.fileID)
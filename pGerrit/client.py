@@ -1,7 +1,11 @@
 import requests
 from requests.packages.urllib3.util import Retry
-from requests.adapters import HTTPAdapter
-import requests_cache
+from pGerrit.ratelimit import ThrottlingAdapter
+from pGerrit.transport import TRANSPORTS, HttpxSession
+from pGerrit.cache import ResponseCache, RevisionStore
+from pGerrit.decoders import get_decoder
+from pGerrit.metrics import Metrics
+from pGerrit.utils import SingleFlight
 
 class GerritClient(object):
     """
@@ -16,51 +20,144 @@ class GerritClient(object):
     :param adapter: (optional) Custom connection adapter. Normally we use it to set `urllib3.util.Rety` object.
                     By default, there is 5 times retry behaviour.
     :type adapter: requests.adapters.BaseAdapter or None
-    :param bool cache: (optional) Set to True to enable cache support. Defaults to True.
+    :param cache: (optional) Set to True to enable cache support, or pass a configured cache. Defaults to True.
+    :type cache: bool or pGerrit.cache.ResponseCache
     :param int cache_expire: (optional) The number of seconds to expire the cache after. Defaults to 3.
+                             Expired responses are revalidated with their ETag instead of being downloaded again.
+    :param int cache_size: (optional) Maximum size in bytes of the cached responses. Defaults to 64 MB.
+    :param str cache_path: (optional) Path of a SQLite file to keep the cache across runs. By default the cache is in memory.
+    :param revision_store: (optional) Set to True, a directory or a :class:`pGerrit.cache.RevisionStore` to keep
+                           commit, patch and file data of revisions on disk forever, keyed by commit SHA-1.
+                           ``"current"`` and patch set numbers are resolved to a SHA-1 once per revision object.
+    :param int pool_connections: (optional) Number of per-host connection pools kept by the default adapter. Defaults to 10.
+    :param int pool_maxsize: (optional) Maximum number of keep-alive connections per pool. Defaults to 10.
+    :param float rate_limit: (optional) Maximum number of requests per second sent to the host. Not limited by default.
+    :param int burst: (optional) Number of requests allowed at once under ``rate_limit``. Defaults to ``rate_limit``.
+    :param adaptive_concurrency: (optional) Set to True to cut the number of requests in flight when the
+                                 latency of the host rises and grow it back when it recovers, up to
+                                 ``pool_maxsize``. An :class:`pGerrit.ratelimit.AdaptiveConcurrency` is accepted too.
+    :param str response_model: (optional) How JSON responses are decoded. ``"namespace"`` (default) returns
+                               ``SimpleNamespace`` objects, ``"model"`` returns the compact read-only models
+                               of :mod:`pGerrit.models` and ``"dict"`` returns plain dicts and lists.
+    :param bool coalesce: (optional) Send identical GET requests made at the same time by several threads only once.
+                          Defaults to True. ``client.single_flight.coalesced`` counts the requests saved.
+    :param json_decoder: (optional) JSON decoder of the responses: ``"auto"`` (default) picks the fastest
+                         installed one, or force one of ``"json"``, ``"orjson"``, ``"msgspec"``.
+                         Any object with a ``loads(body, object_hook=None)`` method is accepted too.
+    :param metrics: (optional) Set to True, or pass a :class:`pGerrit.metrics.Metrics`, to record the count,
+                    latency (network, JSON decoding, objects construction), bytes, cache use and retries
+                    of the calls per endpoint in ``client.metrics``. Disabled by default.
+    :param str transport: (optional) How requests are sent: ``"requests"`` (default) with ``requests`` over
+                          HTTP/1.1, one connection per request in flight, ``"http2"`` with ``httpx`` over
+                          HTTP/2, every request in flight multiplexed over one connection per host, or
+                          ``"httpx"`` with ``httpx`` over HTTP/1.1. See :class:`pGerrit.transport.HttpxSession`.
+    :param session: (optional) An existing session to share. Objects created from a client
+                    (changes, revisions, files...) reuse the session of their parent, so all
+                    of them share one connection pool and one cache.
+    :type session: requests.Session or None
+
+    A client and the objects created from it can be used from many threads at once.
+    The cache and the revision store are locked, and the session is only read after
+    the client is built. Set ``pool_maxsize`` to the number of threads so that every
+    thread keeps its connection alive.
 
     :return: An instance of GerritClient.
     :rtype: pGerrit.GerritClient
     """
 
-    def __init__(self, host, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, auth=None, verify=True, adapter=None, cache=True, cache_expire=3,
+                 cache_size=64 * 1024 * 1024, cache_path=None, revision_store=None, pool_connections=10, pool_maxsize=10,
+                 response_model="namespace", json_decoder="auto", coalesce=True, session=None,
+                 rate_limit=None, burst=None, adaptive_concurrency=False, metrics=None, transport="requests"):
         """See class docstring."""
         self.host = host
-        if cache:
-            self.session = requests_cache.CachedSession(expire_after=cache_expire)
-        else:
-            self.session = requests.session()
-
         if host.startswith('http://'):
             raise RuntimeError("Http protocol is not supported by latest Gerrit anymore. Use Https instead")
-        
+
         self.verify = verify
-        if not adapter:
-            retry = Retry(
-                total=5,
-                read=5,
-                connect=5,
-                backoff_factor=0.3,
-                status_forcelist=(500, 502, 504),
-            )
-            adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-        self.adapter = adapter
-        self.cache = cache
+        if cache is True:
+            cache = ResponseCache(max_size=cache_size, expire_after=cache_expire, path=cache_path)
+        self.cache = cache or None
         self.cache_expire = cache_expire
+        if revision_store is True:
+            revision_store = RevisionStore()
+        elif isinstance(revision_store, str):
+            revision_store = RevisionStore(revision_store)
+        self.revision_store = revision_store
+        if response_model not in ("namespace", "model", "dict"):
+            raise ValueError("response_model must be one of 'namespace', 'model' or 'dict'")
+        self.response_model = response_model
+        self.decoder = get_decoder(json_decoder)
+        if coalesce is True:
+            coalesce = SingleFlight()
+        self.single_flight = coalesce or None
+        if metrics is True:
+            metrics = Metrics()
+        self.metrics = metrics or None
+
+        # Child objects get the session of their parent, nothing to build in that case
+        owns_session = session is None
+        if session is None:
+            session = self._new_session(adapter, pool_connections, pool_maxsize, rate_limit, burst, adaptive_concurrency, transport)
+        self.session = session
+        self._owns_session = owns_session
+        self.adapter = session.get_adapter("https://")
 
         if auth:
             self.session.auth = auth
 
         self.args = [host]
-        self.kwargs = {"auth": auth, "verify": verify, "adapter":adapter, "cache":cache, "cache_expire":cache_expire}
+        self.kwargs = {"auth": auth, "verify": verify, "adapter": self.adapter, "cache": self.cache or False,
+                       "cache_expire": cache_expire, "revision_store": revision_store, "response_model": response_model, "json_decoder": self.decoder,
+                       "coalesce": self.single_flight or False, "metrics": self.metrics, "session": session}
 
         if not self.host.endswith("/"):
             self.host += "/"
 
+    def __init_subclass__(cls, **kwargs):
+        # Endpoint urls are compiled once per class instead of on every call
+        super().__init_subclass__(**kwargs)
+        for attr in vars(cls).values():
+            func = getattr(attr, "__func__", attr)
+            while func is not None:
+                route = getattr(func, "_route", None)
+                if route is not None:
+                    route.compile(cls)
+                    break
+                func = getattr(func, "__wrapped__", None)
+
+    @staticmethod
+    def _new_session(adapter, pool_connections, pool_maxsize, rate_limit=None, burst=None, adaptive_concurrency=False,
+                     transport="requests"):
+        if transport not in TRANSPORTS:
+            raise ValueError("transport must be one of 'requests', 'httpx' or 'http2'")
+        if transport != "requests":
+            if adapter:
+                raise ValueError("A custom adapter can only be used with the 'requests' transport")
+            return HttpxSession(http2=transport == "http2", pool_maxsize=pool_maxsize, rate_limit=rate_limit,
+                                burst=burst, adaptive=adaptive_concurrency)
+
+        session = requests.session()
+
+        if not adapter:
+            retry = Retry(
+                total=5,
+                read=5,
+                connect=5,
+                backoff_factor=0.3,
+                status_forcelist=(500, 502, 504),
+                respect_retry_after_header=False,
+            )
+            # 429 and 503 are retried by the adapter, after the Retry-After delay asked by Gerrit
+            adapter = ThrottlingAdapter(rate_limit=rate_limit, burst=burst, adaptive=adaptive_concurrency, max_retries=retry,
+                                        pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
     def __del__(self):
-        self.session.close()
+        if getattr(self, "_owns_session", False):
+            self.session.close()
 
     @property
     def change(self):
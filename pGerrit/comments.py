@@ -0,0 +1,250 @@
+# Local index of the comments of changes.
+# Published comments, robot comments and drafts of every revision are fetched
+# concurrently and merged into one SQLite table indexed by change, patch set,
+# file, line and thread, so that comment threads are answered locally. A refresh
+# only merges the comments which are new or updated since the previous one.
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from pGerrit.client import GerritClient
+from pGerrit.utils import plain
+
+KINDS = ("comments", "robotcomments", "drafts")
+
+class CommentIndex(object):
+    """
+    A SQLite index of the comments of changes: published comments, robot comments and drafts
+    of every patch set, keyed by ``(change, patch set, file, line, thread)``.
+
+    A thread is a comment and every reply to it, it is identified by the id of its first
+    comment. It is unresolved when its most recent published comment is.
+    Results are plain dicts, with the ``path`` of the file and the ``kind`` of the comment
+    (``"comments"``, ``"robotcomments"`` or ``"drafts"``) added to the ``CommentInfo``.
+
+    :param str path: (optional) Path of the SQLite file. Defaults to an in-memory index.
+
+    Usage::
+
+        index = CommentIndex("comments.sqlite")
+        index.refresh(client, [12345, 12346])
+        for path, threads in index.unresolved_threads(12345).items():
+            print(path, [thread["comments"][-1]["message"] for thread in threads])
+    """
+
+    def __init__(self, path=":memory:"):
+        """See class docstring."""
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS comments (id TEXT PRIMARY KEY, number INTEGER, kind TEXT, patch_set INTEGER,
+                                                 path TEXT, line INTEGER, in_reply_to TEXT, thread TEXT, updated TEXT,
+                                                 unresolved INTEGER, data TEXT);
+            CREATE INDEX IF NOT EXISTS comments_location ON comments (number, patch_set, path, line);
+            CREATE INDEX IF NOT EXISTS comments_path ON comments (number, path);
+            CREATE INDEX IF NOT EXISTS comments_thread ON comments (thread, updated);
+            CREATE TABLE IF NOT EXISTS comment_marks (number INTEGER PRIMARY KEY, updated TEXT);
+        """)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM comments").fetchone()[0]
+
+    # --- ingestion --------------------------------------------------------
+
+    def add_comments(self, number, comments, kind="comments"):
+        """Merges comments into the index.
+
+        A comment already indexed is only replaced by a more recent version. Drafts replace
+        the indexed drafts of the change: deleted and published drafts are dropped.
+
+        :param int number: The change number.
+        :param comments: The map of file paths to lists of `CommentInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#comment-info>`__
+                         returned by ``comments()``, ``robotcomments()`` or ``drafts()``, of any ``response_model``.
+        :param str kind: (optional) ``"comments"`` (default), ``"robotcomments"`` or ``"drafts"``.
+        :return: The new and updated comments.
+        :rtype: list[dict]
+        """
+        if kind not in KINDS:
+            raise ValueError("kind must be one of %s" % ", ".join(KINDS))
+        # replies come after the comments they answer, so that their thread is known
+        batch = sorted((dict(comment, path=path, kind=kind) for path, items in plain(comments).items() for comment in items),
+                       key=lambda c: c.get("updated", ""))
+        added = []
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                if kind == "drafts":
+                    ids = [c["id"] for c in batch]
+                    self._db.execute("DELETE FROM comments WHERE number = ? AND kind = 'drafts' AND id NOT IN (%s)"
+                                     % ",".join("?" * len(ids)), [number] + ids)
+                for comment in batch:
+                    row = self._db.execute("SELECT updated, kind FROM comments WHERE id = ?", (comment["id"],)).fetchone()
+                    if row is not None:
+                        if row[1] == kind and row[0] >= comment.get("updated", ""):
+                            continue
+                        if row[1] != "drafts" and kind == "drafts":
+                            # a published comment keeps the id of its draft
+                            continue
+                    parent = comment.get("in_reply_to")
+                    thread = comment["id"]
+                    if parent:
+                        found = self._db.execute("SELECT thread FROM comments WHERE id = ?", (parent,)).fetchone()
+                        thread = found[0] if found else parent
+                    self._db.execute("INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     (comment["id"], number, kind, comment.get("patch_set"), comment["path"],
+                                      comment.get("line"), parent, thread, comment.get("updated"),
+                                      int(bool(comment.get("unresolved"))), json.dumps(comment)))
+                    added.append(comment)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return added
+
+    def mark(self, number):
+        """Returns the ``updated`` timestamp of the change when its comments were last fetched, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT updated FROM comment_marks WHERE number = ?", (number,)).fetchone()
+        return row[0] if row else None
+
+    def set_mark(self, number, updated):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO comment_marks VALUES (?, ?)", (number, updated))
+
+    def refresh(self, client, changes, kinds=KINDS, workers=8):
+        """Fetches the comments of changes concurrently and merges the new ones into the index.
+
+        The comments of a change are only fetched again once the change was updated since
+        the previous refresh. Pass the ``ChangeInfo`` of a query (e.g. ``status:open``) to
+        know that without a request. Responses which did not change are revalidated with
+        their ETag by the cache of the client instead of being downloaded again.
+        A failing request does not abort the refresh, it is reported in ``errors``.
+
+        :param client: The client to query Gerrit with. Its session, cache and settings are shared.
+        :type client: pGerrit.client.GerritClient
+        :param changes: Change numbers or ids, or ``ChangeInfo`` already fetched.
+        :param kinds: (optional) The comments to fetch, among ``"comments"``, ``"robotcomments"``
+                      and ``"drafts"`` (which need authentication). Defaults to all of them.
+        :param int workers: (optional) Number of requests in flight at the same time. Defaults to 8.
+        :return: A summary with the number of ``fetched`` and ``skipped`` changes, the ``new``
+                 comments (new or updated since the previous refresh) and the ``errors`` per change.
+        :rtype: types.SimpleNamespace
+        """
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise ValueError("Unknown comment kinds %s" % sorted(unknown))
+        # comments are indexed as plain JSON, no need to build objects
+        client = GerritClient(client.host, **dict(client.kwargs, response_model="dict"))
+        result = SimpleNamespace(fetched=0, skipped=0, new=[], errors={})
+        lock = threading.Lock()
+
+        def fetch_kind(number, kind):
+            return kind, getattr(client.change(number), kind)()
+
+        def fetch(change, executor):
+            change = plain(change) if not isinstance(change, (int, str)) else client.change(change).info()
+            number, updated = change["_number"], change.get("updated")
+            if updated is not None and self.mark(number) == updated:
+                with lock:
+                    result.skipped += 1
+                return
+            # the kinds of a change are fetched at the same time
+            futures = [executor.submit(fetch_kind, number, kind) for kind in kinds]
+            new = []
+            for future in futures:
+                kind, comments = future.result()
+                new += self.add_comments(number, comments, kind)
+            if updated is not None:
+                self.set_mark(number, updated)
+            with lock:
+                result.fetched += 1
+                result.new += new
+
+        with ThreadPoolExecutor(max_workers=workers) as requests, ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch, change, requests): change for change in changes}
+            for future, change in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    key = change if isinstance(change, (int, str)) else plain(change).get("_number")
+                    result.errors[key] = e
+        return result
+
+    # --- queries ----------------------------------------------------------
+
+    def _select(self, where, params, order="updated, id"):
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM comments WHERE %s ORDER BY %s" % (where, order), params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def comments(self, number, patch_set=None, path=None, line=None, thread=None, kind=None):
+        """Returns the indexed comments of a change matching every filter, oldest first.
+
+        :param int number: The change number.
+        :param int patch_set: (optional) Only comments on this patch set.
+        :param str path: (optional) Only comments on this file.
+        :param int line: (optional) Only comments on this line.
+        :param str thread: (optional) Only comments of this thread, the id of its first comment.
+        :param str kind: (optional) ``"comments"``, ``"robotcomments"`` or ``"drafts"``.
+        :rtype: list[dict]
+        """
+        clauses, params = ["number = ?"], [number]
+        for column, value in (("patch_set", patch_set), ("path", path), ("line", line), ("thread", thread), ("kind", kind)):
+            if value is not None:
+                clauses.append("%s = ?" % column)
+                params.append(value)
+        return self._select(" AND ".join(clauses), params)
+
+    def threads(self, number, path=None, unresolved=None):
+        """Returns the comment threads of a change, drafts excluded.
+
+        :param int number: The change number.
+        :param str path: (optional) Only threads on this file.
+        :param bool unresolved: (optional) Only unresolved threads if True, resolved ones if False.
+        :return: Dicts of ``id`` (of the first comment), ``path``, ``patch_set``, ``line``,
+                 ``unresolved`` and ``comments``, oldest first.
+        :rtype: list[dict]
+        """
+        clauses, params = ["number = ?", "kind != 'drafts'"], [number]
+        if path is not None:
+            clauses.append("path = ?")
+            params.append(path)
+        with self._lock:
+            rows = self._db.execute("SELECT thread, data FROM comments WHERE %s ORDER BY updated, id" % " AND ".join(clauses),
+                                    params).fetchall()
+        threads = {}
+        for thread_id, data in rows:
+            comment = json.loads(data)
+            thread = threads.get(thread_id)
+            if thread is None:
+                thread = threads[thread_id] = {"id": thread_id, "path": comment["path"], "patch_set": comment.get("patch_set"),
+                                               "line": comment.get("line"), "unresolved": False, "comments": []}
+            thread["comments"].append(comment)
+            # the state of a thread is the one of its last comment
+            thread["unresolved"] = bool(comment.get("unresolved"))
+        result = [t for t in threads.values() if unresolved is None or t["unresolved"] == unresolved]
+        return sorted(result, key=lambda t: (t["path"], t["patch_set"] or 0, t["line"] or 0, t["id"]))
+
+    def unresolved_threads(self, number):
+        """Returns the unresolved threads of a change per file path.
+
+        :rtype: dict[str, list[dict]]
+
+        Usage::
+
+            for path, threads in index.unresolved_threads(12345).items():
+                print(path, len(threads))
+        """
+        result = {}
+        for thread in self.threads(number, unresolved=True):
+            result.setdefault(thread["path"], []).append(thread)
+        return result
+
+    def close(self):
+        self._db.close()
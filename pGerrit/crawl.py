@@ -0,0 +1,301 @@
+# Crawl of every change of a host.
+# The search is split into partitions (one project during one date window),
+# crawled in parallel by a pool of processes, each with its own client. Every
+# partition is written to its own file, and completed partitions are recorded
+# in a checkpoint so that a crashed crawl restarts where it stopped.
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import quote, unquote
+
+from pGerrit.client import GerritClient
+from pGerrit.utils import getfield, timestamp, parse_timestamp
+
+CHECKPOINT = "checkpoint.json"
+FORMATS = ("ndjson", "columns", "parquet")
+
+class Partition(namedtuple("Partition", ["project", "after", "before"])):
+    """A slice of a crawl: the changes of ``project`` updated in ``[after, before)``.
+
+    ``project``, ``after`` and ``before`` may be None to not restrict the slice.
+    """
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Name of the partition in the checkpoint and of its output file."""
+        parts = [quote(self.project or "all", safe="")]
+        parts += [re.sub(r"[^0-9]", "", t) if t else "any" for t in (self.after, self.before)]
+        return "_".join(parts)
+
+    def query(self, query=""):
+        """Returns the Gerrit search of the partition, restricting ``query``."""
+        terms = [query] if query else []
+        if self.project is not None:
+            terms.append('project:"%s"' % self.project)
+        # after: and before: are inclusive, changes on the boundary are filtered by contains()
+        if self.after is not None:
+            terms.append('after:"%s +0000"' % self.after)
+        if self.before is not None:
+            terms.append('before:"%s +0000"' % self.before)
+        return " ".join(terms)
+
+    def contains(self, change):
+        # Gerrit timestamps are UTC, "2024-01-31 12:00:00.000000000", which sorts as a string
+        updated = getfield(change, "updated", "")[:len("YYYY-MM-DD HH:MM:SS")]
+        return (self.after is None or updated >= self.after) and (self.before is None or updated < self.before)
+
+def partitions(projects=None, since=None, until=None, interval=timedelta(days=30)):
+    """Splits a crawl into partitions, by project and by date windows of ``interval``.
+
+    :param list projects: (optional) Projects to crawl one by one. None does not split by project.
+    :param datetime since: (optional) Start of the first date window. None does not split by date.
+    :param datetime until: (optional) End of the last date window. Defaults to now.
+    :param timedelta interval: (optional) Length of the date windows. Defaults to 30 days.
+    :rtype: list[pGerrit.crawl.Partition]
+    """
+    windows = [(None, None)]
+    if since is not None:
+        since = parse_timestamp(since)
+        until = parse_timestamp(until or datetime.now(timezone.utc))
+        windows = []
+        while since < until:
+            end = min(since + interval, until)
+            windows.append((timestamp(since), timestamp(end)))
+            since = end
+    return [Partition(project, after, before) for project in (projects or [None]) for after, before in windows]
+
+class NdjsonWriter(object):
+    """Writes changes as newline-delimited JSON, one change per line."""
+    extension = ".ndjson"
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, change):
+        self.file.write(json.dumps(change, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self.file.close()
+
+class ColumnsWriter(object):
+    """Writes changes column by column, as a JSON object of ``{field: [value, ...]}``.
+
+    Fields missing from a change are null in its row.
+    """
+    extension = ".columns.json"
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = {}
+        self.rows = 0
+
+    def write(self, change):
+        for name in change:
+            if name not in self.columns:
+                self.columns[name] = [None] * self.rows
+        for name, column in self.columns.items():
+            column.append(change.get(name))
+        self.rows += 1
+
+    def close(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.columns, f, separators=(",", ":"))
+
+class ParquetWriter(ColumnsWriter):
+    """Writes changes to a Parquet file. Needs `pyarrow <https://arrow.apache.org/docs/python/>`__."""
+    extension = ".parquet"
+
+    def __init__(self, path):
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        super().__init__(path)
+
+    def close(self):
+        table = self.pyarrow.table(self.columns) if self.rows else self.pyarrow.table({})
+        self.pyarrow.parquet.write_table(table, self.path)
+
+_writers = {
+    "ndjson": NdjsonWriter,
+    "columns": ColumnsWriter,
+    "parquet": ParquetWriter,
+}
+
+def _write_json(path, data):
+    # atomic, a crash leaves either the previous content or the new one
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+# client of the worker process, built once by _init_worker
+_client = None
+
+def _init_worker(host, client_kwargs):
+    global _client
+    _client = GerritClient(host, **client_kwargs)
+
+def _crawl_partition(partition, query, options, output_dir, format, page_size):
+    writer_class = _writers[format]
+    path = os.path.join(output_dir, partition.key + writer_class.extension)
+    tmp = os.path.join(output_dir, ".tmp-" + partition.key + writer_class.extension)
+    writer = writer_class(tmp)
+    count = 0
+    try:
+        for change in _client.change.iter_query(page_size=page_size, q=partition.query(query), **options):
+            if not partition.contains(change):
+                continue
+            change.pop("_more_changes", None)
+            writer.write(change)
+            count += 1
+    finally:
+        writer.close()
+    os.replace(tmp, path)
+    return count
+
+def list_projects(client, **kwargs):
+    """Returns the names of the projects of a host, e.g. to crawl all of them."""
+    names = []
+    for project in client.project.iter_query(page_size=500, **kwargs):
+        name = getfield(project, "name", None)
+        names.append(name if name is not None else unquote(getfield(project, "id")))
+    return names
+
+def crawl(host, output_dir, query="", projects=None, since=None, until=None, interval=timedelta(days=30),
+          format="ndjson", processes=None, page_size=500, options=None, on_partition=None, **client_kwargs):
+    """Crawls every change matching ``query`` into ``output_dir``, one file per partition.
+
+    The crawl is resumable: ``output_dir`` keeps a checkpoint of the completed partitions,
+    calling ``crawl`` again with the same arguments only crawls the remaining ones. When a
+    partition fails, the partitions in progress are completed and checkpointed, the other
+    ones are cancelled and the error is raised.
+
+    :param str host: The full URL to the server.
+    :param str output_dir: Directory of the output files and of the checkpoint.
+    :param str query: (optional) Gerrit search restricting the crawl, e.g. ``"status:merged"``.
+    :param projects: (optional) Projects to crawl, ``"all"`` for every project of the host,
+                     or None (default) to not split the crawl by project.
+    :type projects: list or str or None
+    :param since: (optional) Only crawl changes updated since then, split in windows of ``interval``.
+    :type since: datetime or str
+    :param until: (optional) Only crawl changes updated before then. Defaults to now.
+    :type until: datetime or str
+    :param timedelta interval: (optional) Length of the date windows. Defaults to 30 days.
+    :param str format: (optional) ``"ndjson"`` (default), ``"columns"`` (a JSON object of columns)
+                       or ``"parquet"`` (needs ``pyarrow``).
+    :param int processes: (optional) Number of worker processes. Defaults to the number of CPUs.
+    :param int page_size: (optional) Number of changes requested per page. Defaults to 500.
+    :param dict options: (optional) Other options of the query, e.g. ``{"o": ["DETAILED_ACCOUNTS"]}``.
+    :param on_partition: (optional) Callable ``on_partition(partition, count)`` called in the
+                         parent process when a partition is completed.
+    :param client_kwargs: Arguments of the :class:`pGerrit.client.GerritClient` of every worker, e.g. ``auth``.
+                          They must be picklable. ``response_model`` is always ``"dict"``.
+
+    :return: A summary with ``partitions``, ``skipped`` (already completed), ``changes`` and ``seconds``.
+    :rtype: types.SimpleNamespace
+
+    Usage::
+
+        from pGerrit.crawl import crawl
+
+        summary = crawl("https://xxxx.gerrit.com/", "crawl/", query="status:merged", projects="all",
+                        since="2020-01-01", processes=8, auth=HTTPBasicAuth("user", "password"))
+    """
+    if format not in _writers:
+        raise ValueError("Unknown format %r, use one of %s" % (format, ", ".join(FORMATS)))
+    if format == "parquet":
+        import pyarrow.parquet  # noqa: F401, fail before starting the workers
+    options = dict(options or {})
+    # changes are written as they come, nothing to cache or to wrap, the writers need dicts
+    client_kwargs = dict({"cache": False, "coalesce": False}, **client_kwargs)
+    client_kwargs["response_model"] = "dict"
+
+    if projects == "all":
+        projects = list_projects(GerritClient(host, **client_kwargs))
+    todo = partitions(projects, since, until, interval)
+
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT)
+    crawl_id = {"host": host, "query": query, "format": format, "options": options}
+    checkpoint = dict(crawl_id, done={})
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if {k: checkpoint.get(k) for k in crawl_id} != crawl_id:
+            raise ValueError("%s belongs to another crawl, use another output directory" % output_dir)
+
+    done = checkpoint["done"]
+    pending = [p for p in todo if p.key not in done]
+    summary = SimpleNamespace(partitions=len(todo), skipped=len(todo) - len(pending), changes=0, seconds=0.0)
+    start = time.monotonic()
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(host, client_kwargs)) as executor:
+        futures = {executor.submit(_crawl_partition, p, query, options, output_dir, format, page_size): p for p in pending}
+        error = None
+        for future in as_completed(futures):
+            partition = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                count = future.result()
+            except Exception as e:
+                # the partitions already running are still completed and checkpointed
+                if error is None:
+                    error = e
+                    for other in futures:
+                        other.cancel()
+                continue
+            done[partition.key] = count
+            _write_json(checkpoint_path, checkpoint)
+            summary.changes += count
+            if on_partition:
+                on_partition(partition, count)
+    if error is not None:
+        raise error
+    summary.seconds = time.monotonic() - start
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pGerrit.crawl", description="Crawl every change of a Gerrit host.")
+    parser.add_argument("host", help="The full URL to the server")
+    parser.add_argument("output_dir", help="Directory of the output files and of the checkpoint")
+    parser.add_argument("-q", "--query", default="", help='Gerrit search restricting the crawl, e.g. "status:merged"')
+    parser.add_argument("-p", "--project", action="append", dest="projects",
+                        help='Project to crawl, can be repeated. "all" crawls every project one by one')
+    parser.add_argument("--since", help="Only crawl changes updated since this date, YYYY-MM-DD")
+    parser.add_argument("--until", help="Only crawl changes updated before this date, YYYY-MM-DD")
+    parser.add_argument("--interval-days", type=float, default=30, help="Length of the date windows. Defaults to 30")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("-j", "--processes", type=int, help="Number of worker processes. Defaults to the number of CPUs")
+    parser.add_argument("-o", "--option", action="append", dest="options", help="Query option, e.g. DETAILED_ACCOUNTS")
+    parser.add_argument("--user", default=os.environ.get("GERRIT_USERNAME"),
+                        help="User name, the HTTP password is read from $GERRIT_PASSWORD")
+    parser.add_argument("--no-verify", action="store_true", help="Do not verify the SSL certificate of the host")
+    args = parser.parse_args(argv)
+
+    kwargs = {"verify": not args.no_verify}
+    if args.user:
+        from requests.auth import HTTPBasicAuth
+        kwargs["auth"] = HTTPBasicAuth(args.user, os.environ.get("GERRIT_PASSWORD", ""))
+    projects = "all" if args.projects == ["all"] else args.projects
+
+    def progress(partition, count):
+        print("%s: %d changes" % (partition.key, count), file=sys.stderr)
+
+    summary = crawl(args.host, args.output_dir, query=args.query, projects=projects, since=args.since,
+                    until=args.until, interval=timedelta(days=args.interval_days), format=args.format,
+                    processes=args.processes, options={"o": args.options} if args.options else None,
+                    on_partition=progress, **kwargs)
+    print("%d changes in %d partitions (%d already done) in %.1fs"
+          % (summary.changes, summary.partitions, summary.skipped, summary.seconds), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
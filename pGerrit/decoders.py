@@ -0,0 +1,91 @@
+# JSON decoders of the client.
+# Bodies are handed to the decoders as memoryviews, so that removing the
+# XSSI prefix of Gerrit never copies the response.
+import json
+
+XSSI_PREFIX = b")]}'\n"
+
+def strip_xssi(content):
+    """Returns a memoryview of ``content`` without the leading ``)]}'`` line of Gerrit."""
+    view = memoryview(content)
+    if view[:len(XSSI_PREFIX)] == XSSI_PREFIX:
+        return view[len(XSSI_PREFIX):]
+    return view
+
+def apply_hook(value, object_hook):
+    """Applies ``object_hook`` bottom-up on already decoded JSON, like ``json.loads`` does."""
+    if isinstance(value, dict):
+        return object_hook({k: apply_hook(v, object_hook) for k, v in value.items()})
+    if isinstance(value, list):
+        return [apply_hook(v, object_hook) for v in value]
+    return value
+
+class JsonDecoder(object):
+    """Decoder based on the ``json`` module of the standard library."""
+    name = "json"
+
+    def loads(self, body, object_hook=None):
+        return json.loads(str(body, "utf-8"), object_hook=object_hook)
+
+class OrjsonDecoder(object):
+    """Decoder based on `orjson <https://github.com/ijl/orjson>`__."""
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._loads = orjson.loads
+
+    def loads(self, body, object_hook=None):
+        data = self._loads(body)
+        return apply_hook(data, object_hook) if object_hook else data
+
+class MsgspecDecoder(object):
+    """Decoder based on `msgspec <https://jcristharif.com/msgspec/>`__."""
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self._loads = msgspec.json.Decoder().decode
+
+    def loads(self, body, object_hook=None):
+        data = self._loads(body)
+        return apply_hook(data, object_hook) if object_hook else data
+
+class AutoDecoder(object):
+    """Uses the fastest installed decoder for plain data, and the standard library when an
+    ``object_hook`` is needed, as calling the hook from C is faster than applying it afterwards."""
+    name = "auto"
+
+    def __init__(self):
+        self._json = JsonDecoder()
+        self._fast = self._json
+        for decoder in (OrjsonDecoder, MsgspecDecoder):
+            try:
+                self._fast = decoder()
+                break
+            except ImportError:
+                pass
+
+    def loads(self, body, object_hook=None):
+        if object_hook:
+            return self._json.loads(body, object_hook=object_hook)
+        return self._fast.loads(body)
+
+_decoders = {
+    "auto": AutoDecoder,
+    "json": JsonDecoder,
+    "orjson": OrjsonDecoder,
+    "msgspec": MsgspecDecoder,
+}
+
+def get_decoder(decoder="auto"):
+    """Returns the decoder for ``decoder``.
+
+    :param decoder: ``"json"``, ``"orjson"``, ``"msgspec"``, ``"auto"`` (the fastest installed one)
+                    or any object with a ``loads(body, object_hook=None)`` method.
+    """
+    if not isinstance(decoder, str):
+        return decoder
+    if decoder not in _decoders:
+        raise ValueError("Unknown JSON decoder %r, use one of %s" % (decoder, ", ".join(_decoders)))
+    return _decoders[decoder]()
@@ -0,0 +1,234 @@
+# Dependency graph of changes.
+# The relation chains (related changes of the current revision) and the
+# submitted together sets of seed changes are walked breadth first on a thread
+# pool, every change being visited once, and the dependencies are ordered to plan
+# the submission of a stack.
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from pGerrit.client import GerritClient
+
+RELATIONS = ("related", "submitted_together")
+
+class ChangeGraph(object):
+    """
+    The changes reachable from seed changes through their relation chains and the changes
+    submitted together with them.
+
+    ``nodes`` maps every change number to a dict with the ``project``, ``change_id``,
+    ``status`` and ``commit`` of the change when they are known. ``depends_on`` maps a
+    change to the changes its commit is based on, ``dependents`` is the reverse, and
+    ``together`` maps a change to the other changes Gerrit would submit with it.
+    ``errors`` maps the changes which could not be visited to the exception raised.
+
+    You won't need to instantiate this Class directly.
+    Use ``client.change.graph()``.
+
+    Usage::
+
+        graph = client.change.graph([12345])
+        for number in graph.topological_order():
+            print(number, graph.nodes[number]["status"], sorted(graph.depends_on[number]))
+    """
+
+    def __init__(self):
+        """See class docstring."""
+        self.nodes = {}
+        self.depends_on = {}
+        self.dependents = {}
+        self.together = {}
+        self.errors = {}
+        # a limit stopped the walk before every change was visited
+        self.truncated = False
+        self._commits = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, number):
+        return number in self.nodes
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def add_node(self, number, **info):
+        """Adds a change, or completes what is known of it. Values which are None are ignored."""
+        node = self.nodes.get(number)
+        if node is None:
+            node = self.nodes[number] = {"_number": number}
+            self.depends_on[number] = set()
+            self.dependents[number] = set()
+            self.together[number] = set()
+        node.update((key, value) for key, value in info.items() if value is not None)
+        if info.get("commit"):
+            self._commits[info["commit"]] = number
+        return node
+
+    def add_dependency(self, child, parent):
+        """Records that the change ``child`` is based on the change ``parent``."""
+        if child != parent:
+            self.add_node(child)
+            self.add_node(parent)
+            self.depends_on[child].add(parent)
+            self.dependents[parent].add(child)
+
+    def add_together(self, number, numbers):
+        """Records that submitting the change ``number`` submits the changes ``numbers`` too."""
+        self.add_node(number)
+        for other in numbers:
+            self.add_node(other)
+        self.together[number] |= set(numbers) - {number}
+
+    def roots(self):
+        """Returns the changes which do not depend on another change of the graph."""
+        return sorted(number for number, parents in self.depends_on.items() if not parents)
+
+    def ancestors(self, number):
+        """Returns every change ``number`` depends on, directly or not."""
+        seen = set()
+        stack = list(self.depends_on.get(number, ()))
+        while stack:
+            parent = stack.pop()
+            if parent not in seen:
+                seen.add(parent)
+                stack.extend(self.depends_on[parent])
+        return seen
+
+    def topological_order(self, numbers=None):
+        """Returns the changes ordered so that every change comes after the changes it depends on.
+
+        Independent changes are ordered by number, so the order is stable.
+
+        :param numbers: (optional) Only order these changes. Defaults to every change of the graph.
+        :raises ValueError: When changes depend on each other in a cycle.
+        :rtype: list[int]
+        """
+        numbers = set(self.nodes if numbers is None else numbers)
+        pending = {number: len(self.depends_on[number] & numbers) for number in numbers}
+        ready = [number for number, count in pending.items() if not count]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            number = heapq.heappop(ready)
+            order.append(number)
+            for child in self.dependents[number]:
+                if child in pending:
+                    pending[child] -= 1
+                    if not pending[child]:
+                        heapq.heappush(ready, child)
+        if len(order) != len(numbers):
+            raise ValueError("Dependency cycle between changes %s" % sorted(numbers - set(order)))
+        return order
+
+    def submit_order(self, number):
+        """Returns the changes to submit with ``number``, in the order they can be merged.
+
+        That is the change, its ancestors and the changes submitted together with any of them.
+
+        :rtype: list[int]
+        """
+        needed, stack = set(), [number]
+        while stack:
+            current = stack.pop()
+            if current not in needed:
+                needed.add(current)
+                stack.extend(self.depends_on[current] | self.together[current])
+        return self.topological_order(needed)
+
+    def _add_related(self, related):
+        entries = related.get("changes", []) if isinstance(related, dict) else related
+        for entry in entries:
+            commit = entry.get("commit") or {}
+            self.add_node(entry["_change_number"], project=entry.get("project"), change_id=entry.get("change_id"),
+                          status=entry.get("status"), commit=commit.get("commit"), subject=commit.get("subject"))
+        # parents are looked up once every commit of the chain is known
+        for entry in entries:
+            for parent in (entry.get("commit") or {}).get("parents", []):
+                number = self._commits.get(parent.get("commit"))
+                if number is not None:
+                    self.add_dependency(entry["_change_number"], number)
+        return [entry["_change_number"] for entry in entries]
+
+    def _add_changes(self, number, changes):
+        # submitted_together returns a list, or a SubmittedTogetherInfo with NON_VISIBLE_CHANGES
+        changes = changes.get("changes", []) if isinstance(changes, dict) else changes
+        for change in changes:
+            self.add_node(change["_number"], project=change.get("project"), change_id=change.get("change_id"),
+                          status=change.get("status"), subject=change.get("subject"), branch=change.get("branch"))
+        numbers = [change["_number"] for change in changes]
+        self.add_together(number, numbers)
+        return numbers
+
+def build_graph(client, seeds, relations=RELATIONS, workers=8, max_changes=None):
+    """Walks the relations of changes breadth first, sending the requests of several changes at once.
+
+    Every change reached is visited once: the related changes of its current revision give
+    the commits it is based on, and ``submitted_together`` the changes Gerrit would submit
+    with it, e.g. the changes of its topic. A change which could not be visited is reported
+    in ``errors`` and the walk goes on.
+
+    :param client: The client to query Gerrit with. Its session, cache and settings are shared.
+    :type client: pGerrit.client.GerritClient
+    :param seeds: Numbers or ids of the changes to start from.
+    :param relations: (optional) The relations to follow, ``"related"`` and/or ``"submitted_together"``.
+    :param int workers: (optional) Number of requests in flight at the same time. Defaults to 8.
+                        Keep it below the ``pool_maxsize`` of the client.
+    :param int max_changes: (optional) Stop visiting new changes after this number. ``truncated``
+                            is then set on the graph. Not limited by default.
+    :rtype: pGerrit.graph.ChangeGraph
+    """
+    unknown = set(relations) - set(RELATIONS)
+    if unknown:
+        raise ValueError("Unknown relations %s, use 'related' or 'submitted_together'" % sorted(unknown))
+    # relations are read as plain JSON, no need to build objects
+    client = GerritClient(client.host, **dict(client.kwargs, response_model="dict"))
+    graph = ChangeGraph()
+    visited = set()
+    pending = {}
+
+    def fetch(change, relation):
+        if relation == "info":
+            return client.change(change).info()
+        if relation == "related":
+            return client.change(change).current_revision().related()
+        return client.change(change).submitted_together()
+
+    def visit(number):
+        if number in visited:
+            return
+        if max_changes is not None and len(visited) >= max_changes:
+            graph.truncated = True
+            return
+        visited.add(number)
+        graph.add_node(number)
+        for relation in relations:
+            pending[executor.submit(fetch, number, relation)] = (number, relation)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for seed in seeds:
+            if isinstance(seed, int) or str(seed).isdigit():
+                visit(int(seed))
+            else:
+                # a Change-Id or a project~branch~Change-Id, its number is needed to merge what is learnt of it
+                pending[executor.submit(fetch, seed, "info")] = (seed, "info")
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                change, relation = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    graph.errors[change] = e
+                    continue
+                if relation == "info":
+                    graph.add_node(result["_number"], project=result.get("project"), change_id=result.get("change_id"),
+                                   status=result.get("status"), subject=result.get("subject"))
+                    found = [result["_number"]]
+                elif relation == "related":
+                    found = graph._add_related(result)
+                else:
+                    found = graph._add_changes(change, result)
+                for number in found:
+                    visit(number)
+    return graph
@@ -0,0 +1,277 @@
+# Local index of changes.
+# Changes, their files and their reviewers are kept in SQLite tables with an
+# index on every column a question is asked on, so that common questions (open
+# changes of a project, files touched by a change, changes reviewed by someone)
+# are answered locally instead of querying Gerrit again.
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from pGerrit.client import GerritClient
+from pGerrit.sync import ChangeStore
+from pGerrit.utils import plain, timestamp
+
+class ChangeIndex(ChangeStore):
+    """
+    A :class:`pGerrit.sync.ChangeStore` with secondary indexes on project, branch, owner,
+    status, update time, file path and reviewer.
+
+    It is filled from the results of ``GerritChange`` and ``GerritChangeRevision`` methods
+    with :meth:`add_change`, :meth:`add_files`, :meth:`add_reviewers` or :meth:`ingest`,
+    and can be the store of a :class:`pGerrit.sync.ChangeSync` to stay up to date.
+    Results are plain dicts.
+
+    :param str path: (optional) Path of the SQLite file. Defaults to an in-memory index.
+
+    Usage::
+
+        index = ChangeIndex("index.sqlite")
+        index.ingest(client, client.change.iter_query(q="status:open"))
+        for change in index.search(project="foo", status="NEW"):
+            print(change["_number"], [f["path"] for f in index.files(change["_number"])])
+    """
+
+    def __init__(self, path=":memory:"):
+        """See class docstring."""
+        super().__init__(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS change_index (number INTEGER PRIMARY KEY, project TEXT, branch TEXT, status TEXT,
+                                                     owner_id INTEGER, owner_name TEXT, owner_email TEXT, owner_username TEXT,
+                                                     updated TEXT);
+            CREATE INDEX IF NOT EXISTS change_index_project ON change_index (project, status, updated);
+            CREATE INDEX IF NOT EXISTS change_index_branch ON change_index (branch);
+            CREATE INDEX IF NOT EXISTS change_index_status ON change_index (status, updated);
+            CREATE INDEX IF NOT EXISTS change_index_owner ON change_index (owner_id);
+            CREATE INDEX IF NOT EXISTS change_index_owner_email ON change_index (owner_email);
+            CREATE INDEX IF NOT EXISTS change_index_updated ON change_index (updated);
+
+            CREATE TABLE IF NOT EXISTS files (number INTEGER, path TEXT, revision TEXT, status TEXT,
+                                              lines_inserted INTEGER, lines_deleted INTEGER, PRIMARY KEY (number, path));
+            CREATE INDEX IF NOT EXISTS files_path ON files (path);
+
+            CREATE TABLE IF NOT EXISTS reviewers (number INTEGER, account_id INTEGER, name TEXT, email TEXT, username TEXT,
+                                                  state TEXT, approvals TEXT, PRIMARY KEY (number, account_id));
+            CREATE INDEX IF NOT EXISTS reviewers_account ON reviewers (account_id);
+            CREATE INDEX IF NOT EXISTS reviewers_email ON reviewers (email);
+        """)
+
+    # --- ingestion --------------------------------------------------------
+
+    def _store(self, change):
+        super()._store(change)
+        owner = change.get("owner") or {}
+        self._db.execute("INSERT OR REPLACE INTO change_index VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (change["_number"], change.get("project"), change.get("branch"), change.get("status"),
+                          owner.get("_account_id"), owner.get("name"), owner.get("email"), owner.get("username"),
+                          change["updated"]))
+
+        # reviewers and files come with the change with the DETAILED_LABELS and CURRENT_FILES options
+        reviewers = [dict(account, state=state) for state, accounts in (change.get("reviewers") or {}).items()
+                     for account in accounts]
+        if reviewers:
+            self._replace_reviewers(change["_number"], reviewers)
+        current = change.get("current_revision")
+        files = ((change.get("revisions") or {}).get(current) or {}).get("files")
+        if files:
+            self._replace_files(change["_number"], files, current)
+
+    def add_change(self, change):
+        """Indexes a change, e.g. the result of ``change.detail()`` or an element of ``change.query()``.
+
+        An older version of the change than the indexed one is ignored.
+
+        :param change: A `ChangeInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#change-info>`__
+                       of any ``response_model``.
+        :return: True if the index was changed.
+        """
+        change = plain(change)
+        change.pop("_more_changes", None)
+        return sum(self.merge([change])) > 0
+
+    def add_files(self, number, files, revision=None):
+        """Indexes the files of a change, replacing the previously indexed ones.
+
+        :param int number: The change number.
+        :param files: The map of `FileInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#file-info>`__
+                      returned by ``revision.files()``.
+        :param str revision: (optional) The revision the files belong to.
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._replace_files(number, plain(files), revision)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _replace_files(self, number, files, revision):
+        self._db.execute("DELETE FROM files WHERE number = ?", (number,))
+        self._db.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                             [(number, path, revision, info.get("status", "M"), info.get("lines_inserted", 0),
+                               info.get("lines_deleted", 0)) for path, info in files.items()])
+
+    def add_reviewers(self, number, reviewers):
+        """Indexes the reviewers of a change, replacing the previously indexed ones.
+
+        :param int number: The change number.
+        :param reviewers: The list of `ReviewerInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#reviewer-info>`__
+                          returned by ``change.reviewer.query()``.
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._replace_reviewers(number, plain(reviewers))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _replace_reviewers(self, number, reviewers):
+        self._db.execute("DELETE FROM reviewers WHERE number = ?", (number,))
+        self._db.executemany("INSERT OR REPLACE INTO reviewers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(number, r.get("_account_id"), r.get("name"), r.get("email"), r.get("username"),
+                               r.get("state", "REVIEWER"), json.dumps(r.get("approvals") or {})) for r in reviewers])
+
+    def ingest(self, client, changes, files=True, reviewers=True, workers=8):
+        """Indexes changes, fetching their details, files and reviewers on a thread pool.
+
+        :param client: The client to fetch with.
+        :type client: pGerrit.client.GerritClient
+        :param changes: Change numbers or ids, or ``ChangeInfo`` already fetched (e.g. by ``iter_query``).
+        :param bool files: (optional) Index the files of the current revision of every change. Defaults to True.
+        :param bool reviewers: (optional) Index the reviewers of every change. Defaults to True.
+        :param int workers: (optional) Number of requests in flight at the same time. Defaults to 8.
+
+        :return: The number of changes indexed.
+        :rtype: int
+        """
+        # plain JSON is indexed, no need to build objects
+        client = GerritClient(client.host, **dict(client.kwargs, response_model="dict"))
+
+        def fetch(change):
+            if not isinstance(change, (int, str)):
+                change = plain(change)
+            else:
+                change = client.change(change).detail()
+            number = change["_number"]
+            self.add_change(change)
+            if files:
+                revision = client.change(number).revision(change.get("current_revision") or "current")
+                self.add_files(number, revision.files(), revision.revisionID)
+            if reviewers:
+                self.add_reviewers(number, client.change(number).reviewer.query())
+
+        count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(fetch, changes):
+                count += 1
+        return count
+
+    # --- queries ----------------------------------------------------------
+
+    @staticmethod
+    def _account(account, id_column, columns):
+        # an account is a numeric id, or an email, a username or a full name
+        if isinstance(account, int) or str(account).isdigit():
+            return "%s = ?" % id_column, [int(account)]
+        return "(%s)" % " OR ".join("%s = ?" % column for column in columns), [account] * len(columns)
+
+    def _where(self, project=None, branch=None, status=None, owner=None, reviewer=None, path=None,
+               updated_after=None, updated_before=None):
+        clauses, params = [], []
+        for column, value in (("project", project), ("branch", branch), ("status", status)):
+            if value is not None:
+                clauses.append("c.%s = ?" % column)
+                params.append(value)
+        if owner is not None:
+            clause, values = self._account(owner, "c.owner_id", ("c.owner_email", "c.owner_username", "c.owner_name"))
+            clauses.append(clause)
+            params += values
+        if reviewer is not None:
+            clause, values = self._account(reviewer, "account_id", ("email", "username", "name"))
+            clauses.append("c.number IN (SELECT number FROM reviewers WHERE %s)" % clause)
+            params += values
+        if path is not None:
+            # a path ending with / matches every file of the directory
+            if path.endswith("/"):
+                clauses.append("c.number IN (SELECT number FROM files WHERE path >= ? AND path < ?)")
+                params += [path, path[:-1] + "0"]
+            else:
+                clauses.append("c.number IN (SELECT number FROM files WHERE path = ?)")
+                params.append(path)
+        if updated_after is not None:
+            clauses.append("c.updated >= ?")
+            params.append(timestamp(updated_after))
+        if updated_before is not None:
+            clauses.append("c.updated < ?")
+            params.append(timestamp(updated_before))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def search(self, limit=None, **filters):
+        """Returns the indexed changes matching every filter, most recently updated first.
+
+        :param str project: (optional) Project of the changes.
+        :param str branch: (optional) Branch of the changes.
+        :param str status: (optional) ``"NEW"``, ``"MERGED"`` or ``"ABANDONED"``.
+        :param owner: (optional) Account id, email, username or name of the owner.
+        :param reviewer: (optional) Account id, email, username or name of a reviewer.
+        :param str path: (optional) A file touched by the changes, or a directory ending with ``/``.
+        :param updated_after: (optional) Only changes updated at or after this datetime or timestamp.
+        :param updated_before: (optional) Only changes updated before this datetime or timestamp.
+        :param int limit: (optional) Maximum number of changes returned.
+        :rtype: list[dict]
+
+        Usage::
+
+            open_changes = index.search(project="foo", status="NEW")
+            reviewed = index.search(reviewer="john@example.com", updated_after="2024-01-01")
+        """
+        where, params = self._where(**filters)
+        sql = "SELECT s.data FROM change_index c JOIN changes s ON s.number = c.number%s ORDER BY c.updated DESC, c.number DESC" % where
+        if limit is not None:
+            sql += " LIMIT %d" % limit
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, by, **filters):
+        """Counts the indexed changes matching ``filters``, grouped by a column.
+
+        :param str by: ``"project"``, ``"branch"``, ``"status"`` or ``"owner"`` (account id).
+        :param filters: The filters of :meth:`search`.
+        :rtype: dict
+
+        Usage::
+
+            open_per_project = index.count("project", status="NEW")
+        """
+        column = {"project": "project", "branch": "branch", "status": "status", "owner": "owner_id"}.get(by)
+        if column is None:
+            raise ValueError("Can't count by %r, use project, branch, status or owner" % by)
+        where, params = self._where(**filters)
+        with self._lock:
+            rows = self._db.execute("SELECT c.%s, COUNT(*) FROM change_index c%s GROUP BY c.%s" % (column, where, column),
+                                    params).fetchall()
+        return dict(rows)
+
+    def files(self, number):
+        """Returns the indexed files of a change, as dicts of ``path``, ``revision``, ``status``,
+        ``lines_inserted`` and ``lines_deleted``."""
+        with self._lock:
+            cursor = self._db.execute("SELECT path, revision, status, lines_inserted, lines_deleted FROM files "
+                                      "WHERE number = ? ORDER BY path", (number,))
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def reviewers(self, number):
+        """Returns the indexed reviewers of a change, as dicts of ``_account_id``, ``name``,
+        ``email``, ``username``, ``state`` and ``approvals``."""
+        with self._lock:
+            rows = self._db.execute("SELECT account_id, name, email, username, state, approvals FROM reviewers "
+                                    "WHERE number = ? ORDER BY account_id", (number,)).fetchall()
+        return [{"_account_id": r[0], "name": r[1], "email": r[2], "username": r[3], "state": r[4],
+                 "approvals": json.loads(r[5])} for r in rows]
+
+    def reviewed_by(self, account, **filters):
+        """Returns the indexed changes reviewed by ``account`` (id, email, username or name)."""
+        return self.search(reviewer=account, **filters)
@@ -0,0 +1,150 @@
+# Lazy decoding of list and map responses.
+# The body is only split into the raw byte ranges of its top level elements,
+# every element is decoded when it is accessed. msgspec does the split when it
+# is installed, otherwise a regex skips over strings to find the brackets.
+import json
+import re
+from collections.abc import Mapping, Sequence
+from typing import Dict, List
+
+# Everything up to the next bracket which is not inside a JSON string
+_bracket = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')
+_OPEN = (ord("["), ord("{"))
+# What may be left of an array or an object once its elements are replaced by 0
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_list_skeleton = re.compile(rb'\s*\[\s*(?:0\s*(?:,\s*0\s*)*)?\]\s*')
+_map_skeleton = re.compile(rb'\s*\{\s*(?:%s\s*:\s*0\s*(?:,\s*%s\s*:\s*0\s*)*)?\}\s*' % (_STRING, _STRING))
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+def split(body):
+    """Splits a JSON array or object into the raw elements of its top level.
+
+    :param body: The JSON document, as a bytes-like object.
+    :return: ``("list", [slice, ...])`` for an array, ``("map", [(key, slice), ...])`` for an
+             object, or None if the document is not an array or an object. Without msgspec,
+             None too when the top level holds scalars, the caller then decodes it at once.
+    """
+    body = memoryview(body)
+    head = bytes(body[:64]).lstrip()[:1]
+    if head == b"[":
+        kind = "list"
+    elif head == b"{":
+        kind = "map"
+    else:
+        return None
+
+    if msgspec is not None:
+        try:
+            if kind == "list":
+                return kind, [memoryview(raw) for raw in msgspec.json.decode(body, type=List[msgspec.Raw])]
+            return kind, [(key, memoryview(raw)) for key, raw in msgspec.json.decode(body, type=Dict[str, msgspec.Raw]).items()]
+        except msgspec.DecodeError:
+            return None
+
+    spans = []
+    depth = 0
+    start = None
+    for m in _bracket.finditer(body):
+        end = m.end()
+        if body[end - 1] in _OPEN:
+            depth += 1
+            if depth == 2:
+                start = end - 1
+        else:
+            depth -= 1
+            if depth == 1:
+                spans.append((start, end))
+    if depth != 0:
+        return None
+    # a scalar at the top level, e.g. a list of strings, is decoded eagerly
+    gaps = [body[e:s] for (_, e), (s, _) in zip([(0, 0)] + spans, spans + [(len(body), len(body))])]
+    skeleton = _list_skeleton if kind == "list" else _map_skeleton
+    if skeleton.fullmatch(b"0".join(gaps)) is None:
+        return None
+
+    if kind == "list":
+        return kind, [body[s:e] for s, e in spans]
+
+    elements = []
+    previous = 0
+    for s, e in spans:
+        # between two values there is only `,"key":` (or `{"key":` for the first one)
+        key = bytes(body[previous:s]).strip().lstrip(b"{,").rstrip(b":").strip()
+        elements.append((json.loads(key), body[s:e]))
+        previous = e
+    return kind, elements
+
+class LazyList(Sequence):
+    """A list response whose elements are decoded on access.
+
+    Elements are not kept once decoded: keep a reference to the ones you need.
+    """
+    __slots__ = ("_elements", "_decode")
+
+    def __init__(self, elements, decode):
+        self._elements = elements
+        self._decode = decode
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazyList(self._elements[index], self._decode)
+        return self._decode(self._elements[index])
+
+    def __repr__(self):
+        return "<LazyList of %d elements>" % len(self)
+
+class LazyMap(Mapping):
+    """A map response (e.g. the files of a revision) whose values are decoded on access.
+
+    Values can be read as items or as attributes, like the other response types.
+    """
+    __slots__ = ("_elements", "_decode")
+
+    def __init__(self, elements, decode):
+        self._elements = dict(elements)
+        self._decode = decode
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __iter__(self):
+        return iter(self._elements)
+
+    def __getitem__(self, key):
+        return self._decode(self._elements[key])
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name in LazyMap.__slots__:
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def __dict__(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return "<LazyMap of %d elements>" % len(self)
+
+def project(data, fields):
+    """Keeps only ``fields`` of a decoded object."""
+    if isinstance(data, dict):
+        return {k: data[k] for k in fields if k in data}
+    return data
+
+def project_all(data, fields):
+    """Keeps only ``fields`` of every element of a decoded list or map response."""
+    if isinstance(data, list):
+        return [project(d, fields) for d in data]
+    if isinstance(data, dict):
+        return {k: project(v, fields) for k, v in data.items()}
+    return data
@@ -0,0 +1,166 @@
+# Materialization of the files of a revision on disk.
+# Contents are downloaded on a thread pool and decoded from base64 chunk by chunk
+# straight into the files. A file already on disk with the blob SHA-1 Gerrit
+# reports for it, or recorded in the manifest of a previous run, is not
+# downloaded again.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from pGerrit.utils import plain
+
+# entries of the file list which are not files of the repository
+MAGIC_FILES = ("/COMMIT_MSG", "/MERGE_LIST", "/PATCHSET_LEVEL")
+
+MANIFEST = ".pgerrit-manifest.json"
+
+def blob_sha(path):
+    """Returns the git blob SHA-1 of a file, as reported by Gerrit in ``FileInfo.new_sha``."""
+    digest = hashlib.sha1(b"blob %d\0" % os.path.getsize(path))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _target(root, name):
+    path = os.path.normpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError("File path %r is outside of %r" % (name, root))
+    return path
+
+class _Manifest(object):
+    # what was written by the previous runs: path -> [commit, blob SHA-1]
+    def __init__(self, root):
+        self.path = os.path.join(root, MANIFEST)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, name):
+        with self._lock:
+            return self.entries.get(name)
+
+    def set(self, name, value):
+        with self._lock:
+            if value is None:
+                self.entries.pop(name, None)
+            else:
+                self.entries[name] = value
+
+    def save(self):
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.entries, f, sort_keys=True)
+            os.replace(tmp, self.path)
+
+def materialize(revision, dest_dir, workers=8, include_base=False):
+    """Writes the files of a revision to ``dest_dir``, downloading their contents concurrently.
+
+    :param revision: The revision to materialize. ``"current"`` is resolved to its commit first,
+                     so the files all come from the same patch set.
+    :type revision: pGerrit.change.GerritChangeRevision
+    :param str dest_dir: The directory of the files, created if needed.
+    :param int workers: (optional) Number of downloads at the same time. Defaults to 8.
+    :param include_base: (optional) Set to True, or a directory, to also write the files as they
+                         are in the base of the revision, True meaning ``dest_dir + ".base"``.
+    :return: A summary with the number of ``files`` downloaded, ``skipped`` and ``deleted``, the
+             ``bytes`` written, ``seconds``, ``throughput`` in bytes per second and the ``errors``
+             per file path.
+    :rtype: types.SimpleNamespace
+    """
+    start = time.monotonic()
+    commit = revision.resolve()
+    files = plain(revision.metadata.files)
+    root = os.path.abspath(dest_dir)
+    base_root = None
+    if include_base:
+        base_root = os.path.abspath(root + ".base" if include_base is True else include_base)
+
+    # (directory, path of the file, FileInfo, fetched from the base)
+    jobs = []
+    for name, info in files.items():
+        if name in MAGIC_FILES:
+            continue
+        if info.get("status") != "D":
+            jobs.append((root, name, info, False))
+        if base_root is not None and info.get("status") not in ("A", "C"):
+            jobs.append((base_root, info.get("old_path") or name, info, True))
+
+    result = SimpleNamespace(files=0, skipped=0, deleted=0, bytes=0, seconds=0.0, throughput=0.0, errors={})
+    manifests = {}
+    for directory in (root, base_root):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            manifests[directory] = _Manifest(directory)
+    lock = threading.Lock()
+
+    def fetch(job):
+        directory, path, info, base = job
+        target = _target(directory, path)
+        manifest = manifests[directory]
+        key = "base:" + commit if base else commit
+        expected = None if base else info.get("new_sha")
+        if os.path.isfile(target):
+            entry = manifest.get(path)
+            local = blob_sha(target) if expected or entry else None
+            if (expected and local == expected) or (not expected and entry == [key, local]):
+                with lock:
+                    result.skipped += 1
+                return
+
+        params = {"parent": 1} if base else {}
+        # the base of a renamed file is read at its former path
+        download = revision.file(path).content(stream=True, **params)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".pgerrit-")
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as f:
+                for chunk in download:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        manifest.set(path, [key, blob_sha(target)])
+        with lock:
+            result.files += 1
+            result.bytes += size
+
+    def remove(name):
+        # a file deleted by the revision, only removed if a previous run wrote it
+        target = _target(root, name)
+        if manifests[root].get(name) is not None and os.path.isfile(target):
+            os.unlink(target)
+            manifests[root].set(name, None)
+            result.deleted += 1
+
+    for name, info in files.items():
+        if name not in MAGIC_FILES and info.get("status") == "D":
+            remove(name)
+
+    def run(job):
+        try:
+            fetch(job)
+        except Exception as e:
+            with lock:
+                result.errors[os.path.join(job[0], job[1])] = e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(run, jobs))
+    for manifest in manifests.values():
+        manifest.save()
+
+    result.seconds = time.monotonic() - start
+    result.throughput = result.bytes / result.seconds if result.seconds else 0.0
+    return result
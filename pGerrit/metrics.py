@@ -0,0 +1,268 @@
+# Instrumentation of the REST calls.
+# Every call is recorded under the template of its endpoint, with the time spent
+# on the network, in JSON decoding and in building the response objects, the
+# bytes sent and received, what the cache did and how many retries it took.
+# Calls can be exported as spans, e.g. to OpenTelemetry.
+import bisect
+import contextlib
+import threading
+import time
+
+# upper bounds of the latency buckets in seconds, 0.1 ms to ~105 s
+BUCKETS = tuple(0.0001 * 2 ** i for i in range(21))
+
+class Histogram(object):
+    """A latency histogram with exponential buckets."""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Returns an upper bound of the ``q`` quantile, e.g. 0.95."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+class EndpointStats(object):
+    """The metrics of the calls of one endpoint."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.network = Histogram()
+        self.decode = Histogram()
+        self.build = Histogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        # what served the calls: "hit", "miss", "revalidated", "store", "coalesced" or "network"
+        self.sources = {}
+
+    @property
+    def cache_hits(self):
+        return self.sources.get("hit", 0) + self.sources.get("revalidated", 0) + self.sources.get("store", 0)
+
+    @property
+    def cache_misses(self):
+        return self.sources.get("miss", 0)
+
+class Span(object):
+    """A finished call, in the shape of an OpenTelemetry span. Times are in nanoseconds since the epoch."""
+    __slots__ = ("name", "start_time", "end_time", "attributes", "error")
+
+    def __init__(self, name, start_time, end_time, attributes, error=None):
+        self.name = name
+        self.start_time = start_time
+        self.end_time = end_time
+        self.attributes = attributes
+        self.error = error
+
+    def __repr__(self):
+        return "Span(%r, %.1f ms, %r)" % (self.name, (self.end_time - self.start_time) / 1e6, self.attributes)
+
+class Call(object):
+    """A call in progress, filled by the layers it goes through."""
+    __slots__ = ("endpoint", "method", "url", "start", "start_ns", "network", "decode", "build",
+                 "bytes_in", "bytes_out", "retries", "source", "status", "error")
+
+    def __init__(self, endpoint, method, url):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns()
+        self.network = self.decode = self.build = 0.0
+        self.bytes_in = self.bytes_out = self.retries = 0
+        self.source = None
+        self.status = None
+        self.error = None
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        """Adds the time spent in the block to ``phase``: ``"network"``, ``"decode"`` or ``"build"``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, phase, getattr(self, phase) + time.perf_counter() - start)
+
+    def response(self, res, elapsed):
+        """Records a response received after ``elapsed`` seconds."""
+        self.network += elapsed
+        self.status = res.status_code
+        self.bytes_in += len(res.content)
+        body = res.request.body if res.request is not None else None
+        self.bytes_out += len(body) if body else 0
+        # retries of urllib3 (connection errors, 5xx) and of the throttling adapter (429, 503)
+        retries = getattr(res.raw, "retries", None)
+        self.retries += len(retries.history) if retries is not None else 0
+        self.retries += getattr(res, "throttle_retries", 0)
+
+class _NoCall(object):
+    # stands for the call when metrics are disabled
+    def timer(self, phase):
+        return contextlib.nullcontext()
+
+NO_CALL = _NoCall()
+
+_local = threading.local()
+
+def current_call():
+    """Returns the call being made by the current thread, or None."""
+    stack = getattr(_local, "calls", None)
+    return stack[-1] if stack else None
+
+class Metrics(object):
+    """
+    A registry of the metrics of the REST calls of a client, per endpoint template.
+
+    :param exporters: (optional) Span exporters, objects with an ``export(spans)`` method
+                      called with every finished call, like an OpenTelemetry ``SpanExporter``.
+
+    Usage::
+
+        client = GerritClient("https://xxxx.gerrit.com/", metrics=True)
+        ...
+        print(client.metrics.summary())
+        detail = client.metrics.endpoints["/a/changes/{}/detail"]
+        print(detail.network.quantile(0.95), detail.cache_hits)
+    """
+
+    def __init__(self, exporters=None):
+        """See class docstring."""
+        self.endpoints = {}
+        self.exporters = list(exporters or [])
+        self._lock = threading.Lock()
+
+    def begin(self, endpoint, method, url):
+        """Starts recording a call made by the current thread."""
+        call = Call(endpoint, method, url)
+        stack = getattr(_local, "calls", None)
+        if stack is None:
+            stack = _local.calls = []
+        stack.append(call)
+        return call
+
+    @contextlib.contextmanager
+    def record(self, endpoint, method, url):
+        """Records the call made in the block, failed if the block raises."""
+        call = self.begin(endpoint, method, url)
+        try:
+            yield call
+        except BaseException as e:
+            self.end(call, e)
+            raise
+        self.end(call)
+
+    def end(self, call, error=None):
+        """Records a finished call."""
+        elapsed = time.perf_counter() - call.start
+        _local.calls.remove(call)
+        call.error = error
+        with self._lock:
+            stats = self.endpoints.get(call.endpoint)
+            if stats is None:
+                stats = self.endpoints[call.endpoint] = EndpointStats(call.endpoint)
+            stats.calls += 1
+            stats.errors += error is not None
+            stats.latency.add(elapsed)
+            stats.network.add(call.network)
+            stats.decode.add(call.decode)
+            stats.build.add(call.build)
+            stats.bytes_in += call.bytes_in
+            stats.bytes_out += call.bytes_out
+            stats.retries += call.retries
+            source = call.source or "network"
+            stats.sources[source] = stats.sources.get(source, 0) + 1
+
+        if self.exporters:
+            attributes = {"http.method": call.method, "http.url": call.url, "gerrit.endpoint": call.endpoint,
+                          "gerrit.source": call.source or "network", "gerrit.network_ms": call.network * 1e3,
+                          "gerrit.decode_ms": call.decode * 1e3, "gerrit.build_ms": call.build * 1e3,
+                          "http.response_content_length": call.bytes_in, "http.request_content_length": call.bytes_out,
+                          "gerrit.retries": call.retries}
+            if call.status is not None:
+                attributes["http.status_code"] = call.status
+            span = Span(call.method + " " + call.endpoint, call.start_ns, call.start_ns + int(elapsed * 1e9), attributes, error)
+            for exporter in self.exporters:
+                exporter.export([span])
+
+    def reset(self):
+        """Forgets every recorded call."""
+        with self._lock:
+            self.endpoints.clear()
+
+    def summary(self, limit=None):
+        """Returns a text report of the endpoints, the ones which took the most time first.
+
+        :param int limit: (optional) Only report this number of endpoints.
+        :rtype: str
+        """
+        with self._lock:
+            stats = sorted(self.endpoints.values(), key=lambda s: s.latency.total, reverse=True)[:limit]
+        header = ("endpoint", "calls", "err", "total s", "p50 ms", "p95 ms", "net s", "decode s", "build s",
+                  "in KB", "out KB", "hit", "miss", "retry")
+        rows = [header]
+        for s in stats:
+            rows.append((s.endpoint, s.calls, s.errors, "%.3f" % s.latency.total, "%.1f" % (s.latency.quantile(0.5) * 1e3),
+                         "%.1f" % (s.latency.quantile(0.95) * 1e3), "%.3f" % s.network.total, "%.3f" % s.decode.total,
+                         "%.3f" % s.build.total, "%.1f" % (s.bytes_in / 1024), "%.1f" % (s.bytes_out / 1024),
+                         s.cache_hits, s.cache_misses, s.retries))
+        widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
+        lines = ["  ".join(str(v).ljust(w) if i == 0 else str(v).rjust(w) for i, (v, w) in enumerate(zip(row, widths)))
+                 for row in rows]
+        lines.insert(1, "-" * len(lines[0]))
+        return "\n".join(lines)
+
+class OpenTelemetryExporter(object):
+    """Exports the calls as spans of an OpenTelemetry tracer. Needs ``opentelemetry-api``.
+
+    :param tracer: (optional) The tracer of the spans. Defaults to the ``pGerrit`` tracer of the global provider.
+
+    Usage::
+
+        client = GerritClient("https://xxxx.gerrit.com/", metrics=Metrics(exporters=[OpenTelemetryExporter()]))
+    """
+
+    def __init__(self, tracer=None):
+        """See class docstring."""
+        from opentelemetry import trace
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("pGerrit")
+
+    def export(self, spans):
+        for span in spans:
+            otel_span = self.tracer.start_span(span.name, start_time=span.start_time, attributes=span.attributes)
+            if span.error is not None:
+                otel_span.record_exception(span.error)
+                otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(span.error)))
+            otel_span.end(end_time=span.end_time)
+
+class CollectingExporter(object):
+    """Keeps the exported spans in ``spans``, e.g. to inspect them in tests."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self.spans.extend(spans)
@@ -0,0 +1,123 @@
+# Compact response models.
+# A model is a read-only attribute view over the dict produced by the JSON decoder,
+# nested objects are only wrapped when they are accessed. Models have no instance
+# __dict__, so a decoded response costs one dict per JSON object instead of the
+# dict plus the object built by SimpleNamespace.
+
+class GerritModel(object):
+    """Attribute view over a JSON object returned by Gerrit.
+
+    Unknown fields are still reachable as attributes, ``vars(model)`` returns
+    the underlying dict, like it does for ``SimpleNamespace``.
+    """
+    __slots__ = ("_data",)
+
+    # model of some fields, every other nested object is wrapped into _default
+    _nested = {}
+    _default = None
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getattr__(self, name):
+        if name == "_data":
+            raise AttributeError(name)
+        try:
+            value = self._data[name]
+        except KeyError:
+            raise AttributeError("%s has no attribute %r" % (type(self).__name__, name)) from None
+        return wrap(value, self._nested.get(name, self._default or GerritModel))
+
+    def __setattr__(self, name, value):
+        if name in GerritModel.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            self._data[name] = value
+
+    @property
+    def __dict__(self):
+        return self._data
+
+    def __dir__(self):
+        return list(self._data)
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __eq__(self, other):
+        if isinstance(other, GerritModel):
+            return self._data == other._data
+        return NotImplemented
+
+    def __getstate__(self):
+        return self._data
+
+    def __setstate__(self, data):
+        self._data = data
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join("%s=%r" % (k, getattr(self, k)) for k in self._data))
+
+_maps = {}
+
+def MapOf(model):
+    """Returns the model of a JSON object whose values are all ``model``, e.g. the file map of a revision."""
+    if model not in _maps:
+        name = model.__name__ + "Map"
+        # registered in the module so that maps can be pickled
+        _maps[model] = globals()[name] = type(name, (GerritModel,), {"__slots__": (), "_default": model, "__module__": __name__})
+    return _maps[model]
+
+def wrap(value, model):
+    """Wraps a decoded JSON value into ``model``. Lists are wrapped element by element."""
+    if isinstance(value, dict):
+        return model(value)
+    if isinstance(value, list):
+        return [wrap(v, model) for v in value]
+    return value
+
+class AccountInfo(GerritModel):
+    """`AccountInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-accounts.html#account-info>`__"""
+    __slots__ = ()
+
+class LabelInfo(GerritModel):
+    """`LabelInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#label-info>`__"""
+    __slots__ = ()
+    _nested = {
+        "approved": AccountInfo,
+        "rejected": AccountInfo,
+        "recommended": AccountInfo,
+        "disliked": AccountInfo,
+        "all": AccountInfo,
+    }
+
+class FileInfo(GerritModel):
+    """`FileInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#file-info>`__"""
+    __slots__ = ()
+
+class CommentInfo(GerritModel):
+    """`CommentInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#comment-info>`__"""
+    __slots__ = ()
+    _nested = {
+        "author": AccountInfo,
+    }
+
+class RevisionInfo(GerritModel):
+    """`RevisionInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#revision-info>`__"""
+    __slots__ = ()
+    _nested = {
+        "uploader": AccountInfo,
+        "files": MapOf(FileInfo),
+    }
+
+class ChangeInfo(GerritModel):
+    """`ChangeInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#change-info>`__"""
+    __slots__ = ()
+    _nested = {
+        "owner": AccountInfo,
+        "submitter": AccountInfo,
+        "reviewers": MapOf(AccountInfo),
+        "removable_reviewers": AccountInfo,
+        "labels": MapOf(LabelInfo),
+        "revisions": MapOf(RevisionInfo),
+    }
@@ -1,6 +1,6 @@
 from pGerrit.restAPIwrapper import GerritRest
 from pGerrit.client import GerritClient
-from pGerrit.utils import urljoin, urlformat
+from pGerrit.utils import urljoin, urlformat, paginate, getfield, fields
 
 class GerritProject(GerritClient):
     """Class maps /projects/ endpoint of Gerrit REST API
@@ -14,13 +14,12 @@ class GerritProject(GerritClient):
     _endpoint = "/a/projects/{}"
     _args = ["pj"]
 
-    def __init__(self, host, project, auth=None, verify=True, adapter=None, cache=True, cache_expire=3):
+    def __init__(self, host, project, auth=None, verify=True, adapter=None, cache=True, cache_expire=3, **kwargs):
         """See class docstring."""
-        super().__init__(host, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire)
+        super().__init__(host, auth=auth, verify=verify, adapter=adapter, cache=cache, cache_expire=cache_expire, **kwargs)
         self.pj = project
 
         self.args = [host, project]
-        self.kwargs = {"auth": auth, "verify": verify, "adapter":adapter, "cache":cache, "cache_expire":cache_expire}
 
     @classmethod
     @GerritRest.get()
@@ -41,6 +40,39 @@ class GerritProject(GerritClient):
         """
         return urljoin(cls.host, urlformat(GerritProject._endpoint, ""))
     
+    @classmethod
+    def iter_query(cls, page_size=100, prefetch=True, *args, **kwargs):
+        """Lazily iterates over the projects matching a query, one page at a time.
+
+        Pages are requested with the ``S`` and ``n`` options. Results of the ``query``
+        option come as a list flagged with ``_more_projects``, plain listings come as a
+        map and end with the first page shorter than ``page_size``. ``S`` and ``n`` given by
+        the caller skip projects and bound the total number of projects.
+
+        :param int page_size: (optional) Number of projects requested per page. Defaults to 100.
+        :param bool prefetch: (optional) Fetch the next page in the background while the
+                              current one is consumed. Defaults to True.
+
+        **Return type**: Iterator[`ProjectInfo  <https://gerrit-review.googlesource.com/Documentation/rest-api-projects.html#project-info>`__]
+
+        Usage::
+
+            for project in client.project.iter_query(query="state:active"):
+                print(project.name)
+        """
+        start, limit = kwargs.pop("S", 0), kwargs.pop("n", None)
+
+        def fetch(start, limit):
+            page = GerritProject.query.__func__(cls, *args, S=start, n=limit, **kwargs)
+            return page if isinstance(page, list) else list(fields(page).values())
+
+        def more(items):
+            if "query" in kwargs:
+                return getfield(items[-1], "_more_projects", False)
+            return len(items) >= page_size
+
+        return paginate(fetch, page_size, more, prefetch=prefetch, start=start, limit=limit)
+
     @GerritRest.get()
     @GerritRest.url_wrapper()
     def access(self, *args, **kwargs):
@@ -21,6 +21,15 @@ class GerritChangeQueryDescriptor(QueryDescriptor):
     def query(self, *args, **kwargs):
         return GerritChange.query.__func__(self.factory_obj, *args, **kwargs)
 
+    def iter_query(self, *args, **kwargs):
+        return GerritChange.iter_query.__func__(self.factory_obj, *args, **kwargs)
+
+    def bulk(self, *args, **kwargs):
+        return GerritChange.bulk.__func__(self.factory_obj, *args, **kwargs)
+
+    def graph(self, *args, **kwargs):
+        return GerritChange.graph.__func__(self.factory_obj, *args, **kwargs)
+
     def create(self, payload=None, *args, **kwargs):
         return GerritChange.create.__func__(self.factory_obj, payload=payload, *args, **kwargs)
 
@@ -61,6 +70,9 @@ class GerritChangeReviewerQueryDescriptor(QueryDescriptor):
     def query(self, *args, **kwargs):
         return GerritChangeReviewer.query.__func__(self.factory_obj, *args, **kwargs)
 
+    def iter_query(self, *args, **kwargs):
+        return GerritChangeReviewer.iter_query.__func__(self.factory_obj, *args, **kwargs)
+
     def suggest_reviewers(self, *args, **kwargs):
         return GerritChangeReviewer.suggest_reviewers.__func__(self.factory_obj, *args, **kwargs)
 
@@ -95,6 +107,9 @@ class GerritProjectQueryDescriptor(QueryDescriptor):
     def query(self, *args, **kwargs):
         return GerritProject.query.__func__(self.factory_obj, *args, **kwargs)
 
+    def iter_query(self, *args, **kwargs):
+        return GerritProject.iter_query.__func__(self.factory_obj, *args, **kwargs)
+
     def __call__(self, *args, **kwargs):
         '''
         :return: An instance of GerritProject.
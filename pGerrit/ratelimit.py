@@ -0,0 +1,219 @@
+# Client side rate limiting.
+# Requests go through a token bucket per host, throttling responses (429, and
+# 503 for idempotent requests) are retried after the Retry-After delay while the
+# whole host is paused, and an optional adaptive limit on the requests in flight
+# shrinks when Gerrit slows down and grows back when it recovers.
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+class TokenBucket(object):
+    """
+    Allows ``rate`` requests per second on average, and bursts of up to ``burst`` requests.
+
+    :param float rate: Number of requests per second.
+    :param int burst: (optional) Number of requests allowed at once after a quiet period. Defaults to ``rate``.
+    """
+
+    def __init__(self, rate, burst=None):
+        """See class docstring."""
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.burst
+        self.waited = 0.0
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+                self._last = now
+                if now >= self._paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = max(self._paused_until - now, (1 - self.tokens) / self.rate)
+                self.waited += delay
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Stops every request for ``seconds``, e.g. when the host asks to retry later."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+class AdaptiveConcurrency(object):
+    """
+    Limits the number of requests in flight, adapting the limit to the latency of the host.
+
+    The limit grows by one request per round of successful requests (additive increase),
+    and is cut by ``decrease`` (multiplicative decrease) when requests are throttled or
+    when the average latency rises above ``latency_factor`` times the lowest average seen.
+
+    :param int max_concurrency: (optional) Highest limit. Defaults to 32.
+    :param int min_concurrency: (optional) Lowest limit. Defaults to 1.
+    :param float latency_factor: (optional) Latency rise which is taken as an overload. Defaults to 2.
+    :param float decrease: (optional) Factor applied to the limit on overload. Defaults to 0.7.
+    """
+
+    def __init__(self, max_concurrency=32, min_concurrency=1, latency_factor=2.0, decrease=0.7):
+        """See class docstring."""
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_factor = latency_factor
+        self.decrease = decrease
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.latency = None
+        self.baseline = None
+        self._cooldown = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, throttled=False):
+        """Records the outcome of a request sent after :meth:`acquire`.
+
+        :param float latency: Duration of the request in seconds.
+        :param bool throttled: Whether the host throttled the request.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.baseline = self.latency if self.baseline is None else min(self.baseline, self.latency)
+            overloaded = throttled or self.latency > self.latency_factor * self.baseline
+            if self._cooldown > 0:
+                # give the requests sent with the previous limit time to complete
+                self._cooldown -= 1
+            elif overloaded:
+                self.limit = max(float(self.min_concurrency), self.limit * self.decrease)
+                self._cooldown = int(self.limit)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+def retry_after(response, default):
+    """Returns the delay in seconds asked by the ``Retry-After`` header of a response, or ``default``."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+class Throttle(object):
+    """
+    The rate limit and the throttling handling shared by the transports: a token bucket
+    per host, retries of the throttled requests after their ``Retry-After`` delay and an
+    optional adaptive limit of the requests in flight.
+
+    :param float rate_limit: (optional) Maximum number of requests per second and per host.
+    :param int burst: (optional) Number of requests allowed at once. Defaults to ``rate_limit``.
+    :param adaptive: (optional) True or an :class:`AdaptiveConcurrency` to adapt the number
+                     of requests in flight to the latency of the host.
+    :param int throttle_retries: (optional) Number of retries of a throttled request. Defaults to 5.
+    :param float max_retry_after: (optional) Longest ``Retry-After`` delay honored, a longer one
+                                  fails the request. Defaults to 300 seconds.
+    :param int max_concurrency: (optional) Highest limit of an adaptive concurrency created for ``adaptive=True``.
+    """
+
+    idempotent_methods = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+    def __init__(self, rate_limit=None, burst=None, adaptive=None, throttle_retries=5, max_retry_after=300, max_concurrency=10):
+        """See class docstring."""
+        self.rate_limit = rate_limit
+        self.burst = burst
+        if adaptive is True:
+            adaptive = AdaptiveConcurrency(max_concurrency=max_concurrency)
+        self.adaptive = adaptive or None
+        self.throttle_retries = throttle_retries
+        self.max_retry_after = max_retry_after
+        self.throttled = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        """Returns the token bucket of the host of ``url``."""
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                # without a rate limit the bucket only pauses the host when it asks to
+                bucket = self._buckets[host] = TokenBucket(self.rate_limit or float("inf"), self.burst or 1)
+            return bucket
+
+    def throttled_send(self, method, url, send):
+        """Sends a request with ``send()``, waiting for the rate limit and retrying it while it is throttled.
+
+        :return: The last response, with the number of retries in ``throttle_retries``.
+        """
+        bucket = self.bucket(url)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            if self.adaptive:
+                self.adaptive.acquire()
+            start = time.monotonic()
+            throttled = False
+            try:
+                response = send()
+                throttled = response.status_code == 429 or (response.status_code == 503 and method in self.idempotent_methods)
+            finally:
+                if self.adaptive:
+                    self.adaptive.release(time.monotonic() - start, throttled)
+
+            response.throttle_retries = attempt
+            if not throttled or attempt >= self.throttle_retries:
+                return response
+            delay = retry_after(response, 0.5 * 2 ** attempt)
+            if delay > self.max_retry_after:
+                return response
+            with self._lock:
+                self.throttled += 1
+            response.close()
+            bucket.pause(delay)
+            attempt += 1
+
+class ThrottlingAdapter(Throttle, HTTPAdapter):
+    """
+    A transport adapter honoring the throttling of Gerrit, and optionally limiting the rate
+    and the concurrency of the requests.
+
+    Responses ``429 Too Many Requests`` (and ``503 Service Unavailable`` for idempotent
+    requests) are retried after the delay of their ``Retry-After`` header, or after an
+    exponential backoff, while every request to the host waits.
+
+    :param float rate_limit: (optional) Maximum number of requests per second and per host.
+    :param int burst: (optional) Number of requests allowed at once. Defaults to ``rate_limit``.
+    :param adaptive: (optional) True or an :class:`AdaptiveConcurrency` to adapt the number
+                     of requests in flight to the latency of the host.
+    :param int throttle_retries: (optional) Number of retries of a throttled request. Defaults to 5.
+    :param float max_retry_after: (optional) Longest ``Retry-After`` delay honored, a longer one
+                                  fails the request. Defaults to 300 seconds.
+    :param kwargs: Arguments of ``requests.adapters.HTTPAdapter``.
+    """
+
+    def __init__(self, rate_limit=None, burst=None, adaptive=None, throttle_retries=5, max_retry_after=300, **kwargs):
+        """See class docstring."""
+        Throttle.__init__(self, rate_limit, burst, adaptive, throttle_retries, max_retry_after,
+                          max_concurrency=kwargs.get("pool_maxsize", 10))
+        HTTPAdapter.__init__(self, **kwargs)
+
+    def send(self, request, **kwargs):
+        return self.throttled_send(request.method, request.url, lambda: HTTPAdapter.send(self, request, **kwargs))
@@ -1,44 +1,275 @@
-from functools import wraps
+from functools import wraps, lru_cache
+from urllib.parse import quote
 from types import SimpleNamespace
-from pGerrit.utils import urljoin, urlformat
+from pGerrit.models import GerritModel, wrap
+from pGerrit.decoders import XSSI_PREFIX, strip_xssi, apply_hook, JsonDecoder
+from pGerrit.lazy import split, project, project_all, LazyList, LazyMap
+from pGerrit.cache import ResponseCache
+from pGerrit.stream import Download
+from pGerrit.metrics import NO_CALL, current_call
+from contextlib import nullcontext
 import json
+import re
+import time
 from typing import Callable
 
+_json_decoder = JsonDecoder()
+
+# the metrics context of the calls when they are disabled
+_no_call = nullcontext(NO_CALL)
+
+# splits the url of a change endpoint into the /changes/ url and the change id
+_change_url = re.compile(r"^(.*?/changes/)([^/?]*)")
+
 class GerritRest(object):
     """
     docstring for RestAPI
     """
-    def get(raw=False) -> Callable:
+    def get(raw=False, model=None, base64=False) -> Callable:
         def dec_get(func):
             @wraps(func)
             def decorator_get(self, headers={"Accept":"application/json"}, *args, **kwargs):
-                if raw:
+                if raw or base64:
                     headers = None
+                # options of the client, they are not sent to Gerrit
+                lazy = kwargs.pop("lazy", False)
+                fields = kwargs.pop("fields", None)
+                stream = kwargs.pop("stream", False)
+                # data of a revision only depending on its commit is read with its SHA-1
+                store = getattr(self, "revision_store", None)
+                if store is not None and func.__name__ in store.endpoints and hasattr(self, "resolve"):
+                    self.resolve()
                 url = func(self, headers=headers, *args, **kwargs)
                 url = url if self.session.auth else url.replace("/a/", "/")
-                res = self.session.get(url, headers=headers, verify=self.kwargs["verify"], params=kwargs)
-                res._content = res._content.replace(b")]}'\n", b"")
-                res.raise_for_status()
 
-                if raw:
-                    return res
-                elif res.content == b'':
-                    return res.content
-                else:
-                    return res.json(object_hook=lambda d: SimpleNamespace(**d))
+                if stream:
+                    return Download(self, url, headers, kwargs, base64=base64)
+                with GerritRest.record(self, func, "GET", url) as call:
+                    if raw:
+                        res = GerritRest.send(self, "get", url, headers=headers, verify=self.kwargs["verify"], params=kwargs)
+                        res.raise_for_status()
+                        if res.content.startswith(XSSI_PREFIX):
+                            res._content = res.content[len(XSSI_PREFIX):]
+                        return res
+
+                    body = strip_xssi(GerritRest.fetch(self, url, headers, kwargs))
+                    if base64:
+                        # base64 text, decoded by the caller or by a stream=True download
+                        return str(body, "ascii")
+                    if not body:
+                        return b''
+                    response_model = getattr(self, "response_model", "namespace")
+                    if call is not NO_CALL:
+                        return GerritRest.decode_timed(call, body, response_model, model, getattr(self, "decoder", None), lazy, fields)
+                    if lazy or fields:
+                        return GerritRest.decode_partial(body, response_model, model, getattr(self, "decoder", None), lazy, fields)
+                    return GerritRest.decode(body, response_model, model, getattr(self, "decoder", None))
+            decorator_get._http_method = "GET"
             return decorator_get
         return dec_get
 
+    def fetch(client, url, headers=None, params=None):
+        """Performs a GET request and returns the body, going through the cache of the client.
+
+        An expired cache entry is revalidated with the ETag Gerrit sent for it, so an
+        unchanged response is not downloaded again. Identical requests made at the same
+        time by several threads are only sent once, every caller decodes the shared body.
+        """
+        flight = getattr(client, "single_flight", None)
+        if flight is None:
+            return GerritRest._fetch(client, url, headers, params)
+        body = flight.do(ResponseCache.key(url, params), lambda: GerritRest._fetch(client, url, headers, params))
+        call = current_call() if getattr(client, "metrics", None) is not None else None
+        if call is not None and call.source is None:
+            # another thread sent the request
+            call.source = "coalesced"
+        return body
+
+    def _fetch(client, url, headers=None, params=None):
+        # what served the request is recorded in the metrics of the client
+        call = current_call() if getattr(client, "metrics", None) is not None else None
+        call = call or SimpleNamespace()
+        store = getattr(client, "revision_store", None)
+        store_key = store.key(url, params) if store is not None else None
+        if store_key is not None:
+            body = store.get(store_key)
+            call.source = "store"
+            if body is None:
+                res = GerritRest.send(client, "get", url, headers=headers, verify=client.kwargs["verify"], params=params)
+                res.raise_for_status()
+                body = res.content
+                store.set(store_key, body)
+                call.source = "miss"
+            return body
+
+        cache = getattr(client, "cache", None)
+        if not cache:
+            res = GerritRest.send(client, "get", url, headers=headers, verify=client.kwargs["verify"], params=params)
+            call.source = "network"
+            res.raise_for_status()
+            return res.content
+
+        key = cache.key(url, params)
+        entry = cache.get(key)
+        if entry is not None and entry.fresh():
+            call.source = "hit"
+            return entry.body
+        if entry is not None and entry.etag:
+            headers = dict(headers or {}, **{"If-None-Match": entry.etag})
+
+        res = GerritRest.send(client, "get", url, headers=headers, verify=client.kwargs["verify"], params=params)
+        call.source = "miss"
+        if res.status_code == 304 and entry is not None:
+            cache.refresh(key, entry)
+            call.source = "revalidated"
+            return entry.body
+        res.raise_for_status()
+        cache.set(key, res.content, res.headers.get("ETag"))
+        return res.content
+
+    def send(client, method, url, *args, **kwargs):
+        """Sends a request with the session of the client, recorded in its metrics when enabled."""
+        call = current_call() if getattr(client, "metrics", None) is not None else None
+        if call is None:
+            return getattr(client.session, method)(url, *args, **kwargs)
+        start = time.perf_counter()
+        res = getattr(client.session, method)(url, *args, **kwargs)
+        call.response(res, time.perf_counter() - start)
+        return res
+
+    def record(client, func, method, url):
+        """Returns a context recording a call of ``func`` in the metrics of the client, if enabled."""
+        metrics = getattr(client, "metrics", None)
+        if metrics is None:
+            return _no_call
+        return metrics.record(GerritRest.endpoint(func), method, url)
+
+    def endpoint(func):
+        """Returns the name of an endpoint in the metrics, the template of its url."""
+        f = func
+        while f is not None:
+            route = getattr(f, "_route", None)
+            if route is not None and route.template is not None:
+                return route.template
+            f = getattr(f, "__wrapped__", None)
+        return func.__qualname__
+
+    def http_method(func):
+        """Returns the HTTP method sent by an endpoint method, or None when ``func`` is not an endpoint."""
+        return getattr(getattr(func, "__func__", func), "_http_method", None)
+
+    def invalidate(client, url, res=None):
+        """Drops the cached responses a write to ``url`` may have made stale.
+
+        That is everything cached under the change the url belongs to, and the change queries.
+        A change has several ids and responses are cached under the id of their url. Besides
+        the id of ``url``, the number of a ``project~number`` id is dropped, and when the write
+        response ``res`` is a ChangeInfo, every id it gives. Responses cached under another id,
+        e.g. a Change-Id when a write goes to the number and returns no ChangeInfo, stay until
+        they expire.
+        """
+        cache = getattr(client, "cache", None)
+        m = _change_url.match(url)
+        if not cache or m is None:
+            return
+        changes, change = m.groups()
+        for change in GerritRest.change_ids(change, res) if change else ():
+            cache.delete(changes + change)
+            cache.invalidate(changes + change + "/", changes + change + "?")
+        cache.delete(changes)
+        cache.invalidate(changes + "?")
+
+    def change_ids(change, res=None):
+        """Returns the ids of a change as quoted in urls: ``change`` itself, and the ones
+        known from ``change`` and from the ChangeInfo of the response ``res``, if any."""
+        ids = {change}
+        m = re.match(r"^(.+~)([0-9]+)$", change)
+        if m:
+            ids.add(m.group(2))
+        content = getattr(res, "content", None) if res is not None and res.ok else None
+        if content and content.startswith(XSSI_PREFIX):
+            try:
+                info = _json_decoder.loads(strip_xssi(content))
+            except ValueError:
+                info = None
+            if isinstance(info, dict) and "_number" in info:
+                number = str(info["_number"])
+                ids.add(number)
+                if "project" in info:
+                    ids.add(_quote(info["project"]) + "~" + number)
+                for key in ("id", "change_id"):
+                    if key in info:
+                        ids.add(_quote(str(info[key])))
+        return ids
+
+    def decode(body, response_model, model=None, decoder=None):
+        """Decodes a JSON body according to the ``response_model`` of the client."""
+        decoder = decoder or _json_decoder
+        if response_model == "namespace":
+            return decoder.loads(body, object_hook=lambda d: SimpleNamespace(**d))
+        data = decoder.loads(body)
+        if response_model == "model":
+            return wrap(data, model or GerritModel)
+        return data
+
+    def decode_partial(body, response_model, model=None, decoder=None, lazy=False, fields=None):
+        """Decodes a list or map body element by element.
+
+        With ``lazy`` the elements are only decoded when accessed. With ``fields`` only
+        these fields of every element are kept.
+        """
+        decoder = decoder or _json_decoder
+        if lazy:
+            elements = split(body)
+            if elements is not None:
+                kind, elements = elements
+                # the model of the values of a map response, e.g. FileInfo for the files of a revision
+                item_model = getattr(model, "_default", None) or model if kind == "map" else model
+                def element(raw):
+                    if not fields:
+                        return GerritRest.decode(raw, response_model, item_model, decoder)
+                    return GerritRest.convert(project(decoder.loads(raw), fields), response_model, item_model)
+                return LazyList(elements, element) if kind == "list" else LazyMap(elements, element)
+
+        data = decoder.loads(body)
+        return GerritRest.convert(project_all(data, fields) if fields else data, response_model, model)
+
+    def decode_timed(call, body, response_model, model=None, decoder=None, lazy=False, fields=None):
+        """Decodes a body like :meth:`decode` and :meth:`decode_partial`, timing the JSON decoding
+        and the construction of the response objects separately in the metrics ``call``.
+
+        Lazy elements are decoded when accessed, after the call is recorded.
+        """
+        decoder = decoder or _json_decoder
+        if lazy:
+            with call.timer("decode"):
+                return GerritRest.decode_partial(body, response_model, model, decoder, lazy, fields)
+        with call.timer("decode"):
+            data = decoder.loads(body)
+        with call.timer("build"):
+            return GerritRest.convert(project_all(data, fields) if fields else data, response_model, model)
+
+    def convert(data, response_model, model=None):
+        """Converts plain decoded JSON according to the ``response_model`` of the client."""
+        if response_model == "namespace":
+            return apply_hook(data, lambda d: SimpleNamespace(**d))
+        if response_model == "model":
+            return wrap(data, model or GerritModel)
+        return data
+
     def put(func) -> Callable:
         @wraps(func)
         def decorator_put(self, payload=None, headers={"content-type":"application/json"}, *args, **kwargs):
             url = func(self, payload, headers=headers, *args, **kwargs)
             url = url if self.session.auth else url.replace("/a/", "/")
-            res = self.session.put(url, payload, headers=headers, verify=self.kwargs["verify"], params=kwargs)
-            res.raise_for_status()
+            with GerritRest.record(self, func, "PUT", url):
+                res = GerritRest.send(self, "put", url, payload, headers=headers, verify=self.kwargs["verify"], params=kwargs)
+                GerritRest.invalidate(self, url, res)
+                res.raise_for_status()
             # res._content = res._content.replace(b")]}'\n", b"")
             # des.resultType
             return res
+        decorator_put._http_method = "PUT"
         return decorator_put
 
     def post(func) -> Callable:
@@ -46,11 +277,14 @@ class GerritRest(object):
         def decorator_post(self, payload=None, headers={"content-type":"application/json"}, *args, **kwargs):
             url = func(self, payload, headers=headers, *args, **kwargs)
             url = url if self.session.auth else url.replace("/a/", "/")
-            res = self.session.post(url, json.dumps(payload), headers=headers, verify=self.kwargs["verify"], params=kwargs)
-            res.raise_for_status()         
+            with GerritRest.record(self, func, "POST", url):
+                res = GerritRest.send(self, "post", url, json.dumps(payload), headers=headers, verify=self.kwargs["verify"], params=kwargs)
+                GerritRest.invalidate(self, url, res)
+                res.raise_for_status()
             # res._content = res._content.replace(b")]}'\n", b"")
             # des.resultType
             return res
+        decorator_post._http_method = "POST"
         return decorator_post
 
     def delete(func) -> Callable:
@@ -58,28 +292,48 @@ class GerritRest(object):
         def decorator_delete(self, headers={"Accept":"application/json"}, *args, **kwargs):
             url = func(self, headers=headers, *args, **kwargs)
             url = url if self.session.auth else url.replace("/a/", "/")
-            res = self.session.delete(url, headers=headers, verify=self.kwargs["verify"], params=kwargs)
-            res.raise_for_status()
+            with GerritRest.record(self, func, "DELETE", url):
+                res = GerritRest.send(self, "delete", url, headers=headers, verify=self.kwargs["verify"], params=kwargs)
+                GerritRest.invalidate(self, url, res)
+                res.raise_for_status()
             # res._content = res._content.replace(b")]}'\n", b"")
             # des.resultType
             return res
+        decorator_delete._http_method = "DELETE"
         return decorator_delete
 
     def url_wrapper(end=None) -> Callable:
         def wrapper(func):
             @wraps(func)
             def decorator_url(self, *args, **kwargs):
-                from pGerrit.change import GerritChange, GerritChangeRevision, GerritChangeRevisionFile, GerritChangeEdit, GerritChangeReviewer
-                from pGerrit.project import GerritProject
-                name = end if end != None else func.__name__
-                # find the class defined the method
-                cls_d = eval(func.__qualname__.split(".")[-2])
-                # extend all arguments which need to be inserted into endpoint
-                args = []
-                for arg_name in cls_d._args:
-                    args.append(getattr(self, arg_name))
-
-                return urljoin(self.host, urlformat(cls_d._endpoint, *args), name)
+                return decorator_url._route(self)
+            # compiled by GerritClient.__init_subclass__ once the class defining the method exists
+            decorator_url._route = Route(end if end != None else func.__name__)
             return decorator_url
         return wrapper
 
+@lru_cache(maxsize=4096)
+def _quote(arg):
+    return quote(arg, safe="")
+
+class Route(object):
+    """The url of an endpoint, precompiled from the ``_endpoint`` and ``_args`` of its class.
+
+    Building an url is then a single ``str.format`` of the quoted arguments.
+    """
+    __slots__ = ("name", "template", "args", "_format", "_suffix")
+
+    def __init__(self, name):
+        self.name = name
+        self.template = None
+
+    def compile(self, cls):
+        # same result as urljoin(host, urlformat(cls._endpoint, *args), name)
+        self.template = cls._endpoint.rstrip("/") + "/" + self.name
+        self.args = tuple(getattr(cls, "_args", ()))
+        self._format = cls._endpoint.format
+        self._suffix = "/" + self.name.strip("/") + ("/" if self.name.endswith("/") else "")
+
+    def __call__(self, obj):
+        args = [_quote(str(getattr(obj, arg))) for arg in self.args]
+        return obj.host.rstrip("/") + "/" + self._format(*args).strip("/") + self._suffix
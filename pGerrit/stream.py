@@ -0,0 +1,175 @@
+# Streamed downloads.
+# Large bodies (file downloads, archives, base64 patches and contents) are read
+# chunk by chunk instead of being loaded in memory. A download interrupted by a
+# broken connection resumes with an HTTP range request from the last byte
+# received, conditioned on the ETag of the body with If-Range.
+import binascii
+import os
+
+import requests
+
+CHUNK_SIZE = 64 * 1024
+
+# yielded by Download._iter_from when the body starts again from its first byte
+_RESTART = object()
+
+class Base64Decoder(object):
+    """Decodes base64 data fed in chunks of any size."""
+
+    def __init__(self):
+        self._pending = b""
+
+    def decode(self, chunk):
+        data = self._pending + bytes(chunk).replace(b"\n", b"").replace(b"\r", b"")
+        end = len(data) - len(data) % 4
+        self._pending = data[end:]
+        return binascii.a2b_base64(data[:end]) if end else b""
+
+    def flush(self):
+        if self._pending:
+            raise ValueError("Truncated base64 data")
+        return b""
+
+class Download(object):
+    """
+    A streamed GET response. The request is only sent when the download is iterated or saved.
+
+    Iterating yields the body chunk by chunk, base64 bodies (patches, file contents) are
+    decoded on the fly. When the connection breaks, the download goes on with a range
+    request from the last byte received, up to ``retries`` times. The range request carries
+    the ETag of the body in ``If-Range``: when the body changed in between, e.g. a new patch
+    set of the ``current`` revision, or when the server ignores ranges, the whole body comes
+    again. :meth:`save` and :meth:`read` then start over from the first byte. Iterating skips
+    the bytes already received when the ETag is unchanged, and raises RuntimeError otherwise.
+
+    You won't need to instantiate this Class directly.
+    Pass ``stream=True`` to ``download()``, ``archive()``, ``patch()`` or ``content()``.
+
+    Usage::
+
+        for chunk in file.download(stream=True):
+            sink.write(chunk)
+
+        revision.patch(stream=True).save("change.patch")
+        revision.archive(format="tgz", stream=True).save("change.tgz")
+    """
+
+    def __init__(self, client, url, headers=None, params=None, base64=False, chunk_size=CHUNK_SIZE, retries=3):
+        """See class docstring."""
+        self.client = client
+        self.url = url
+        self.headers = dict(headers or {})
+        self.params = params
+        self.base64 = base64
+        self.chunk_size = chunk_size
+        self.retries = retries
+        # ETag of the body, sent in If-Range when resuming
+        self.etag = None
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def iter_chunks(self, offset=0, restart=None):
+        """Yields the body from byte ``offset`` (of the decoded body), chunk by chunk.
+
+        :param int offset: (optional) Byte of the body to start from. Defaults to 0.
+        :param restart: (optional) Callable dropping the bytes received so far, called when the
+                        whole body comes again instead of the range, the body then goes on from
+                        its first byte. Defaults to None, see the class docstring.
+        """
+        failures = 0
+        while True:
+            try:
+                for chunk in self._iter_from(offset, restart):
+                    if chunk is _RESTART:
+                        offset = 0
+                        continue
+                    offset += len(chunk)
+                    yield chunk
+                return
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                failures += 1
+                if failures > self.retries:
+                    raise
+
+    def _iter_from(self, offset, restart=None):
+        # base64 is resumed from the start of the 4 bytes group encoding the offset
+        start = offset // 3 * 4 if self.base64 else offset
+        skip = offset - start // 4 * 3 if self.base64 else 0
+        headers = dict(self.headers)
+        if start:
+            headers["Range"] = "bytes=%d-" % start
+            if self.etag:
+                headers["If-Range"] = self.etag
+
+        res = self.client.session.get(self.url, headers=headers, params=self.params, verify=self.client.kwargs["verify"], stream=True)
+        try:
+            if res.status_code == 416:
+                # nothing left after offset
+                return
+            res.raise_for_status()
+            etag = res.headers.get("ETag")
+            if start and res.status_code != 206:
+                # the whole body comes again: it changed, or ranges are not supported
+                if restart is not None:
+                    restart()
+                    skip = 0
+                    yield _RESTART
+                elif self.etag is not None and etag != self.etag:
+                    raise RuntimeError("%s changed during the download" % self.url)
+                else:
+                    skip = offset
+            self.etag = etag or self.etag
+
+            decoder = Base64Decoder() if self.base64 else None
+            for chunk in res.iter_content(self.chunk_size):
+                if decoder is not None:
+                    chunk = decoder.decode(chunk)
+                if skip:
+                    chunk, skip = chunk[skip:], max(0, skip - len(chunk))
+                if chunk:
+                    yield chunk
+            if decoder is not None:
+                decoder.flush()
+        finally:
+            res.close()
+
+    def save(self, dest, resume=False):
+        """Writes the body to a file.
+
+        :param dest: A path, or a file-like object opened for binary writing.
+        :param bool resume: (optional) When ``dest`` is a path to an existing file, only download
+                            the bytes after its end, e.g. after a crashed run of the same download.
+                            The start of the file is not checked against the body, only resume
+                            files written by this download. Defaults to False, the file is replaced.
+        :return: The size of the file in bytes.
+        :rtype: int
+        """
+        if hasattr(dest, "write"):
+            seekable = getattr(dest, "seekable", None)
+            return self._write(dest, 0, dest.tell() if seekable and seekable() else None)
+
+        offset = os.path.getsize(dest) if resume and os.path.exists(dest) else 0
+        with open(dest, "ab" if offset else "wb") as f:
+            return self._write(f, offset, 0)
+
+    def _write(self, f, offset, start):
+        # writes the body from offset, the file is truncated at start when the body starts over
+        size = [offset]
+
+        def restart():
+            f.seek(start)
+            f.truncate()
+            size[0] = 0
+
+        for chunk in self.iter_chunks(offset, restart if start is not None else None):
+            f.write(chunk)
+            size[0] += len(chunk)
+        return size[0]
+
+    def read(self):
+        """Returns the whole body. Prefer iterating or :meth:`save` for large bodies."""
+        chunks = []
+        for chunk in self.iter_chunks(restart=chunks.clear):
+            chunks.append(chunk)
+        return b"".join(chunks)
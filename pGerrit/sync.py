@@ -0,0 +1,220 @@
+# Incremental sync of the changes of a host into a local store.
+# Every run only asks Gerrit for the changes updated since the high-water mark
+# of the previous run, the (updated, _number) of the most recently updated
+# change it saw, and merges them into a SQLite file.
+import json
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from pGerrit.client import GerritClient
+from pGerrit.models import ChangeInfo
+from pGerrit.restAPIwrapper import GerritRest
+from pGerrit.utils import timestamp, parse_timestamp
+
+class ChangeStore(object):
+    """
+    A SQLite store of ``ChangeInfo``, keyed by change number.
+
+    :param str path: (optional) Path of the SQLite file. Defaults to an in-memory store.
+
+    Usage::
+
+        store = ChangeStore("changes.sqlite")
+        change = store.get(12345)
+    """
+
+    def __init__(self, path=":memory:"):
+        """See class docstring."""
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS changes (number INTEGER PRIMARY KEY, id TEXT, updated TEXT, data TEXT);
+            CREATE INDEX IF NOT EXISTS changes_updated ON changes (updated);
+            CREATE TABLE IF NOT EXISTS marks (query TEXT PRIMARY KEY, updated TEXT, number INTEGER);
+        """)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+
+    def merge(self, changes):
+        """Inserts or updates changes, given as dicts. A change is only replaced by a more recent version.
+
+        :return: The number of new changes and of updated changes.
+        :rtype: tuple
+        """
+        new = updated = 0
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for change in changes:
+                    number, stamp = change["_number"], change["updated"]
+                    row = self._db.execute("SELECT updated FROM changes WHERE number = ?", (number,)).fetchone()
+                    if row is not None and row[0] >= stamp:
+                        continue
+                    self._store(change)
+                    if row is None:
+                        new += 1
+                    else:
+                        updated += 1
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return new, updated
+
+    def _store(self, change):
+        self._db.execute("INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?)",
+                         (change["_number"], change.get("id"), change["updated"], json.dumps(change)))
+
+    def get(self, number):
+        """Returns the stored change of ``number`` as a dict, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM changes WHERE number = ?", (number,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def changed_since(self, since):
+        """Returns the stored changes updated at or after ``since``, least recently updated first.
+
+        :param since: A datetime, or a timestamp formatted like Gerrit ones.
+        :type since: datetime or str
+        :rtype: list[dict]
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM changes WHERE updated >= ? ORDER BY updated, number",
+                                    (timestamp(since),)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def mark(self, query):
+        """Returns the high-water mark ``(updated, number)`` of a sync query, or None before its first sync."""
+        with self._lock:
+            row = self._db.execute("SELECT updated, number FROM marks WHERE query = ?", (query,)).fetchone()
+        return tuple(row) if row else None
+
+    def set_mark(self, query, updated, number):
+        """Records the high-water mark of a sync query."""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO marks VALUES (?, ?, ?)", (query, updated, number))
+
+    def close(self):
+        self._db.close()
+
+class ChangeSync(object):
+    """
+    Keeps a local store up to date with the changes of a host matching a query.
+
+    The first sync fetches every matching change (or those of the last ``initial_age``).
+    The next ones only ask for the changes updated after the high-water mark recorded
+    by the previous sync, minus ``overlap`` to catch changes indexed late by Gerrit.
+    Changes fetched twice are merged only once. The mark is recorded when a sync
+    completes, so an interrupted sync is done again from the previous mark.
+
+    :param client: The client to query Gerrit with. Its session and settings are shared.
+    :type client: pGerrit.client.GerritClient
+    :param store: (optional) A :class:`ChangeStore`, or the path of its SQLite file. Defaults to an in-memory store.
+    :type store: pGerrit.sync.ChangeStore or str
+    :param str query: (optional) Gerrit search of the synced changes, e.g. ``"project:foo"``. Defaults to every change.
+    :param str initial_age: (optional) Only fetch the changes updated during this age at the first sync, e.g. ``"30d"``.
+    :param timedelta overlap: (optional) How far before the mark the next sync starts. Defaults to one minute.
+    :param int page_size: (optional) Number of changes requested per page. Defaults to 500.
+    :param options: Other options of the query, e.g. ``o=["LABELS"]``.
+
+    Usage::
+
+        sync = ChangeSync(client, "changes.sqlite", query="project:foo")
+        while True:
+            result = sync.sync()
+            print(result.new, "new and", result.updated, "updated changes")
+            for change in sync.changed_since(last_run):
+                ...
+    """
+
+    def __init__(self, client, store=None, query="", initial_age=None, overlap=timedelta(minutes=1), page_size=500, **options):
+        """See class docstring."""
+        self.client = client
+        # the store keeps plain JSON, the results are converted to the response model of the client
+        self._client = GerritClient(client.host, **dict(client.kwargs, cache=False, response_model="dict"))
+        if store is None or isinstance(store, str):
+            store = ChangeStore(store or ":memory:")
+        self.store = store
+        self.query = query
+        self.initial_age = initial_age
+        self.overlap = overlap
+        self.page_size = page_size
+        self.options = options
+
+    @property
+    def mark(self):
+        """The high-water mark ``(updated, number)`` of the last completed sync, or None."""
+        return self.store.mark(self._key())
+
+    def _key(self):
+        return json.dumps([self.query, self.options], sort_keys=True)
+
+    def search(self):
+        """Returns the Gerrit search of the next sync."""
+        terms = [self.query] if self.query else []
+        mark = self.mark
+        if mark is not None:
+            since = parse_timestamp(mark[0]) - self.overlap
+            terms.append('after:"%s +0000"' % timestamp(since))
+        elif self.initial_age:
+            terms.append("-age:%s" % self.initial_age)
+        return " ".join(terms)
+
+    def sync(self):
+        """Fetches the changes updated since the previous sync and merges them into the store.
+
+        :return: A summary with ``fetched``, ``new`` and ``updated`` change counts, ``mark`` and ``seconds``.
+        :rtype: types.SimpleNamespace
+        """
+        start = time.monotonic()
+        mark = self.mark
+        result = SimpleNamespace(fetched=0, new=0, updated=0, mark=mark, seconds=0.0)
+        batch = []
+
+        def flush():
+            new, updated = self.store.merge(batch)
+            result.new += new
+            result.updated += updated
+            batch.clear()
+
+        for change in self._client.change.iter_query(page_size=self.page_size, q=self.search(), **self.options):
+            change.pop("_more_changes", None)
+            batch.append(change)
+            result.fetched += 1
+            key = (change["updated"], change["_number"])
+            if result.mark is None or key > tuple(result.mark):
+                result.mark = key
+            if len(batch) >= self.page_size:
+                flush()
+        flush()
+
+        if result.mark is not None and result.mark != mark:
+            self.store.set_mark(self._key(), *result.mark)
+        result.seconds = time.monotonic() - start
+        return result
+
+    def changed_since(self, since):
+        """Returns the changes of the store updated at or after ``since``, least recently updated first.
+
+        Changes are decoded according to the ``response_model`` of the client.
+
+        :param since: A datetime, or a timestamp formatted like Gerrit ones.
+        :type since: datetime or str
+
+        **Return type**: List[`ChangeInfo <https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#change-info>`__]
+
+        Usage::
+
+            for change in sync.changed_since(datetime.now(timezone.utc) - timedelta(hours=1)):
+                print(change._number, change.subject)
+        """
+        changes = self.store.changed_since(since)
+        return GerritRest.convert(changes, self.client.response_model, ChangeInfo)
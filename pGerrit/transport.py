@@ -0,0 +1,253 @@
+# HTTP transports of the client.
+# Every request of GerritRest goes through ``client.session``, an object with the
+# interface of ``requests.Session``. The default one is a requests session with
+# the throttling adapter, HTTP/1.1 with one connection per request in flight.
+# HttpxSession sends the requests with httpx instead, over HTTP/2 when the host
+# supports it, so that every request in flight shares one connection.
+import asyncio
+import datetime
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from pGerrit.ratelimit import Throttle
+
+TRANSPORTS = ("requests", "httpx", "http2")
+
+def _params(params):
+    # the query string requests would send: None dropped, values as str()
+    result = []
+    for key, value in (params or {}).items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        result += [(key, v if isinstance(v, (str, bytes)) else str(v)) for v in values if v is not None]
+    return result
+
+def _serve(loop):
+    loop.run_forever()
+    loop.close()
+
+class _Body(object):
+    # the ``raw`` of a streamed response, what requests.Response.iter_content() reads
+    retries = None
+
+    def __init__(self, response, run):
+        self._response = response
+        self._run = run
+
+    def stream(self, chunk_size, decode_content=True):
+        import httpx
+
+        chunks = self._response.aiter_bytes(chunk_size)
+        while True:
+            try:
+                yield self._run(chunks.__anext__())
+            except StopAsyncIteration:
+                return
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.ConnectionError(e)
+            except httpx.HTTPError as e:
+                raise requests.exceptions.ChunkedEncodingError(e)
+
+    def close(self):
+        self._run(self._response.aclose())
+
+class HttpxSession(Throttle):
+    """
+    A session sending the requests of the client with `httpx <https://www.python-httpx.org/>`__,
+    over HTTP/2 by default. Many requests in flight at the same time are multiplexed over
+    a single connection per host instead of opening a connection per request.
+
+    It has the subset of the interface of ``requests.Session`` used by the client, and
+    returns ``requests.Response`` objects, so the cache, the streamed downloads and the
+    metrics work the same. Throttled requests, the rate limit and the adaptive concurrency
+    are handled like the default adapter does, and errors are raised as ``requests``
+    exceptions. HTTP/2 needs the ``h2`` package: ``pip install pGerrit[http2]``.
+
+    The connections are driven by an asyncio event loop on a thread of the session, the
+    calling threads wait for their response. The synchronous HTTP/2 connection of httpx
+    can't be shared by threads: two of them may open their streams out of order.
+
+    You won't need to instantiate this Class directly, pass ``transport="http2"`` to
+    :class:`pGerrit.client.GerritClient`.
+
+    :param bool http2: (optional) Set to False to send HTTP/1.1 requests. Defaults to True.
+    :param int pool_maxsize: (optional) Maximum number of connections per host. Defaults to 10.
+    :param int retries: (optional) Number of retries of a failed connection, and of an idempotent
+                        request answered by ``500``, ``502`` or ``504``. Defaults to 5.
+    :param float backoff_factor: (optional) Delay before the first retry, doubled on every retry. Defaults to 0.3.
+    :param float timeout: (optional) Timeout of the connection and of every read in seconds. Defaults to 60.
+    :param kwargs: Arguments of :class:`pGerrit.ratelimit.Throttle`: ``rate_limit``, ``burst``, ``adaptive``...
+
+    Usage::
+
+        client = GerritClient("https://review.example.com", transport="http2", pool_maxsize=32)
+        with ThreadPoolExecutor(32) as executor:
+            changes = list(executor.map(lambda n: client.change(n).detail(), numbers))
+        print(client.session.http_versions)
+    """
+
+    retry_statuses = (500, 502, 504)
+
+    def __init__(self, http2=True, pool_maxsize=10, retries=5, backoff_factor=0.3, timeout=60.0, **kwargs):
+        """See class docstring."""
+        if http2:
+            # without it httpx silently sends HTTP/1.1 requests
+            import h2  # noqa: F401
+        kwargs.setdefault("max_concurrency", pool_maxsize)
+        super().__init__(**kwargs)
+        self.http2 = http2
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.http_versions = {}
+        self._auth = None
+        self._httpx_auth = None
+        self._clients = {}
+        self._loop = None
+
+    def _run(self, coroutine):
+        # runs a coroutine on the event loop of the session and waits for its result
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=_serve, args=(self._loop,), name="pGerrit-httpx", daemon=True).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def _client(self, verify):
+        # an httpx client per value of verify, it is a setting of the connections
+        import httpx
+
+        key = verify if isinstance(verify, (bool, str)) else id(verify)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+                transport = httpx.AsyncHTTPTransport(verify=verify, http2=self.http2, limits=limits, retries=self.retries)
+                client = self._clients[key] = httpx.AsyncClient(transport=transport, timeout=self.timeout, follow_redirects=True)
+            return client
+
+    @property
+    def auth(self):
+        return self._auth
+
+    @auth.setter
+    def auth(self, auth):
+        import httpx
+
+        if auth is None:
+            httpx_auth = None
+        elif isinstance(auth, tuple):
+            httpx_auth = httpx.BasicAuth(*auth)
+        elif isinstance(auth, requests.auth.HTTPDigestAuth):
+            httpx_auth = httpx.DigestAuth(auth.username, auth.password)
+        elif isinstance(auth, requests.auth.HTTPBasicAuth):
+            httpx_auth = httpx.BasicAuth(auth.username, auth.password)
+        elif isinstance(auth, httpx.Auth):
+            httpx_auth = auth
+        else:
+            raise ValueError("The http2 transport supports HTTPBasicAuth, HTTPDigestAuth and httpx.Auth authentication")
+        self._auth, self._httpx_auth = auth, httpx_auth
+
+    def get_adapter(self, url):
+        """Returns the session itself, it holds the throttling state of the default adapter."""
+        return self
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request("PUT", url, data=data, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request("POST", url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def request(self, method, url, params=None, data=None, headers=None, verify=True, stream=False):
+        """Sends a request and returns a ``requests.Response``, like ``requests.Session.request``."""
+        client = self._client(verify)
+        content, form = (None, data) if isinstance(data, dict) else (data, None)
+        request = client.build_request(method, url, params=_params(params), headers=headers, content=content, data=form)
+        return self.throttled_send(method, url, lambda: self._send(client, request, stream))
+
+    async def _fetch(self, client, request, stream):
+        import httpx
+
+        response = await client.send(request, auth=self._httpx_auth or httpx.USE_CLIENT_DEFAULT, stream=True)
+        if not stream:
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        return response
+
+    def _send(self, client, request, stream):
+        import httpx
+
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = self._run(self._fetch(client, request, stream))
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(e)
+            except httpx.TransportError as e:
+                raise requests.exceptions.ConnectionError(e)
+            except httpx.HTTPError as e:
+                raise requests.exceptions.ChunkedEncodingError(e)
+            retry = (response.status_code in self.retry_statuses and request.method in self.idempotent_methods
+                     and attempt < self.retries)
+            if not retry:
+                break
+            if stream:
+                self._run(response.aclose())
+            time.sleep(self.backoff_factor * 2 ** attempt)
+            attempt += 1
+
+        with self._lock:
+            self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+        res = self._convert(request, response, stream)
+        res.elapsed = datetime.timedelta(seconds=time.monotonic() - start)
+        return res
+
+    def _convert(self, request, response, stream):
+        res = requests.Response()
+        res.status_code = response.status_code
+        res.headers = CaseInsensitiveDict(response.headers.multi_items())
+        res.url = str(response.url)
+        res.reason = response.reason_phrase
+        res.encoding = response.charset_encoding
+        res.http_version = response.http_version
+        res.raw = _Body(response, self._run)
+        prepared = requests.PreparedRequest()
+        prepared.method = request.method
+        prepared.url = str(request.url)
+        prepared.headers = CaseInsensitiveDict(request.headers.multi_items())
+        prepared.body = request.content
+        res.request = prepared
+        if not stream:
+            res._content = response.content
+        return res
+
+    def mount(self, prefix, adapter):
+        raise RuntimeError("The http2 transport does not use requests adapters")
+
+    def close(self):
+        """Closes the connections. The session can still be used, it then opens new ones."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        for client in clients:
+            try:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
+            except Exception:
+                # e.g. at interpreter shutdown, the connections are dropped anyway
+                pass
+        loop.call_soon_threadsafe(loop.stop)
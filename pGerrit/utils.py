@@ -1,5 +1,9 @@
 from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timezone
 import re
+import threading
 
 def urljoin(*args):
     return "/".join(map(lambda x: str(x).rstrip('/').lstrip('/'), args)) + ("/" if args[len(args) - 1].endswith("/") else "")
@@ -8,6 +12,122 @@ def urlformat(formattedString, *args):
     args = [quote(str(arg), safe="") for arg in args]
     return formattedString.format(*args)
 
+def is_sha1(revision):
+    """Tells whether a revision id is a full commit SHA-1."""
+    return re.fullmatch(r"[0-9a-f]{40}", str(revision)) is not None
+
+def getfield(obj, name, default=None):
+    """Reads a field of a decoded response, whatever the ``response_model`` of the client."""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+def fields(obj):
+    """Returns the fields of a decoded response as a dict, whatever the ``response_model`` of the client."""
+    return obj if isinstance(obj, dict) else vars(obj)
+
+def plain(value):
+    """Converts a decoded response of any ``response_model`` (namespaces, models, lazy
+    responses...) back to plain JSON data."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, Mapping):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, Sequence):
+        return [plain(v) for v in value]
+    return {k: plain(v) for k, v in vars(value).items()}
+
+def timestamp(value):
+    """Formats a datetime like the timestamps of Gerrit, ``"2024-01-31 12:00:00"`` in UTC.
+
+    Naive datetimes are taken as UTC, strings are returned as they are.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+def parse_timestamp(value):
+    """Parses a timestamp of Gerrit (or a ``YYYY-MM-DD`` date) into a naive UTC datetime."""
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    value = value[:19]
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S" if len(value) > 10 else "%Y-%m-%d")
+
+def paginate(fetch, page_size, has_more, prefetch=False, start=0, limit=None):
+    """Lazily yield the items of a paginated listing.
+
+    :param fetch: Callable ``fetch(start, limit)`` returning the list of items of one page.
+    :param int page_size: Number of items requested per page, None for a listing fetched at once.
+    :param has_more: Callable ``has_more(items)`` telling whether another page follows.
+    :param bool prefetch: (optional) Fetch the next page in a background thread
+                          while the current one is being consumed.
+    :param int start: (optional) Number of items to skip. Defaults to 0.
+    :param int limit: (optional) Maximum number of items to yield, the last page is requested
+                      smaller. Defaults to None, all the items.
+    """
+    end = None if limit is None else start + int(limit)
+
+    def page(offset):
+        if end is None or page_size is None:
+            return fetch(offset, page_size)
+        size = min(page_size, end - offset)
+        return fetch(offset, size) if size > 0 else []
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        start = int(start)
+        items = page(start)
+        while True:
+            more = bool(items) and has_more(items)
+            start += len(items)
+            pending = executor.submit(page, start) if more and executor else None
+            yield from items
+            if not more:
+                return
+            items = pending.result() if pending else page(start)
+    finally:
+        if executor:
+            executor.shutdown(wait=False)
+
+class SingleFlight(object):
+    """Runs a single call at a time per key: concurrent callers of the same key wait for
+    the call in flight and share its result (or its exception) instead of running their own.
+
+    ``calls`` counts every call, ``coalesced`` the ones which were served by another call.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, func):
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
 def parseCookieFile(cookiefile):
     """Parse a cookies.txt file and return a dictionary of key value pairs
     compatible with requests."""
@@ -0,0 +1,512 @@
+# A local stand-in for a Gerrit server, serving synthetic data over HTTPS.
+# It answers the endpoints used by the offline tests and benchmarks, with the
+# )]}' prefix, ETags and an optional latency, and counts the requests it gets.
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
+
+XSSI_PREFIX = b")]}'\n"
+
+def has_openssl():
+    return shutil.which("openssl") is not None
+
+def sha1(*parts):
+    return hashlib.sha1("/".join(map(str, parts)).encode()).hexdigest()
+
+class FakeGerrit(object):
+    """
+    :param int changes: Number of changes of the host.
+    :param int files: Number of files of every revision.
+    :param float latency: Seconds to wait before answering every request.
+    :param int page_limit: Maximum number of changes returned by a query.
+    :param int chain: Length of the stacks of changes, every change of a stack depends on the previous one.
+    :param bool http2: Serve HTTP/2 to the clients asking for it. Needs the ``h2`` package.
+
+    Usage::
+
+        with FakeGerrit(changes=100) as gerrit:
+            client = GerritClient(gerrit.url, verify=False)
+    """
+
+    def __init__(self, changes=50, files=5, latency=0.0, page_limit=500, chain=1, http2=False):
+        self.changes = changes
+        self.files = files
+        self.latency = latency
+        self.page_limit = page_limit
+        self.chain = chain
+        self.http2 = http2
+        # number of connections accepted
+        self.connections = 0
+        # comments added by the tests: {(change number, "comments" | "robotcomments" | "drafts"): [(path, CommentInfo)]}
+        self.comments = {}
+        # send the blob SHA-1 of the files in FileInfo.new_sha, like Gerrit 3.9+
+        self.blob_shas = True
+        # sets of changes submitted together, like the changes of a topic
+        self.bundles = []
+        self.requests = Counter()
+        self.topics = {}
+        self.updated = {}
+        # current patch set of the changes uploaded by the tests, 2 for the other changes
+        self.patch_sets = {}
+        # cut the connection of the next streamed body after this number of bytes
+        self.cut_after = None
+        self.ranges = True
+        # answer the next requests with this status, e.g. 429, and a Retry-After header
+        self.throttle = 0
+        self.throttle_status = 429
+        self.retry_after = "0"
+        # answer the change queries matching this regular expression with 400, like a bad search
+        self.reject_queries = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._dir = None
+
+    # --- data -------------------------------------------------------------
+
+    def change_info(self, number):
+        return {
+            "id": "project~master~I%040x" % number,
+            "project": self.project_of(number),
+            "branch": "master",
+            "topic": self.topics.get(number, "topic-%d" % (number % 3)),
+            "change_id": "I%040x" % number,
+            "subject": "Change %d" % number,
+            "status": "NEW" if number % 2 else "MERGED",
+            "updated": self.updated_of(number),
+            "_number": number,
+            "owner": {"_account_id": 1000 + number % 7, "name": "User %d" % (number % 7)},
+            "labels": {"Code-Review": {"all": [{"_account_id": 1000, "value": 1}]}},
+            "current_revision": self.revision_sha(number, self.patch_sets.get(number, 2)),
+        }
+
+    def updated_of(self, number):
+        # one change per hour from 2024-01-01, until it is written to
+        if number in self.updated:
+            return self.updated[number]
+        return (datetime(2024, 1, 1) + timedelta(hours=number)).strftime("%Y-%m-%d %H:%M:%S.000000000")
+
+    def project_of(self, number):
+        return "project/%d" % (number % 5)
+
+    def projects(self):
+        return sorted({self.project_of(n) for n in range(self.changes)})
+
+    def matches(self, number, q):
+        """Supports the project:, status:, after: and before: operators of the search."""
+        for name, quoted, value in re.findall(r'(\w+):(?:"([^"]*)"|(\S+))', q):
+            value = (quoted or value)[:19]
+            updated = self.updated_of(number)[:19]
+            if name == "project" and self.project_of(number) != value:
+                return False
+            if name == "status" and self.change_info(number)["status"] != value.upper():
+                return False
+            if name == "after" and updated < value:
+                return False
+            if name == "before" and updated > value:
+                return False
+        return True
+
+    def parent_of(self, number):
+        return number - 1 if self.chain > 1 and number % self.chain else None
+
+    def parent_sha(self, number):
+        parent = self.parent_of(number)
+        return sha1("parent", number) if parent is None else self.revision_sha(parent, 2)
+
+    def stack_of(self, number):
+        start = number - number % self.chain
+        return list(range(start, min(start + self.chain, self.changes)))
+
+    def related_of(self, number):
+        if self.chain <= 1:
+            return {"changes": []}
+        # most recent descendant first, like Gerrit
+        return {"changes": [{"project": self.project_of(n), "change_id": "I%040x" % n, "_change_number": n,
+                             "_revision_number": 2, "_current_revision_number": 2,
+                             "status": self.change_info(n)["status"],
+                             "commit": {"commit": self.revision_sha(n, 2), "parents": [{"commit": self.parent_sha(n)}]}}
+                            for n in reversed(self.stack_of(number))]}
+
+    def submitted_together_of(self, number):
+        def ancestors(n):
+            return [m for m in self.stack_of(n) if m <= n]
+        together = set(ancestors(number))
+        for bundle in self.bundles:
+            if number in bundle:
+                for n in bundle:
+                    together.update(ancestors(n))
+        return [self.change_info(n) for n in sorted(together, reverse=True)] if len(together) > 1 else []
+
+    def comments_of(self, number, kind="comments"):
+        comments = {}
+        if kind == "comments":
+            comments["/COMMIT_MSG"] = [{"id": "c%d" % number, "line": 1, "message": "hi", "unresolved": True,
+                                        "updated": "2024-01-01 00:00:00.000000000", "patch_set": 1,
+                                        "author": {"_account_id": 1000}}]
+        with self._lock:
+            for path, comment in self.comments.get((number, kind), []):
+                comments.setdefault(path, []).append(comment)
+        return comments
+
+    def add_comment(self, number, path, comment, kind="comments"):
+        with self._lock:
+            self.comments.setdefault((number, kind), []).append((path, comment))
+            self.updated[number] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f000")
+
+    def reviewers_of(self, number):
+        return [{"_account_id": 2000 + (number + r) % 4, "name": "Reviewer %d" % ((number + r) % 4),
+                 "email": "reviewer%d@example.com" % ((number + r) % 4), "approvals": {"Code-Review": "+1"}}
+                for r in range(2)]
+
+    def patch(self, number, revision):
+        return b"".join(b"patch line %d of %s\n" % (i, revision.encode()) for i in range(500))
+
+    def revision_sha(self, number, patchset):
+        return sha1("change", number, patchset)
+
+    def file_names(self):
+        return ["/COMMIT_MSG"] + ["src/file_%d.txt" % f for f in range(self.files - 2)] + ["img/logo.png"]
+
+    def file_content(self, number, revision, name):
+        if name.endswith(".png"):
+            return bytes(range(256)) * 4
+        return ("content of %s in %s of change %d\n" % (name, revision, number)).encode() * 20
+
+    def files_info(self, number, revision):
+        files = {}
+        for name in self.file_names():
+            content = self.file_content(number, revision, name)
+            info = {"status": "M", "lines_inserted": 3, "size": len(content)}
+            if self.blob_shas:
+                info["new_sha"] = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+            if name.endswith(".png"):
+                info["binary"] = True
+            files[name] = info
+        return files
+
+    # --- routing ----------------------------------------------------------
+
+    def resolve(self, number, revision):
+        if revision == "current":
+            return self.revision_sha(number, self.patch_sets.get(number, 2))
+        if revision.isdigit():
+            return self.revision_sha(number, int(revision))
+        return revision
+
+    def route(self, method, path, query):
+        """Returns (status, body, content type) of a request."""
+        m = re.match(r"^/changes/?$", path)
+        if m and method == "GET":
+            start = int(query.get("S", ["0"])[0])
+            limit = min(int(query.get("n", [str(self.page_limit)])[0]), self.page_limit)
+            q = query.get("q", [""])[0]
+            if self.reject_queries and re.search(self.reject_queries, q):
+                return 400, None, None
+            # most recently updated first, like Gerrit
+            numbers = [n for n in range(self.changes) if self.matches(n, q)]
+            numbers.sort(key=lambda n: (self.updated_of(n), n), reverse=True)
+            changes = [self.change_info(n) for n in numbers[start:start + limit]]
+            if changes and start + limit < len(numbers):
+                changes[-1]["_more_changes"] = True
+            return 200, changes, None
+
+        if re.match(r"^/projects/?$", path) and method == "GET":
+            start = int(query.get("S", ["0"])[0])
+            limit = int(query.get("n", ["0"])[0]) or None
+            names = self.projects()[start:start + limit if limit else None]
+            return 200, {name: {"id": quote(name, safe=""), "state": "ACTIVE"} for name in names}, None
+
+        m = re.match(r"^/changes/([^/]+)(?:/(.*))?$", path)
+        if not m:
+            return 404, None, None
+        change = unquote(m.group(1)).split("~")[-1]
+        # a change number, or a Change-Id: I followed by the number in hex
+        number = int(change[1:], 16) if change.startswith("I") else int(change)
+        if number >= self.changes:
+            return 404, None, None
+        rest = m.group(2) or ""
+
+        if method != "GET":
+            with self._lock:
+                if rest == "topic":
+                    self.topics[number] = "updated"
+                self.updated[number] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f000")
+            if rest in ("rebase", "merge"):
+                return 200, self.change_info(number), None
+            return 200, {}, None
+
+        if rest in ("", "detail"):
+            return 200, self.change_info(number), None
+        if rest == "topic":
+            return 200, self.change_info(number)["topic"], None
+        if rest == "submitted_together":
+            return 200, self.submitted_together_of(number), None
+        if rest == "reviewers/":
+            return 200, self.reviewers_of(number), None
+        if rest in ("comments", "robotcomments", "drafts"):
+            return 200, self.comments_of(number, rest), None
+
+        m = re.match(r"^revisions/([^/]+)(?:/(.*))?$", rest)
+        if not m:
+            return 404, None, None
+        revision = self.resolve(number, m.group(1))
+        rest = m.group(2) or ""
+        if rest == "commit":
+            return 200, {"commit": revision, "parents": [{"commit": self.parent_sha(number)}], "subject": "Change %d" % number}, None
+        if rest == "related":
+            return 200, self.related_of(number), None
+        if rest == "files":
+            return 200, self.files_info(number, revision), None
+        if rest == "patch":
+            return 200, base64.b64encode(self.patch(number, revision)), "text/plain"
+        if rest == "archive":
+            return 200, self.patch(number, revision) * 100, "application/x-gzip"
+
+        m = re.match(r"^files/([^/]+)/(content|download|diff)$", rest)
+        if not m:
+            return 404, None, None
+        name = unquote(m.group(1))
+        if name not in self.file_names():
+            return 404, None, None
+        # ?parent=1 asks for the content in the base of the revision
+        content = self.file_content(number, "base" if "parent" in query else revision, name)
+        if m.group(2) == "content":
+            return 200, base64.b64encode(content), "text/plain"
+        if m.group(2) == "download":
+            return 200, content, "application/octet-stream"
+        return 200, {"change_type": "MODIFIED", "content": [{"ab": content.decode(errors="replace").splitlines()}]}, None
+
+    # --- server -----------------------------------------------------------
+
+    def start(self):
+        self._dir = tempfile.mkdtemp()
+        cert, key = os.path.join(self._dir, "cert.pem"), os.path.join(self._dir, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                        "-days", "1", "-subj", "/CN=localhost"], check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+
+        if self.http2:
+            # clients offering h2 get HTTP/2, the others HTTP/1.1
+            context.set_alpn_protocols(["h2", "http/1.1"])
+        self._server = _Server(self, context)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = "https://127.0.0.1:%d/" % self._server.server_address[1]
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, pattern=""):
+        """Number of requests whose ``METHOD path`` matches ``pattern``."""
+        with self._lock:
+            return sum(n for request, n in self.requests.items() if re.search(pattern, request))
+
+def _respond(gerrit, method, path, headers):
+    # the answer to a request: (status, headers, body, bytes sent before cutting the connection or None)
+    url = urlparse(path)
+    with gerrit._lock:
+        gerrit.requests["%s %s" % (method, path)] += 1
+    if gerrit.latency:
+        time.sleep(gerrit.latency)
+    with gerrit._lock:
+        throttled = gerrit.throttle > 0
+        gerrit.throttle -= throttled
+    if throttled:
+        return _answer(gerrit, gerrit.throttle_status, b"Too many requests\n", "text/plain",
+                       headers={"Retry-After": gerrit.retry_after} if gerrit.retry_after else None)
+
+    status, data, content_type = gerrit.route(method, url.path, parse_qs(url.query))
+    if status != 200:
+        return _answer(gerrit, status, b"Not found\n", "text/plain")
+    if content_type is None:
+        body = XSSI_PREFIX + json.dumps(data).encode()
+        content_type = "application/json; charset=UTF-8"
+    else:
+        body = data
+
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    if method == "GET" and headers.get("If-None-Match") == etag:
+        return _answer(gerrit, 304, b"", content_type, etag)
+
+    m = re.match(r"bytes=(\d+)-$", headers.get("Range", ""))
+    # If-Range: the range of this version of the body, or else the whole new body
+    if_range = headers.get("If-Range")
+    if m and gerrit.ranges and if_range in (None, etag) and not content_type.startswith("application/json"):
+        start = int(m.group(1))
+        if start >= len(body):
+            return _answer(gerrit, 416, b"", content_type)
+        return _answer(gerrit, 206, body[start:], content_type, etag,
+                       {"Content-Range": "bytes %d-%d/%d" % (start, len(body) - 1, len(body))})
+    return _answer(gerrit, 200, body, content_type, etag if method == "GET" else None)
+
+def _answer(gerrit, status, body, content_type, etag=None, headers=None):
+    fields = {"Content-Type": content_type, "Content-Length": str(len(body))}
+    if etag:
+        fields["ETag"] = etag
+    fields.update(headers or {})
+    with gerrit._lock:
+        cut, gerrit.cut_after = gerrit.cut_after, None
+    return status, fields, body, cut if cut is not None and cut < len(body) else None
+
+def _handler(gerrit):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def handle_request(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            status, headers, body, cut = _respond(gerrit, method, self.path, self.headers)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if cut is not None:
+                self.wfile.write(body[:cut])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def do_PUT(self):
+            self.handle_request("PUT")
+
+        def do_DELETE(self):
+            self.handle_request("DELETE")
+
+    return Handler
+
+class _H2Connection(object):
+    # serves the streams of an HTTP/2 connection, every request on its own thread
+    def __init__(self, gerrit, sock):
+        import h2.config
+        import h2.connection
+
+        self.gerrit = gerrit
+        self.sock = sock
+        self.conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        self.window = threading.Condition()
+        self.closed = False
+
+    def flush(self):
+        # called with the window lock held
+        data = self.conn.data_to_send()
+        if data:
+            self.sock.sendall(data)
+
+    def serve(self):
+        import h2.events
+
+        with self.window:
+            self.conn.initiate_connection()
+            self.flush()
+        requests = {}
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                with self.window:
+                    events = self.conn.receive_data(data)
+                    for event in events:
+                        if isinstance(event, h2.events.RequestReceived):
+                            requests[event.stream_id] = dict(event.headers)
+                        elif isinstance(event, h2.events.DataReceived):
+                            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            headers = requests.pop(event.stream_id)
+                            threading.Thread(target=self.answer, args=(event.stream_id, headers), daemon=True).start()
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+                    self.flush()
+                    self.window.notify_all()
+        except (OSError, ssl.SSLError):
+            pass
+        finally:
+            with self.window:
+                self.closed = True
+                self.window.notify_all()
+            self.sock.close()
+
+    def answer(self, stream_id, headers):
+        fields = {name.title(): value for name, value in headers.items() if not name.startswith(":")}
+        status, response_headers, body, cut = _respond(self.gerrit, headers[":method"], headers[":path"], fields)
+        try:
+            with self.window:
+                self.conn.send_headers(stream_id, [(":status", str(status))] +
+                                       [(name.lower(), value) for name, value in response_headers.items()])
+                self.flush()
+            data = body[:cut] if cut is not None else body
+            while True:
+                with self.window:
+                    if not data:
+                        # a cut body ends with a reset of its stream
+                        if cut is not None:
+                            self.conn.reset_stream(stream_id)
+                        else:
+                            self.conn.send_data(stream_id, b"", end_stream=True)
+                        self.flush()
+                        return
+                    size = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size, len(data))
+                    if size <= 0:
+                        # wait for the client to open the window
+                        if self.closed:
+                            return
+                        self.window.wait()
+                        continue
+                    last = size == len(data) and cut is None
+                    self.conn.send_data(stream_id, data[:size], end_stream=last)
+                    self.flush()
+                if last:
+                    return
+                data = data[size:]
+        except Exception:
+            # the connection was closed by the client
+            pass
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, gerrit, context):
+        super().__init__(("127.0.0.1", 0), _handler(gerrit))
+        self.gerrit = gerrit
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+
+    def finish_request(self, request, client_address):
+        with self.gerrit._lock:
+            self.gerrit.connections += 1
+        if request.selected_alpn_protocol() == "h2":
+            _H2Connection(self.gerrit, request).serve()
+        else:
+            super().finish_request(request, client_address)
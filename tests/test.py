@@ -11,9 +11,6 @@ from requests.auth import HTTPBasicAuth
 from pGerrit.utils import urljoin
 from types import SimpleNamespace
 
-import requests_cache
-requests_cache.disabled()
-
 # To run this test, User need to set environment variable below, the change should match following status in order to pass all tests
 # 1. change should be in master branch
 # 2. change is already merged
@@ -64,6 +61,23 @@ class TestChange(unittest.TestCase):
         for result in results:
             self.assertIsInstance(result, SimpleNamespace)
 
+    def testChangeIterQuery(self):
+        results = list(self.client.change.iter_query(q="owner:self", page_size=2, prefetch=True))
+        self.assertGreater(len(results), 0)
+        numbers = [result._number for result in results]
+        self.assertEqual(len(numbers), len(set(numbers)))
+        for result in results:
+            self.assertIsInstance(result, SimpleNamespace)
+
+    def testChangeBulk(self):
+        results = self.client.change.bulk([g_id, g_id], fields=["detail", "files", "comments"], workers=4)
+        self.assertEqual(list(results), [g_id])
+        result = results[g_id]
+        self.assertEqual(result.errors, {})
+        self.assertIsInstance(result.detail, SimpleNamespace)
+        self.assertIsInstance(result.files, SimpleNamespace)
+        self.assertIsInstance(result.comments, SimpleNamespace)
+
     def testChangeCreate(self):
         createChange = self.client.change.create(payload={
             "project": "test-for-hook",
@@ -410,6 +424,12 @@ class TestProject(unittest.TestCase):
         for result in results:
             self.assertIsInstance(result, SimpleNamespace)
 
+    def testProjectIterQuery(self):
+        results = list(self.client.project.iter_query(query=g_pj, page_size=1))
+        self.assertGreater(len(results), 0)
+        for result in results:
+            self.assertIsInstance(result, SimpleNamespace)
+
     def testProjectAccess(self):
         access = self.project.access()
         self.assertIsInstance(access, SimpleNamespace)
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import unittest
+import warnings
+
+from pGerrit.aio import AsyncGerritClient
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestAsyncClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=20).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+
+    def testCalls(self):
+        async def main():
+            async with AsyncGerritClient(self.gerrit.url, verify=False, max_concurrency=4) as client:
+                changes = await client.change.query(q="", n=20)
+                details = await asyncio.gather(*[client.change(c._number).detail() for c in changes])
+                files = await client.change(1).current_revision().files()
+                return changes, details, files
+
+        changes, details, files = asyncio.run(main())
+        self.assertEqual(len(changes), 20)
+        self.assertEqual(sorted(d._number for d in details), list(range(20)))
+        self.assertIn("/COMMIT_MSG", vars(files))
+
+    def record_threads(self, client):
+        # names of the threads sending requests with the session of the client
+        session, threads = client.client.session, []
+        get = session.get
+
+        def recording_get(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return get(*args, **kwargs)
+
+        session.get = recording_get
+        self.addCleanup(lambda: vars(session).pop("get", None))
+        return threads
+
+    def testIterQuery(self):
+        client = AsyncGerritClient(self.gerrit.url, verify=False, cache=False, max_concurrency=2)
+        threads = self.record_threads(client)
+
+        async def main():
+            numbers = []
+            async for change in await client.change.iter_query(q="", page_size=7, prefetch=False):
+                numbers.append(change._number)
+            return numbers
+
+        try:
+            self.assertEqual(sorted(asyncio.run(main())), list(range(20)))
+        finally:
+            client.close()
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(all(name.startswith("pGerrit") for name in threads), threads)
+
+    def testStreamedDownload(self):
+        client = AsyncGerritClient(self.gerrit.url, verify=False, cache=False)
+        patch = self.gerrit.patch(1, self.gerrit.revision_sha(1, 2))
+        threads = self.record_threads(client)
+
+        async def main():
+            download = await client.change(1).current_revision().patch(stream=True)
+            download.download.chunk_size = 1000
+            chunks = [chunk async for chunk in download]
+            return chunks, await download.read()
+
+        try:
+            chunks, body = asyncio.run(main())
+        finally:
+            client.close()
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), patch)
+        self.assertEqual(body, patch)
+        self.assertTrue(all(name.startswith("pGerrit") for name in threads), threads)
+
+    def testConcurrencyBound(self):
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+        client = AsyncGerritClient(self.gerrit.url, verify=False, cache=False, coalesce=False, max_concurrency=2)
+        self.gerrit.latency = 0.02
+
+        def call(n):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            try:
+                return client.client.change(n).detail()
+            finally:
+                with lock:
+                    in_flight[0] -= 1
+
+        async def main():
+            return await asyncio.gather(*[client._run(call, n) for n in range(8)])
+
+        try:
+            self.assertEqual(len(asyncio.run(main())), 8)
+        finally:
+            self.gerrit.latency = 0
+        self.assertEqual(peak[0], 2)
+        client.close()
+
+    def testSeveralEventLoops(self):
+        # the client is not bound to the loop of its first call
+        client = AsyncGerritClient(self.gerrit.url, verify=False, max_concurrency=2)
+
+        async def main(n):
+            return await asyncio.gather(*[client.change(i).detail() for i in range(n, n + 4)])
+
+        try:
+            for n in (0, 4, 8):
+                self.assertEqual([d._number for d in asyncio.run(main(n))], list(range(n, n + 4)))
+        finally:
+            client.close()
+
+if __name__ == '__main__':
+    unittest.main()
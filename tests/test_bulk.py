@@ -0,0 +1,60 @@
+import unittest
+import warnings
+
+import requests
+
+from pGerrit.client import GerritClient
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestBulk(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.client = GerritClient(self.gerrit.url, verify=False, cache=False, coalesce=False)
+        self.gerrit.requests.clear()
+
+    def testFields(self):
+        results = self.client.change.bulk([1, 2], fields=["detail", "files", "commit", "topic"], workers=4)
+        self.assertEqual(sorted(results), [1, 2])
+        for number, result in results.items():
+            self.assertEqual(result.errors, {})
+            self.assertEqual(result.detail._number, number)
+            self.assertIn("/COMMIT_MSG", vars(result.files))
+            self.assertEqual(result.commit.subject, "Change %d" % number)
+            self.assertEqual(result.topic, "topic-%d" % (number % 3))
+
+    def testDedup(self):
+        # every url is requested once, whatever the number of changes or fields asking for it
+        results = self.client.change.bulk([3, 4, 3, "4"], fields=["detail", "detail", "files"], workers=4)
+        self.assertEqual(sorted(results, key=str), [3, 4, "4"])
+        self.assertEqual(results[4].detail, results["4"].detail)
+        self.assertEqual(self.gerrit.count("^GET /changes/3/detail$"), 1)
+        self.assertEqual(self.gerrit.count("^GET /changes/4/detail$"), 1)
+        self.assertEqual(self.gerrit.count("^GET /changes/3/revisions/current/files"), 1)
+
+    def testErrors(self):
+        results = self.client.change.bulk([5, 99], fields=["detail", "topic"], workers=4)
+        self.assertEqual(results[5].errors, {})
+        self.assertEqual(results[5].detail._number, 5)
+        self.assertEqual(sorted(results[99].errors), ["detail", "topic"])
+        self.assertIsInstance(results[99].errors["detail"], requests.exceptions.HTTPError)
+        self.assertIsNone(results[99].detail)
+
+    def testOnlyGetEndpoints(self):
+        for fields in (["detail", "delete_change"], ["merge"], ["set_topic"], ["abandon"], ["current_revision"],
+                       ["query"]):
+            with self.subTest(fields=fields):
+                with self.assertRaises(ValueError):
+                    self.client.change.bulk([3, 4], fields=fields)
+        self.assertEqual(self.gerrit.count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
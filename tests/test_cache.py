@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import warnings
+
+from pGerrit.cache import NEVER_EXPIRE, ResponseCache
+from pGerrit.client import GerritClient
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+SHA = "0123456789abcdef0123456789abcdef01234567"
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def testLruEviction(self):
+        cache = ResponseCache(max_size=30)
+        for key in "abc":
+            cache.set(key, b"x" * 10)
+        cache.get("a")
+        cache.set("d", b"x" * 10)
+        # b is the least recently used entry
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual([k for k in "acd" if cache.get(k) is not None], ["a", "c", "d"])
+        self.assertEqual(cache.size, 30)
+        cache.set("e", b"x" * 25)
+        self.assertEqual(cache.size, 25)
+        self.assertIsNotNone(cache.get("e"))
+
+    def testExpiration(self):
+        cache = ResponseCache(expire_after=0, urls_expire_after={r"/detail$": 60})
+        self.assertFalse(cache.set("https://h/changes/1/detail?o=X", b"{}").fresh())
+        self.assertTrue(cache.set("https://h/changes/1/detail", b"{}").fresh())
+        # data of a revision addressed by its SHA-1 never expires
+        for endpoint in ("commit", "patch", "files", "files/a%2Fb.c/content"):
+            entry = cache.set("https://h/changes/1/revisions/%s/%s" % (SHA, endpoint), b"{}")
+            self.assertEqual(entry.expires, NEVER_EXPIRE, endpoint)
+        self.assertFalse(cache.set("https://h/changes/1/revisions/current/commit", b"{}").fresh())
+
+    def testRefresh(self):
+        cache = ResponseCache(expire_after=0)
+        entry = cache.set("k", b"body", '"etag"')
+        self.assertFalse(cache.get("k").fresh())
+        cache.expire_after = 60
+        cache.refresh("k", entry)
+        self.assertTrue(cache.get("k").fresh())
+        self.assertEqual((cache.revalidated, cache.hits, cache.misses), (1, 1, 1))
+
+    def testPersistence(self):
+        path = os.path.join(self.dir, "cache.sqlite")
+        cache = ResponseCache(path=path, expire_after=60)
+        cache.set("https://h/changes/1", b"one", '"1"')
+        cache.set("https://h/changes/2", b"two")
+        cache.invalidate("https://h/changes/2")
+
+        again = ResponseCache(path=path, expire_after=60)
+        entry = again.get("https://h/changes/1")
+        self.assertEqual((entry.body, entry.etag), (b"one", '"1"'))
+        self.assertTrue(entry.fresh())
+        self.assertIsNone(again.get("https://h/changes/2"))
+
+    def testPersistedSizeBound(self):
+        path = os.path.join(self.dir, "cache.sqlite")
+        cache = ResponseCache(path=path, max_size=20)
+        for key in "abc":
+            cache.set(key, b"x" * 10)
+            time.sleep(0.01)
+        # only the most recently stored responses are kept on disk
+        again = ResponseCache(path=path, max_size=20)
+        self.assertEqual([k for k in "abc" if again.get(k) is not None], ["b", "c"])
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestClientCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.dir = tempfile.mkdtemp()
+        self.gerrit.requests.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def testRevalidation(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache_expire=0, coalesce=False)
+        first = client.change(1).detail()
+        second = client.change(1).detail()
+        self.assertEqual(second.subject, first.subject)
+        # the expired entry was sent with its ETag, Gerrit answered 304 and the cached body was used
+        self.assertEqual(self.gerrit.count("/changes/1/detail"), 2)
+        self.assertEqual(client.cache.revalidated, 1)
+
+    def testFreshEntries(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache_expire=60)
+        client.change(2).detail()
+        client.change(2).detail()
+        self.assertEqual(self.gerrit.count("/changes/2/detail"), 1)
+        self.assertEqual(client.cache.hits, 1)
+
+    def testNeverExpire(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache_expire=0)
+        sha = self.gerrit.revision_sha(3, 2)
+        for _ in range(3):
+            client.change(3).revision(sha).commit()
+        self.assertEqual(self.gerrit.count("/revisions/%s/commit" % sha), 1)
+
+    def testCacheSize(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache_expire=60, cache_size=1)
+        client.change(4).detail()
+        client.change(4).detail()
+        # bodies larger than the cache are not kept
+        self.assertEqual(self.gerrit.count("/changes/4/detail"), 2)
+        self.assertEqual(client.cache.size, 0)
+
+    def testInvalidation(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache_expire=60)
+        ids = [6, "project/1~6", "I%040x" % 6]
+        for id in ids:
+            client.change(id).detail()
+        count = lambda: self.gerrit.count("/detail$")
+
+        # the number of a project~number id is known from the url
+        client.change("project/1~6").set_topic({"topic": "x"})
+        before = count()
+        for id in ids:
+            client.change(id).detail()
+        self.assertEqual(count(), before + 2)
+
+        # the ChangeInfo returned by the write gives the other ids
+        client.change(6).rebase()
+        before = count()
+        for id in ids:
+            client.change(id).detail()
+        self.assertEqual(count(), before + 3)
+
+    def testCachePath(self):
+        path = os.path.join(self.dir, "cache.sqlite")
+        GerritClient(self.gerrit.url, verify=False, cache_expire=60, cache_path=path).change(5).detail()
+        detail = GerritClient(self.gerrit.url, verify=False, cache_expire=60, cache_path=path).change(5).detail()
+        self.assertEqual(detail._number, 5)
+        self.assertEqual(self.gerrit.count("/changes/5/detail"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
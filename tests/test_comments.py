@@ -0,0 +1,89 @@
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from pGerrit.comments import CommentIndex
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+def comment(id, updated, unresolved=False, in_reply_to=None, line=3, patch_set=1, message="hello"):
+    data = {"id": id, "line": line, "patch_set": patch_set, "message": message, "unresolved": unresolved,
+            "updated": "2024-02-01 00:00:%02d.000000000" % updated, "author": {"_account_id": 1001}}
+    if in_reply_to:
+        data["in_reply_to"] = in_reply_to
+    return data
+
+class TestCommentIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = CommentIndex()
+
+    def testThreads(self):
+        added = self.index.add_comments(7, {
+            "a.py": [comment("r1", 3, in_reply_to="t1", unresolved=False), comment("t1", 1, unresolved=True),
+                     comment("t2", 2, unresolved=True, line=9)],
+            "b.py": [comment("t3", 4, unresolved=True, patch_set=2), comment("r3", 5, in_reply_to="t3", unresolved=True, patch_set=2)],
+        })
+        self.assertEqual(len(added), 5)
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual([c["id"] for c in self.index.comments(7, thread="t1")], ["t1", "r1"])
+        self.assertEqual([c["id"] for c in self.index.comments(7, path="a.py", line=9)], ["t2"])
+        self.assertEqual([c["id"] for c in self.index.comments(7, patch_set=2)], ["t3", "r3"])
+
+        unresolved = self.index.unresolved_threads(7)
+        self.assertEqual(sorted(unresolved), ["a.py", "b.py"])
+        self.assertEqual([t["id"] for t in unresolved["a.py"]], ["t2"])
+        self.assertEqual([c["id"] for c in unresolved["b.py"][0]["comments"]], ["t3", "r3"])
+        self.assertEqual([t["id"] for t in self.index.threads(7, unresolved=False)], ["t1"])
+
+        # nothing new the second time
+        self.assertEqual(self.index.add_comments(7, {"a.py": [comment("t1", 1, unresolved=True)]}), [])
+        # a reply resolving the thread of b.py
+        self.index.add_comments(7, {"b.py": [comment("r4", 6, in_reply_to="r3")]})
+        self.assertEqual(sorted(self.index.unresolved_threads(7)), ["a.py"])
+
+    def testDrafts(self):
+        self.index.add_comments(7, {"a.py": [comment("d1", 1), comment("d2", 2)]}, kind="drafts")
+        self.assertEqual(len(self.index.comments(7, kind="drafts")), 2)
+        # d1 was published, d2 deleted
+        self.index.add_comments(7, {"a.py": [comment("d1", 3, unresolved=True)]})
+        self.index.add_comments(7, {}, kind="drafts")
+        self.assertEqual([c["id"] for c in self.index.comments(7)], ["d1"])
+        self.assertEqual(self.index.comments(7)[0]["kind"], "comments")
+        with self.assertRaises(ValueError):
+            self.index.add_comments(7, {}, kind="votes")
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestCommentRefresh(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.client = GerritClient(self.gerrit.url, verify=False, cache=False)
+        self.index = CommentIndex()
+
+    def testRefresh(self):
+        self.gerrit.add_comment(2, "src/a.py", comment("robot", 1, unresolved=True), kind="robotcomments")
+        self.gerrit.add_comment(2, "src/a.py", comment("draft", 2), kind="drafts")
+        result = self.index.refresh(self.client, range(10))
+        self.assertEqual((result.fetched, result.skipped, result.errors), (10, 0, {}))
+        self.assertEqual(len(result.new), 12)
+        self.assertEqual(sorted(self.index.unresolved_threads(2)), ["/COMMIT_MSG", "src/a.py"])
+
+        # only the updated change is fetched again
+        before = self.gerrit.count("comments|drafts")
+        self.gerrit.add_comment(3, "/COMMIT_MSG", comment("reply", 5, in_reply_to="c3"))
+        result = self.index.refresh(self.client, self.client.change.query(q=""))
+        self.assertEqual((result.fetched, result.skipped), (1, 9))
+        self.assertEqual([c["id"] for c in result.new], ["reply"])
+        self.assertEqual(self.gerrit.count("comments|drafts") - before, 3)
+        self.assertEqual(self.index.unresolved_threads(3), {})
+
+    def testErrors(self):
+        result = self.index.refresh(self.client, [1, 99], kinds=["comments"])
+        self.assertEqual(result.fetched, 1)
+        self.assertIn(99, result.errors)
@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+from datetime import datetime, timedelta
+
+import requests
+
+from pGerrit.crawl import crawl, partitions, Partition, CHECKPOINT
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestCrawl(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=120).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def read(self):
+        numbers = []
+        for name in os.listdir(self.dir):
+            if name.endswith(".ndjson"):
+                with open(os.path.join(self.dir, name)) as f:
+                    numbers += [json.loads(line)["_number"] for line in f]
+        return sorted(numbers)
+
+    def testPartitions(self):
+        parts = partitions(["a", "b"], datetime(2024, 1, 1), datetime(2024, 1, 3), timedelta(days=1))
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(parts[0], Partition("a", "2024-01-01 00:00:00", "2024-01-02 00:00:00"))
+        self.assertEqual(parts[0].query("status:merged"),
+                         'status:merged project:"a" after:"2024-01-01 00:00:00 +0000" before:"2024-01-02 00:00:00 +0000"')
+        self.assertEqual(len({p.key for p in parts}), 4)
+        # both operators are inclusive, the boundary belongs to the next window only
+        self.assertFalse(parts[0].contains({"updated": "2024-01-02 00:00:00.000000000"}))
+        self.assertTrue(parts[1].contains({"updated": "2024-01-02 00:00:00.000000000"}))
+        self.assertEqual(partitions(), [Partition(None, None, None)])
+
+    def testCrawl(self):
+        summary = crawl(self.gerrit.url, self.dir, projects="all", since="2024-01-01", until="2024-01-06",
+                        interval=timedelta(days=1), processes=4, page_size=7, verify=False)
+        self.assertEqual(summary.partitions, 25)
+        self.assertEqual(summary.changes, 120)
+        # changes on the boundary of two windows are written once
+        self.assertEqual(self.read(), list(range(120)))
+
+    def testResponseModel(self):
+        # the workers write plain dicts whatever the response_model asked for
+        summary = crawl(self.gerrit.url, self.dir, processes=1, page_size=50, response_model="model", verify=False)
+        self.assertEqual(summary.changes, 120)
+        self.assertEqual(self.read(), list(range(120)))
+
+    def testResume(self):
+        crawl(self.gerrit.url, self.dir, projects=["project/0", "project/1"], processes=2, verify=False)
+        with open(os.path.join(self.dir, CHECKPOINT)) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint["done"], {"project%2F0_any_any": 24, "project%2F1_any_any": 24})
+
+        # as if the crawl was killed before completing project/1
+        del checkpoint["done"]["project%2F1_any_any"]
+        with open(os.path.join(self.dir, CHECKPOINT), "w") as f:
+            json.dump(checkpoint, f)
+        before = self.gerrit.count("project%3A%22project%2F0")
+        summary = crawl(self.gerrit.url, self.dir, projects=["project/0", "project/1"], processes=2, verify=False)
+        self.assertEqual((summary.skipped, summary.changes), (1, 24))
+        self.assertEqual(self.gerrit.count("project%3A%22project%2F0"), before)
+        self.assertEqual(len(self.read()), 48)
+
+        with self.assertRaises(ValueError):
+            crawl(self.gerrit.url, self.dir, query="status:merged", verify=False)
+
+    def testFailedPartition(self):
+        projects = ["project/%d" % p for p in range(5)]
+        self.gerrit.reject_queries = 'project:"project/2"'
+        try:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                crawl(self.gerrit.url, self.dir, projects=projects, processes=2, verify=False)
+        finally:
+            self.gerrit.reject_queries = None
+        with open(os.path.join(self.dir, CHECKPOINT)) as f:
+            done = json.load(f)["done"]
+        # the partitions completed before the error are kept
+        self.assertNotIn("project%2F2_any_any", done)
+        self.assertIn("project%2F0_any_any", done)
+        self.assertEqual(len(self.read()), 24 * len(done))
+
+        summary = crawl(self.gerrit.url, self.dir, projects=projects, processes=2, verify=False)
+        self.assertEqual((summary.skipped, summary.changes), (len(done), 24 * (5 - len(done))))
+        self.assertEqual(self.read(), list(range(120)))
+
+    def testColumns(self):
+        crawl(self.gerrit.url, self.dir, query="status:merged", format="columns", processes=1, verify=False)
+        with open(os.path.join(self.dir, "all_any_any.columns.json")) as f:
+            columns = json.load(f)
+        self.assertEqual(sorted(columns["_number"]), list(range(0, 120, 2)))
+        self.assertEqual(set(columns["status"]), {"MERGED"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from pGerrit.decoders import (XSSI_PREFIX, AutoDecoder, JsonDecoder, MsgspecDecoder, OrjsonDecoder, get_decoder,
+                              strip_xssi)
+from pGerrit.restAPIwrapper import GerritRest
+
+CHANGES = [
+    {"id": "demo~master~I0123", "_number": 1, "subject": "café ☃", "mergeable": True, "insertions": 3,
+     "owner": {"_account_id": 1000}, "labels": {"Code-Review": {"all": [{"value": 2}]}}},
+    {"id": "demo~master~I4567", "_number": 2, "subject": "empty", "mergeable": False, "insertions": 0,
+     "owner": {"_account_id": 1001}, "labels": {}, "_more_changes": True},
+]
+BODY = XSSI_PREFIX + json.dumps(CHANGES).encode()
+
+def installed(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+class DecoderTests(object):
+    # run for every decoder, see the subclasses
+
+    def testLoads(self):
+        self.assertEqual(self.decoder.loads(strip_xssi(BODY)), CHANGES)
+        self.assertEqual(self.decoder.loads(memoryview(b'"\\u00e9"')), "é")
+
+    def testObjectHook(self):
+        changes = self.decoder.loads(strip_xssi(BODY), object_hook=lambda d: SimpleNamespace(**d))
+        self.assertEqual(changes[0].labels.__dict__["Code-Review"].all[0].value, 2)
+        self.assertEqual(changes[1].owner._account_id, 1001)
+
+    def testResponseModels(self):
+        body = strip_xssi(BODY)
+        self.assertEqual(GerritRest.decode(body, "dict", decoder=self.decoder), CHANGES)
+        self.assertEqual(GerritRest.decode(body, "namespace", decoder=self.decoder)[0].subject, "café ☃")
+        self.assertEqual(GerritRest.decode(body, "model", decoder=self.decoder)[1]._more_changes, True)
+
+class TestJsonDecoder(DecoderTests, unittest.TestCase):
+    decoder = JsonDecoder()
+
+@unittest.skipUnless(installed("orjson"), "orjson is not installed")
+class TestOrjsonDecoder(DecoderTests, unittest.TestCase):
+    def setUp(self):
+        self.decoder = OrjsonDecoder()
+
+@unittest.skipUnless(installed("msgspec"), "msgspec is not installed")
+class TestMsgspecDecoder(DecoderTests, unittest.TestCase):
+    def setUp(self):
+        self.decoder = MsgspecDecoder()
+
+class TestAutoDecoder(DecoderTests, unittest.TestCase):
+    decoder = AutoDecoder()
+
+class TestDecoders(unittest.TestCase):
+    def testStripXssi(self):
+        stripped = strip_xssi(BODY)
+        self.assertIsInstance(stripped, memoryview)
+        # a view of the response, not a copy
+        self.assertIs(stripped.obj, BODY)
+        self.assertEqual(bytes(stripped), BODY[len(XSSI_PREFIX):])
+        self.assertEqual(bytes(strip_xssi(b"[]")), b"[]")
+        self.assertEqual(bytes(strip_xssi(b"")), b"")
+        self.assertEqual(bytes(strip_xssi(b")]}'")), b")]}'")
+
+    def testGetDecoder(self):
+        self.assertIsInstance(get_decoder("json"), JsonDecoder)
+        self.assertIsInstance(get_decoder(), AutoDecoder)
+        custom = JsonDecoder()
+        self.assertIs(get_decoder(custom), custom)
+        with self.assertRaises(ValueError):
+            get_decoder("simplejson")
+
+    def testAutoSelection(self):
+        with mock.patch.dict(sys.modules, {"orjson": None, "msgspec": None}):
+            self.assertIsInstance(AutoDecoder()._fast, JsonDecoder)
+            with self.assertRaises(ImportError):
+                get_decoder("orjson")
+        if installed("msgspec"):
+            with mock.patch.dict(sys.modules, {"orjson": None}):
+                self.assertIsInstance(AutoDecoder()._fast, MsgspecDecoder)
+        if installed("orjson"):
+            self.assertIsInstance(AutoDecoder()._fast, OrjsonDecoder)
+
+    def testAutoObjectHook(self):
+        # the hook is called by the json module, not applied after a fast decoder
+        decoder = AutoDecoder()
+        decoder._fast = mock.Mock()
+        changes = decoder.loads(strip_xssi(BODY), object_hook=lambda d: SimpleNamespace(**d))
+        self.assertEqual(changes[0]._number, 1)
+        decoder._fast.loads.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
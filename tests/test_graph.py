@@ -0,0 +1,80 @@
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from pGerrit.graph import ChangeGraph
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+class TestChangeGraph(unittest.TestCase):
+    def testTopologicalOrder(self):
+        graph = ChangeGraph()
+        graph.add_dependency(3, 2)
+        graph.add_dependency(2, 1)
+        graph.add_dependency(5, 1)
+        graph.add_node(4)
+        self.assertEqual(graph.topological_order(), [1, 2, 3, 4, 5])
+        self.assertEqual(graph.roots(), [1, 4])
+        self.assertEqual(graph.ancestors(3), {1, 2})
+        self.assertEqual(graph.topological_order([3, 5, 2]), [2, 3, 5])
+
+    def testSubmitOrder(self):
+        graph = ChangeGraph()
+        graph.add_dependency(2, 1)
+        graph.add_dependency(4, 3)
+        graph.add_together(2, [2, 4])
+        graph.add_node(5)
+        self.assertEqual(graph.submit_order(2), [1, 2, 3, 4])
+        self.assertEqual(graph.submit_order(1), [1])
+
+    def testCycle(self):
+        graph = ChangeGraph()
+        graph.add_dependency(1, 2)
+        graph.add_dependency(2, 1)
+        with self.assertRaises(ValueError):
+            graph.topological_order()
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestGraph(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # stacks of 10 changes, the last two stacks are submitted together
+        cls.gerrit = FakeGerrit(changes=40, chain=10).start()
+        cls.gerrit.bundles.append({29, 39})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.client = GerritClient(self.gerrit.url, verify=False, pool_maxsize=16)
+
+    def testStack(self):
+        graph = self.client.change.graph([5], workers=16)
+        self.assertEqual(sorted(graph), list(range(10)))
+        self.assertEqual(graph.topological_order(), list(range(10)))
+        self.assertEqual(graph.depends_on[5], {4})
+        self.assertEqual(graph.dependents[5], {6})
+        self.assertEqual(graph.together[5], {0, 1, 2, 3, 4})
+        self.assertEqual(graph.nodes[5]["commit"], self.gerrit.revision_sha(5, 2))
+        self.assertEqual(graph.errors, {})
+        self.assertEqual(graph.submit_order(3), [0, 1, 2, 3])
+
+    def testTopicClosure(self):
+        graph = self.client.change.graph([25, "project~master~I%040x" % 0], workers=16)
+        self.assertEqual(sorted(graph), list(range(10)) + list(range(20, 40)))
+        self.assertEqual(graph.submit_order(29), list(range(20, 40)))
+        self.assertFalse(graph.truncated)
+
+    def testVisitedOnce(self):
+        before = self.gerrit.count("related")
+        graph = self.client.change.graph([12], relations=["related"], workers=16)
+        self.assertEqual(len(graph), 10)
+        self.assertEqual(self.gerrit.count("related") - before, 10)
+
+    def testLimitsAndErrors(self):
+        graph = self.client.change.graph([15, 99], max_changes=3)
+        self.assertTrue(graph.truncated)
+        self.assertIn(99, graph.errors)
+        with self.assertRaises(ValueError):
+            self.client.change.graph([1], relations=["parents"])
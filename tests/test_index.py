@@ -0,0 +1,60 @@
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from pGerrit.index import ChangeIndex
+from pGerrit.sync import ChangeSync
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=30).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.client = GerritClient(self.gerrit.url, verify=False)
+        self.index = ChangeIndex()
+        self.assertEqual(self.index.ingest(self.client, self.client.change.iter_query(q="")), 30)
+
+    def testSearch(self):
+        changes = self.index.search(project="project/1", status="NEW")
+        self.assertEqual([c["_number"] for c in changes], [21, 11, 1])
+        self.assertEqual(self.index.count("project", status="NEW"), {"project/%d" % p: 3 for p in range(5)})
+        self.assertEqual(len(self.index.search(owner=1000)), 5)
+        self.assertEqual(len(self.index.search(owner="User 1", limit=2)), 2)
+        self.assertEqual(len(self.index.search(updated_after="2024-01-01 20:00:00")), 10)
+
+    def testFilesAndReviewers(self):
+        self.assertEqual([f["path"] for f in self.index.files(4)], sorted(self.gerrit.files_info(4, "")))
+        self.assertEqual(self.index.files(4)[0]["revision"], self.gerrit.revision_sha(4, 2))
+        self.assertEqual(len(self.index.search(path="img/logo.png")), 30)
+        self.assertEqual(len(self.index.search(path="src/")), 30)
+        self.assertEqual(self.index.search(path="src/"), self.index.search(path="src/file_0.txt"))
+
+        self.assertEqual([r["_account_id"] for r in self.index.reviewers(3)], [2000, 2003])
+        reviewed = self.index.reviewed_by("reviewer0@example.com")
+        self.assertEqual(len(reviewed), 15)
+        self.assertEqual(reviewed, self.index.reviewed_by(2000))
+
+    def testLocalQueries(self):
+        # answered by the index alone, Gerrit is not asked
+        self.gerrit.requests.clear()
+        for _ in range(10):
+            self.assertEqual(len(self.index.search(project="project/2", status="NEW")), 3)
+            self.assertEqual(len(self.index.reviewed_by("reviewer1@example.com", status="MERGED")), 8)
+            self.assertEqual(len(self.index.files(4)), len(self.gerrit.files_info(4, "")))
+        self.assertEqual(self.gerrit.count(), 0)
+
+    def testSyncIntoIndex(self):
+        sync = ChangeSync(self.client, ChangeIndex())
+        self.assertEqual(sync.sync().new, 30)
+        self.assertEqual(len(sync.store.search(status="MERGED")), 15)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from pGerrit import lazy
+from pGerrit.lazy import LazyList, LazyMap, split
+from pGerrit.restAPIwrapper import GerritRest
+
+CHANGES = [{"_number": n, "subject": "change %d" % n, "labels": {"Code-Review": {}}} for n in range(5)]
+FILES = {"/COMMIT_MSG": {"status": "A", "lines_inserted": 7}, "src/a \"b\".c": {"lines_deleted": 2, "size": 10}}
+HASHTAGS = ["perf", "cleanup", "with [brackets] and {braces}"]
+DETAIL = {"_number": 1, "subject": "fix", "labels": {"Verified": {"approved": {}}}, "hashtags": ["a"], "mergeable": True}
+
+def body(data):
+    return json.dumps(data, indent=1).encode()
+
+class LazyTests(object):
+    # run with and without msgspec, see the subclasses
+
+    def decode(self, data, response_model="dict", fields=None):
+        return GerritRest.decode_partial(body(data), response_model, lazy=True, fields=fields)
+
+    def testListOfObjects(self):
+        result = self.decode(CHANGES)
+        self.assertIsInstance(result, LazyList)
+        self.assertEqual(list(result), CHANGES)
+        self.assertEqual(self.decode(CHANGES, "namespace")[3]._number, 3)
+        self.assertEqual(list(self.decode([])), [])
+
+    def testMapOfObjects(self):
+        result = self.decode(FILES)
+        self.assertIsInstance(result, LazyMap)
+        self.assertEqual(dict(result), FILES)
+        self.assertEqual(self.decode(FILES, "namespace")["/COMMIT_MSG"].lines_inserted, 7)
+
+    def testScalars(self):
+        # nothing is lost, whether the elements are split or decoded eagerly
+        self.assertEqual(list(self.decode(HASHTAGS)), HASHTAGS)
+        self.assertEqual(list(self.decode([1, {"a": 1}, "x"])), [1, {"a": 1}, "x"])
+        self.assertEqual(dict(self.decode(DETAIL)), DETAIL)
+        detail = self.decode(DETAIL, "namespace")
+        self.assertEqual((detail.subject, detail.mergeable), ("fix", True))
+
+    def testFields(self):
+        result = self.decode(CHANGES, fields=["_number"])
+        self.assertEqual(list(result), [{"_number": n} for n in range(5)])
+        files = self.decode(FILES, "namespace", fields=["size"])
+        self.assertEqual(vars(files['src/a "b".c']), {"size": 10})
+        eager = GerritRest.decode_partial(body(CHANGES), "dict", fields=["subject"])
+        self.assertEqual(eager[4], {"subject": "change 4"})
+
+@unittest.skipIf(lazy.msgspec is None, "msgspec is not installed")
+class TestLazyMsgspec(LazyTests, unittest.TestCase):
+    pass
+
+class TestLazyRegex(LazyTests, unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(lazy, "msgspec", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testSplit(self):
+        self.assertEqual([bytes(e) for e in split(b'[ {"a": "]"} ,[1]]')[1]], [b'{"a": "]"}', b"[1]"])
+        kind, elements = split(b'{"k\\"1": {}, "k2":[]}')
+        self.assertEqual([k for k, _ in elements], ['k"1', "k2"])
+        # a scalar between the containers can't be skipped
+        self.assertIsNone(split(b'["a", "b"]'))
+        self.assertIsNone(split(b'[{}, 1]'))
+        self.assertIsNone(split(b'{"a": {}, "b": true}'))
+        self.assertIsNone(split(b'"text"'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from pGerrit.materialize import MANIFEST, blob_sha
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+class TestBlobSha(unittest.TestCase):
+    def testGitBlob(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b"hello\n")
+        try:
+            # git hash-object of "hello\n"
+            self.assertEqual(blob_sha(f.name), "ce013625030ba8dba906f756967f9e9ca394464a")
+        finally:
+            os.unlink(f.name)
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestMaterialize(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=5, files=30).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.dir = tempfile.mkdtemp()
+        self.dest = os.path.join(self.dir, "tree")
+        self.client = GerritClient(self.gerrit.url, verify=False, pool_maxsize=16)
+        self.sha = self.gerrit.revision_sha(1, 2)
+
+    def tearDown(self):
+        self.gerrit.blob_shas = True
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def files(self, root):
+        found = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name != MANIFEST:
+                    with open(os.path.join(directory, name), "rb") as f:
+                        found[os.path.relpath(os.path.join(directory, name), root)] = f.read()
+        return found
+
+    def expected(self, revision):
+        return {name: self.gerrit.file_content(1, revision, name) for name in self.gerrit.file_names()[1:]}
+
+    def testMaterialize(self):
+        result = self.client.change(1).current_revision().materialize(self.dest, workers=16, include_base=True)
+        self.assertEqual(result.errors, {})
+        self.assertEqual(result.files, 2 * 29)
+        self.assertEqual(self.files(self.dest), self.expected(self.sha))
+        self.assertEqual(self.files(self.dest + ".base"), self.expected("base"))
+        self.assertEqual(result.bytes, sum(map(len, self.expected(self.sha).values())) + sum(map(len, self.expected("base").values())))
+        self.assertGreater(result.throughput, 0)
+
+    def testSkipByBlobSha(self):
+        self.client.change(1).current_revision().materialize(self.dest)
+        with open(os.path.join(self.dest, "src/file_3.txt"), "wb") as f:
+            f.write(b"edited")
+        os.unlink(os.path.join(self.dest, MANIFEST))
+        before = self.gerrit.count("/content")
+        result = self.client.change(1).current_revision().materialize(self.dest)
+        self.assertEqual((result.files, result.skipped), (1, 28))
+        self.assertEqual(self.gerrit.count("/content") - before, 1)
+        self.assertEqual(self.files(self.dest), self.expected(self.sha))
+
+    def testSkipByManifest(self):
+        self.gerrit.blob_shas = False
+        self.client.change(1).current_revision().materialize(self.dest)
+        with open(os.path.join(self.dest, "img/logo.png"), "ab") as f:
+            f.write(b"x")
+        result = self.client.change(1).current_revision().materialize(self.dest)
+        self.assertEqual((result.files, result.skipped), (1, 28))
+        self.assertEqual(self.files(self.dest), self.expected(self.sha))
@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from pGerrit.cache import RevisionStore
+from pGerrit.client import GerritClient
+from pGerrit.utils import fields
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestRevisionMetadata(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=5, files=40).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        # without cache every helper call would be a request
+        self.client = GerritClient(self.gerrit.url, verify=False, cache=False)
+        self.gerrit.requests.clear()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def testIsBinary(self):
+        revision = self.client.change(1).current_revision()
+        binaries = [name for name in fields(revision.metadata.files) if revision.file(name).is_binary()]
+        self.assertEqual(binaries, ["img/logo.png"])
+        self.assertEqual(self.gerrit.count("/files"), 1)
+        self.assertIs(revision.file("img/logo.png").metadata, revision.metadata)
+
+    def testCommitAndProject(self):
+        revision = self.client.change(2).current_revision()
+        for name in self.gerrit.file_names():
+            file = revision.file(name)
+            self.assertEqual(file.metadata.project, "project/2")
+            self.assertEqual(file.metadata.commit.commit, self.gerrit.revision_sha(2, 2))
+        self.assertEqual(self.gerrit.count("/commit"), 1)
+        self.assertEqual(self.gerrit.count(r"GET /changes/2$"), 1)
+
+        revision.metadata.clear()
+        revision.metadata.commit
+        self.assertEqual(self.gerrit.count("/commit"), 2)
+
+    def testIsMerge(self):
+        change = self.client.change(3)
+        self.assertFalse(change.is_merge())
+        self.assertFalse(change.is_merge())
+        self.assertEqual(self.gerrit.count("/commit"), 1)
+
+    def testFilesShareResolution(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache=False, revision_store=RevisionStore(self.dir))
+        revision = client.change(4).current_revision()
+        sha = self.gerrit.revision_sha(4, 2)
+        for name in self.gerrit.file_names()[:5]:
+            revision.file(name).diff()
+        self.assertEqual(revision.revisionID, sha)
+        # resolving "current" once, then the commit by SHA-1 for the store
+        self.assertLessEqual(self.gerrit.count("/revisions/current/"), 1)
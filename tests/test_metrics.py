@@ -0,0 +1,104 @@
+import time
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from pGerrit.metrics import CollectingExporter, Histogram, Metrics
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+class TestHistogram(unittest.TestCase):
+    def testQuantiles(self):
+        histogram = Histogram()
+        for ms in range(1, 101):
+            histogram.add(ms / 1000)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.total, 5.05)
+        self.assertLessEqual(histogram.quantile(0.5), 0.1)
+        self.assertGreaterEqual(histogram.quantile(0.5), 0.05)
+        self.assertEqual(histogram.quantile(1), 0.1)
+        self.assertEqual(Histogram().quantile(0.5), 0.0)
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=5).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.exporter = CollectingExporter()
+        self.client = GerritClient(self.gerrit.url, verify=False, cache_expire=0,
+                                   metrics=Metrics(exporters=[self.exporter]))
+
+    def tearDown(self):
+        self.gerrit.throttle = 0
+
+    def testDisabledByDefault(self):
+        client = GerritClient(self.gerrit.url, verify=False)
+        self.assertIsNone(client.metrics)
+        self.assertEqual(client.change(1).detail()._number, 1)
+
+    def testEndpoints(self):
+        change = self.client.change(1)
+        change.detail()
+        change.detail()
+        change.current_revision().files()
+        change.set_topic({"topic": "t"})
+
+        endpoints = self.client.metrics.endpoints
+        self.assertIs(change.metrics, self.client.metrics)
+        detail = endpoints["/a/changes/{}/detail"]
+        self.assertEqual(detail.calls, 2)
+        self.assertEqual(detail.errors, 0)
+        self.assertGreater(detail.bytes_in, 0)
+        self.assertGreater(detail.network.total, 0)
+        self.assertGreater(detail.decode.total, 0)
+        self.assertGreater(detail.build.total, 0)
+        self.assertEqual(detail.latency.count, 2)
+        # the second call revalidated the expired entry with its ETag
+        self.assertEqual(detail.sources, {"miss": 1, "revalidated": 1})
+        self.assertEqual(detail.cache_hits, 1)
+        self.assertEqual(detail.cache_misses, 1)
+
+        topic = endpoints["/a/changes/{}/topic"]
+        self.assertEqual(topic.calls, 1)
+        self.assertGreater(topic.bytes_out, 0)
+        self.assertIn("/a/changes/{}/revisions/{}/files", endpoints)
+
+        summary = self.client.metrics.summary()
+        self.assertIn("/a/changes/{}/detail", summary)
+        self.assertEqual(len(summary.splitlines()), 2 + len(endpoints))
+        self.client.metrics.reset()
+        self.assertEqual(self.client.metrics.endpoints, {})
+
+    def testCacheHit(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache_expire=60, metrics=True)
+        client.change(2).detail()
+        client.change(2).detail()
+        detail = client.metrics.endpoints["/a/changes/{}/detail"]
+        self.assertEqual(detail.sources, {"miss": 1, "hit": 1})
+
+    def testErrorsAndRetries(self):
+        with self.assertRaises(Exception):
+            self.client.change(99).detail()
+        self.assertEqual(self.client.metrics.endpoints["/a/changes/{}/detail"].errors, 1)
+
+        self.gerrit.throttle = 2
+        self.client.change(3).topic()
+        topic = self.client.metrics.endpoints["/a/changes/{}/topic"]
+        self.assertEqual(topic.retries, 2)
+
+    def testSpans(self):
+        start = time.time_ns()
+        self.client.change(4).detail()
+        span = self.exporter.spans[-1]
+        self.assertEqual(span.name, "GET /a/changes/{}/detail")
+        self.assertGreaterEqual(span.start_time, start)
+        self.assertGreater(span.end_time, span.start_time)
+        self.assertEqual(span.attributes["http.status_code"], 200)
+        self.assertEqual(span.attributes["gerrit.source"], "miss")
+        self.assertIsNone(span.error)
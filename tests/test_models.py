@@ -0,0 +1,92 @@
+import copy
+import json
+import pickle
+import unittest
+
+from pGerrit.client import GerritClient
+from pGerrit.decoders import XSSI_PREFIX, strip_xssi
+from pGerrit.models import AccountInfo, ChangeInfo, FileInfo, GerritModel, LabelInfo, MapOf, RevisionInfo
+from pGerrit.restAPIwrapper import GerritRest
+from pGerrit.utils import fields, getfield, plain
+
+SHA = "0123456789abcdef0123456789abcdef01234567"
+CHANGE = {
+    "id": "demo~master~I0123",
+    "_number": 1,
+    "subject": "fix",
+    "owner": {"_account_id": 1000, "name": "Jane"},
+    "labels": {"Code-Review": {"approved": {"_account_id": 1001}, "all": [{"_account_id": 1001, "value": 2}]}},
+    "reviewers": {"REVIEWER": [{"_account_id": 1001}]},
+    "current_revision": SHA,
+    "revisions": {SHA: {"_number": 2, "uploader": {"_account_id": 1000},
+                        "files": {"src/a.c": {"lines_inserted": 3}, "/COMMIT_MSG": {"status": "A"}}}},
+    "hashtags": ["perf"],
+}
+
+def decode(response_model, data=CHANGE, model=ChangeInfo):
+    return GerritRest.decode(strip_xssi(XSSI_PREFIX + json.dumps(data).encode()), response_model, model)
+
+class TestModels(unittest.TestCase):
+    def testAttributes(self):
+        change = decode("model")
+        self.assertIsInstance(change, ChangeInfo)
+        self.assertEqual((change._number, change.subject, change.hashtags), (1, "fix", ["perf"]))
+        self.assertIsInstance(change.owner, AccountInfo)
+        self.assertEqual(change.owner.name, "Jane")
+        with self.assertRaises(AttributeError):
+            change.topic
+        self.assertEqual(getattr(change, "topic", None), None)
+
+    def testNestedModels(self):
+        change = decode("model")
+        label = getattr(change.labels, "Code-Review")
+        self.assertIsInstance(change.labels, MapOf(LabelInfo))
+        self.assertIsInstance(label, LabelInfo)
+        self.assertIsInstance(label.approved, AccountInfo)
+        self.assertEqual(label.all[0].value, 2)
+        self.assertIsInstance(change.reviewers.REVIEWER[0], AccountInfo)
+        revision = getattr(change.revisions, SHA)
+        self.assertIsInstance(revision, RevisionInfo)
+        self.assertIsInstance(revision.uploader, AccountInfo)
+        self.assertIsInstance(getattr(revision.files, "src/a.c"), FileInfo)
+        # objects without a model of their own are generic models
+        self.assertIs(type(decode("model", {"a": {"b": 1}}, None).a), GerritModel)
+
+    def testDictAccess(self):
+        change = decode("model")
+        # like a SimpleNamespace, vars() is the decoded dict and no copy is made
+        self.assertEqual(vars(change), CHANGE)
+        self.assertIs(vars(change.owner), vars(change)["owner"])
+        self.assertEqual(sorted(dir(change)), sorted(CHANGE))
+        self.assertIn("subject", change)
+        self.assertNotIn("topic", change)
+        change.topic = "t"
+        self.assertEqual(vars(change)["topic"], "t")
+
+    def testResponseModels(self):
+        model, namespace, data = decode("model"), decode("namespace"), decode("dict")
+        self.assertEqual(data, CHANGE)
+        self.assertEqual(namespace.owner._account_id, model.owner._account_id)
+        for change in (model, namespace, data):
+            self.assertEqual(getfield(change, "subject"), "fix")
+            self.assertEqual(getfield(change, "topic", "none"), "none")
+            self.assertEqual(fields(change)["_number"], 1)
+            self.assertEqual(plain(change), CHANGE)
+
+    def testEqualityAndCopies(self):
+        change = decode("model")
+        self.assertEqual(change, decode("model"))
+        self.assertNotEqual(change, decode("model", dict(CHANGE, subject="other")))
+        for copied in (pickle.loads(pickle.dumps(change)), copy.deepcopy(change)):
+            self.assertIsInstance(copied, ChangeInfo)
+            self.assertEqual(copied, change)
+            self.assertEqual(getattr(getattr(copied.revisions, SHA).files, "src/a.c").lines_inserted, 3)
+        self.assertIn("subject='fix'", repr(change))
+
+    def testClientResponseModel(self):
+        self.assertEqual(GerritClient("https://review.example.com", response_model="model").response_model, "model")
+        with self.assertRaises(ValueError):
+            GerritClient("https://review.example.com", response_model="object")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestPagination(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Gerrit returns at most 10 changes per request and flags the last one with _more_changes
+        cls.gerrit = FakeGerrit(changes=25, page_limit=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.client = GerritClient(self.gerrit.url, verify=False, cache=False)
+        self.all = [c._number for c in self.client.change.query(q="")] + \
+                   [c._number for c in self.client.change.query(q="", S=10)] + \
+                   [c._number for c in self.client.change.query(q="", S=20)]
+        self.gerrit.requests.clear()
+
+    def numbers(self, **kwargs):
+        return [c._number for c in self.client.change.iter_query(q="", **kwargs)]
+
+    def testPages(self):
+        self.assertEqual(sorted(self.all), list(range(25)))
+        for prefetch in (True, False):
+            self.gerrit.requests.clear()
+            self.assertEqual(self.numbers(page_size=7, prefetch=prefetch), self.all)
+            self.assertEqual(self.gerrit.count("^GET /changes"), 4)
+
+    def testPageLimitOfGerrit(self):
+        # pages shorter than page_size go on while _more_changes is set
+        self.assertEqual(self.numbers(page_size=50), self.all)
+        self.assertEqual(self.gerrit.count("^GET /changes"), 3)
+
+    def testStartAndLimit(self):
+        self.assertEqual(self.numbers(page_size=7, n=12, S=3), self.all[3:15])
+        self.assertEqual(self.gerrit.count("^GET /changes"), 2)
+        self.assertEqual(self.numbers(n=5), self.all[:5])
+        self.assertEqual(self.numbers(page_size=7, S="20"), self.all[20:])
+        self.assertEqual(self.numbers(n=0), [])
+        self.assertEqual(self.numbers(**{"no-limit": "", "n": 30}), self.all)
+
+    def testReviewers(self):
+        # not paginated by Gerrit, fetched at once
+        reviewers = list(self.client.change(3).reviewer.iter_query())
+        self.assertEqual(reviewers, self.client.change(3).reviewer.query())
+        self.assertEqual(len(reviewers), 2)
+        self.assertEqual(self.gerrit.count("^GET /changes/3/reviewers"), 2)
+
+    def testProjects(self):
+        names = [p.id for p in self.client.project.iter_query(page_size=2)]
+        self.assertEqual(names, [p.id for p in vars(self.client.project.query()).values()])
+        self.assertEqual([p.id for p in self.client.project.iter_query(page_size=2, S=1, n=2)], names[1:3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import time
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from pGerrit.client import GerritClient
+from pGerrit.ratelimit import TokenBucket, AdaptiveConcurrency
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+class TestTokenBucket(unittest.TestCase):
+    def testRate(self):
+        bucket = TokenBucket(100, burst=10)
+        start = time.monotonic()
+        for _ in range(40):
+            bucket.acquire()
+        # the burst is free, the 30 other requests wait for their token
+        self.assertGreater(time.monotonic() - start, 0.25)
+
+    def testPause(self):
+        bucket = TokenBucket(float("inf"), 1)
+        bucket.pause(0.2)
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreater(time.monotonic() - start, 0.15)
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def testAimd(self):
+        limiter = AdaptiveConcurrency(max_concurrency=16, min_concurrency=2)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.01)
+        self.assertEqual(limiter.limit, 16)
+        # latency rising far above the baseline shrinks the limit, down to its minimum
+        for _ in range(200):
+            limiter.acquire()
+            limiter.release(0.5)
+        self.assertEqual(limiter.limit, 2)
+        for _ in range(50):
+            limiter.acquire()
+            limiter.release(0.01)
+        self.assertGreater(limiter.limit, 4)
+
+    def testThrottled(self):
+        limiter = AdaptiveConcurrency(max_concurrency=10)
+        limiter.acquire()
+        limiter.release(0.01, throttled=True)
+        self.assertEqual(int(limiter.limit), 7)
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestThrottling(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=40).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+
+    def tearDown(self):
+        self.gerrit.throttle = 0
+        self.gerrit.throttle_status = 429
+        self.gerrit.retry_after = "0"
+
+    def testRetryAfter(self):
+        client = GerritClient(self.gerrit.url, verify=False)
+        self.gerrit.throttle = 3
+        self.assertEqual(client.change(1).detail()._number, 1)
+        self.assertEqual(client.adapter.throttled, 3)
+
+        # every thread waits for the delay asked by Gerrit
+        self.gerrit.throttle, self.gerrit.retry_after = 1, "1"
+        start = time.monotonic()
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda n: client.change(n).detail(), range(4, 8)))
+        self.assertGreater(time.monotonic() - start, 0.9)
+
+        # writes are retried on 429 too, they were not processed
+        self.gerrit.throttle = 1
+        client.change(1).set_topic({"topic": "x"})
+
+    def testServiceUnavailable(self):
+        client = GerritClient(self.gerrit.url, verify=False)
+        self.gerrit.throttle, self.gerrit.throttle_status = 1, 503
+        self.assertEqual(client.change(2).detail()._number, 2)
+        # a POST may have been processed before the 503, it is not sent again
+        self.gerrit.throttle = 1
+        with self.assertRaises(requests.HTTPError):
+            client.change(2).current_revision().set_review({"message": "hi"})
+
+    def testTooLongRetryAfter(self):
+        client = GerritClient(self.gerrit.url, verify=False)
+        self.gerrit.throttle, self.gerrit.retry_after = 1, "3600"
+        with self.assertRaises(requests.HTTPError):
+            client.change(3).detail()
+
+    def testRateLimit(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache=False, coalesce=False, rate_limit=50, burst=1)
+        start = time.monotonic()
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda n: client.change(n).detail(), range(20)))
+        self.assertGreater(time.monotonic() - start, 0.35)
+
+    def testAdaptiveConcurrency(self):
+        client = GerritClient(self.gerrit.url, verify=False, cache=False, pool_maxsize=16, adaptive_concurrency=True)
+        limiter = client.adapter.adaptive
+        self.assertEqual(limiter.max_concurrency, 16)
+        with ThreadPoolExecutor(16) as executor:
+            list(executor.map(lambda n: client.change(n % 40).detail(), range(64)))
+        self.assertEqual(limiter.in_flight, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import pGerrit.Access  # noqa: F401
+import pGerrit.change  # noqa: F401
+import pGerrit.project  # noqa: F401
+from pGerrit.client import GerritClient
+from pGerrit.utils import urljoin, urlformat
+
+IDS = [
+    "12345",
+    "I8473b95934b5732ac55d26311a706c9c2bde9940",
+    "my/project~refs/heads/stable-3.9~I8473b95934b5732ac55d26311a706c9c2bde9940",
+    "src/main/java/com/example/Some File+%.java",
+    "current",
+    "self",
+]
+HOSTS = ["https://review.example.com", "https://review.example.com/", "https://example.com/gerrit/"]
+
+def routes():
+    # every url_wrapper endpoint, with the class defining it
+    classes = [GerritClient]
+    for cls in classes:
+        classes += cls.__subclasses__()
+    for cls in classes:
+        for name, attr in vars(cls).items():
+            func = getattr(attr, "__func__", attr)
+            while func is not None:
+                route = getattr(func, "_route", None)
+                if route is not None:
+                    yield cls, name, route
+                    break
+                func = getattr(func, "__wrapped__", None)
+
+def legacy_url(cls, route, obj):
+    # what url_wrapper built before the routes were compiled
+    return urljoin(obj.host, urlformat(cls._endpoint, *[getattr(obj, arg) for arg in getattr(cls, "_args", ())]), route.name)
+
+class TestRoutes(unittest.TestCase):
+    def testLegacyEquivalence(self):
+        found = list(routes())
+        self.assertGreaterEqual(len(found), 35)
+        for cls, name, route in found:
+            for host in HOSTS:
+                for n, value in enumerate(IDS):
+                    obj = object.__new__(cls)
+                    obj.host = host
+                    # different ids for the different arguments of the endpoint
+                    for i, arg in enumerate(getattr(cls, "_args", ())):
+                        setattr(obj, arg, IDS[(n + i) % len(IDS)])
+                    with self.subTest(endpoint="%s.%s" % (cls.__name__, name), host=host, id=value):
+                        self.assertEqual(route(obj), legacy_url(cls, route, obj))
+
+    def testQuoting(self):
+        client = GerritClient("https://review.example.com/", cache=False)
+        change = client.change("my/project~stable~I8473b95934b5732ac55d26311a706c9c2bde9940")
+        self.assertEqual(type(change).topic.__wrapped__(change),
+                         "https://review.example.com/a/changes/my%2Fproject~stable~I8473b95934b5732ac55d26311a706c9c2bde9940/topic")
+        file = client.change(42).revision("current").file("src/a b.c")
+        self.assertEqual(type(file).content.__wrapped__(file),
+                         "https://review.example.com/a/changes/42/revisions/current/files/src%2Fa%20b.c/content")
+
+if __name__ == '__main__':
+    unittest.main()
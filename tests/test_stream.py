@@ -0,0 +1,157 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from pGerrit.stream import Base64Decoder, Download
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+class TestBase64Decoder(unittest.TestCase):
+    def testChunks(self):
+        data = os.urandom(10000)
+        encoded = base64.b64encode(data)
+        for size in (1, 3, 4, 7, 4096):
+            decoder = Base64Decoder()
+            decoded = b"".join(decoder.decode(encoded[i:i + size]) for i in range(0, len(encoded), size))
+            self.assertEqual(decoded + decoder.flush(), data)
+
+    def testTruncated(self):
+        decoder = Base64Decoder()
+        decoder.decode(b"YWJj" + b"YW")
+        with self.assertRaises(ValueError):
+            decoder.flush()
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=5).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.dir = tempfile.mkdtemp()
+        self.client = GerritClient(self.gerrit.url, verify=False)
+        self.revision = self.client.change(1).current_revision()
+        self.sha = self.gerrit.revision_sha(1, 2)
+
+    def tearDown(self):
+        self.gerrit.cut_after = None
+        self.gerrit.ranges = True
+        self.gerrit.patch_sets.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def testPatch(self):
+        patch = self.gerrit.patch(1, self.sha)
+        self.assertEqual(base64.b64decode(self.revision.patch()), patch)
+        download = self.revision.patch(stream=True)
+        self.assertIsInstance(download, Download)
+        download.chunk_size = 1000
+        chunks = list(download)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), patch)
+
+    def testDownload(self):
+        file = self.revision.file("img/logo.png")
+        out = io.BytesIO()
+        self.assertEqual(file.download(stream=True).save(out), 1024)
+        self.assertEqual(out.getvalue(), file.download().content)
+        self.assertEqual(file.content(stream=True).read(), self.gerrit.file_content(1, self.sha, "img/logo.png"))
+
+    def testResumeBrokenConnection(self):
+        archive = self.gerrit.patch(1, self.sha) * 100
+        self.gerrit.cut_after = 100000
+        path = os.path.join(self.dir, "change.tgz")
+        self.assertEqual(self.revision.archive(format="tgz", stream=True).save(path), len(archive))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), archive)
+        self.assertEqual(self.gerrit.count("archive"), 2)
+
+    def testResumeFile(self):
+        patch = self.gerrit.patch(1, self.sha)
+        path = os.path.join(self.dir, "change.patch")
+        for offset in (1, 2, 3, 1000, len(patch)):
+            with open(path, "wb") as f:
+                f.write(patch[:offset])
+            self.assertEqual(self.revision.patch(stream=True).save(path, resume=True), len(patch))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), patch)
+
+    def testReplaceFile(self):
+        # an existing file is not taken for the start of the body by default
+        patch = self.gerrit.patch(1, self.sha)
+        path = os.path.join(self.dir, "change.patch")
+        with open(path, "wb") as f:
+            f.write(b"another revision\n")
+        self.assertEqual(self.revision.patch(stream=True).save(path), len(patch))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), patch)
+
+    def uploadOnRetry(self):
+        # a new patch set becomes current between the broken request and its retry
+        session, get = self.client.session, self.client.session.get
+        calls = []
+
+        def uploading_get(*args, **kwargs):
+            calls.append(kwargs.get("headers", {}).get("If-Range"))
+            if len(calls) == 2:
+                self.gerrit.patch_sets[1] = 3
+            return get(*args, **kwargs)
+
+        session.get = uploading_get
+        self.addCleanup(lambda: vars(session).pop("get", None))
+        self.gerrit.cut_after = 5000
+        return calls
+
+    def patch(self):
+        download = self.revision.patch(stream=True)
+        # chunks smaller than the bytes sent before the cut, the retry is a range request
+        download.chunk_size = 1000
+        return download
+
+    def testBodyChangedDuringSave(self):
+        calls = self.uploadOnRetry()
+        patch = self.gerrit.patch(1, self.gerrit.revision_sha(1, 3))
+        path = os.path.join(self.dir, "change.patch")
+        self.assertEqual(self.patch().save(path), len(patch))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), patch)
+        # the retry was conditioned on the ETag of the first response
+        self.assertEqual(len(calls), 2)
+        self.assertIsNone(calls[0])
+        self.assertTrue(calls[1])
+
+    def testBodyChangedDuringRead(self):
+        self.uploadOnRetry()
+        out = io.BytesIO(b"header\n")
+        out.seek(0, io.SEEK_END)
+        self.patch().save(out)
+        self.assertEqual(out.getvalue(), b"header\n" + self.gerrit.patch(1, self.gerrit.revision_sha(1, 3)))
+
+        self.gerrit.patch_sets.clear()
+        self.uploadOnRetry()
+        self.assertEqual(self.patch().read(), self.gerrit.patch(1, self.gerrit.revision_sha(1, 3)))
+
+    def testBodyChangedDuringIteration(self):
+        self.uploadOnRetry()
+        with self.assertRaises(RuntimeError):
+            list(self.patch())
+
+    def testServerWithoutRanges(self):
+        self.gerrit.ranges = False
+        patch = self.gerrit.patch(1, self.sha)
+        self.gerrit.cut_after = 5000
+        self.assertEqual(self.revision.patch(stream=True).read(), patch)
+        # the same body, the bytes already received are skipped
+        self.gerrit.cut_after = 5000
+        self.assertEqual(b"".join(self.patch()), patch)
+
+if __name__ == '__main__':
+    unittest.main()
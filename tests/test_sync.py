@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from pGerrit.client import GerritClient
+from pGerrit.sync import ChangeSync, ChangeStore
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.gerrit = FakeGerrit(changes=40).start()
+        self.dir = tempfile.mkdtemp()
+        self.client = GerritClient(self.gerrit.url, verify=False)
+
+    def tearDown(self):
+        self.gerrit.stop()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def testIncrementalSync(self):
+        path = os.path.join(self.dir, "changes.sqlite")
+        sync = ChangeSync(self.client, path, page_size=15)
+        result = sync.sync()
+        self.assertEqual((result.fetched, result.new, result.updated), (40, 40, 0))
+        self.assertEqual(result.mark, (self.gerrit.updated_of(39), 39))
+        self.assertIn('after:"2024-01-02 14:59:00 +0000"', sync.search())
+
+        for number in (3, 5, 8):
+            self.client.change(number).set_topic({"topic": "updated"})
+        # a new sync of the same store only fetches the changes updated since the mark
+        result = ChangeSync(self.client, ChangeStore(path), page_size=15).sync()
+        self.assertLess(result.fetched, 10)
+        self.assertEqual((result.new, result.updated), (0, 3))
+        self.assertEqual(result.mark[1], 8)
+        self.assertEqual(sync.store.get(5)["topic"], "updated")
+
+        changed = sync.changed_since("2025-01-01")
+        self.assertEqual(sorted(change._number for change in changed), [3, 5, 8])
+        self.assertEqual(len(sync.store), 40)
+
+        result = sync.sync()
+        self.assertEqual((result.new, result.updated), (0, 0))
+
+    def testQueries(self):
+        sync = ChangeSync(self.client, query="project:project/1", initial_age="30d")
+        self.assertEqual(sync.search(), "project:project/1 -age:30d")
+        self.assertEqual(sync.sync().new, 8)
+        # marks are kept per query
+        other = ChangeSync(self.client, sync.store, query="project:project/2")
+        self.assertIsNone(other.mark)
+        self.assertEqual(other.sync().new, 8)
+        self.assertEqual(len(sync.store), 16)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from pGerrit.client import GerritClient
+from pGerrit.utils import getfield
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+THREADS = 64
+
+# Run this test with python -m pytest tests/test_threads.py, it starts a local stand-in Gerrit
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+class TestThreads(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=40, files=6).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        # the stand-in Gerrit uses a self-signed certificate
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def client(self, **kwargs):
+        kwargs.setdefault("cache_path", os.path.join(self.dir, "cache.sqlite"))
+        return GerritClient(self.gerrit.url, verify=False, pool_maxsize=THREADS, **kwargs)
+
+    def hammer(self, work, jobs):
+        """Runs ``work`` on every job from THREADS threads started at once, returns the results in order."""
+        barrier = threading.Barrier(THREADS)
+        def run(index, job):
+            # the first job of every thread waits for all of them
+            if index < THREADS:
+                barrier.wait()
+            return work(job)
+        jobs = list(jobs)
+        with ThreadPoolExecutor(THREADS) as executor:
+            return list(executor.map(run, range(len(jobs)), jobs))
+
+    def testConcurrentReads(self):
+        client = self.client(revision_store=os.path.join(self.dir, "revisions"))
+        def work(number):
+            change = client.change(number)
+            revision = change.current_revision()
+            files = revision.files()
+            content = revision.file("src/file_0.txt").diff()
+            return change.detail()._number, revision.resolve(), sorted(vars(files)), content
+
+        numbers = [n % self.gerrit.changes for n in range(THREADS * 8)]
+        for number, result in zip(numbers, self.hammer(work, numbers)):
+            self.assertEqual(result[0], number)
+            self.assertEqual(result[1], self.gerrit.revision_sha(number, 2))
+            self.assertEqual(result[2], sorted(self.gerrit.files_info(number, result[1])))
+            self.assertTrue(result[3])
+
+    def testConcurrentResponseModels(self):
+        session = self.client().session
+        for response_model in ("namespace", "model", "dict"):
+            client = self.client(response_model=response_model, cache_expire=0, session=session)
+            numbers = [n % self.gerrit.changes for n in range(THREADS * 4)]
+            results = self.hammer(lambda n: getfield(client.change(n).detail(), "_number"), numbers)
+            self.assertEqual(results, numbers)
+
+    def testCoalescedReads(self):
+        self.gerrit.latency = 0.2
+        try:
+            client = self.client()
+            before = self.gerrit.count("GET /changes/7/detail")
+            results = self.hammer(lambda _: getfield(client.change(7).detail(), "_number"), range(THREADS))
+        finally:
+            self.gerrit.latency = 0
+        self.assertEqual(results, [7] * THREADS)
+        self.assertLess(self.gerrit.count("GET /changes/7/detail") - before, THREADS // 4)
+        self.assertGreater(client.single_flight.coalesced, 0)
+
+    def testConcurrentWrites(self):
+        client = self.client(cache_expire=60)
+        numbers = [n % self.gerrit.changes for n in range(THREADS * 2)]
+        self.hammer(lambda n: client.change(n).topic(), numbers)
+        def work(number):
+            change = client.change(number)
+            change.set_topic({"topic": "updated"})
+            return change.topic()
+        # a read following a write of the same thread never sees the stale cached topic
+        self.assertEqual(self.hammer(work, numbers), ["updated"] * len(numbers))
+
+    def testSharedCacheFile(self):
+        # several clients of one bot sharing the same sqlite file
+        clients = [self.client(cache_expire=0) for _ in range(4)]
+        numbers = list(range(THREADS * 4))
+        results = self.hammer(lambda i: getfield(clients[i % 4].change(i % self.gerrit.changes).detail(), "_number"), numbers)
+        self.assertEqual(results, [i % self.gerrit.changes for i in numbers])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from pGerrit.client import GerritClient
+from tests.fake_gerrit import FakeGerrit, has_openssl
+
+def installed(name):
+    return importlib.util.find_spec(name) is not None
+
+@unittest.skipUnless(has_openssl(), "openssl is needed to serve the stand-in Gerrit over https")
+@unittest.skipUnless(installed("httpx"), "httpx is needed by the httpx transports")
+class TestHttpxTransport(unittest.TestCase):
+    transport = "httpx"
+    http_version = "HTTP/1.1"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gerrit = FakeGerrit(changes=40, http2=cls.transport == "http2").start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gerrit.stop()
+
+    def setUp(self):
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+        self.dir = tempfile.mkdtemp()
+        self.client = GerritClient(self.gerrit.url, verify=False, transport=self.transport, pool_maxsize=8)
+
+    def tearDown(self):
+        self.gerrit.throttle = 0
+        self.gerrit.retry_after = "0"
+        self.gerrit.cut_after = None
+        self.client.session.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def testRequests(self):
+        self.assertEqual(self.client.change(1).detail()._number, 1)
+        changes = self.client.change.query(q="", n=5)
+        self.assertEqual(len(changes), 5)
+        self.client.change(1).set_topic({"topic": "x"})
+        with self.assertRaises(requests.HTTPError):
+            self.client.change(99).detail()
+
+        with ThreadPoolExecutor(8) as executor:
+            details = list(executor.map(lambda n: self.client.change(n).detail(), range(40)))
+        self.assertEqual([d._number for d in details], list(range(40)))
+        self.assertEqual(set(self.client.session.http_versions), {self.http_version})
+
+    def testCache(self):
+        client = GerritClient(self.gerrit.url, verify=False, transport=self.transport, cache_expire=0)
+        before = self.gerrit.count("/changes/2/detail")
+        client.change(2).detail()
+        self.assertEqual(client.change(2).detail()._number, 2)
+        # the second request is revalidated with the ETag of the first one
+        self.assertEqual(self.gerrit.count("/changes/2/detail") - before, 2)
+
+    def testDownload(self):
+        revision = self.client.change(1).current_revision()
+        sha = self.gerrit.revision_sha(1, 2)
+        file = revision.file("img/logo.png")
+        out = io.BytesIO()
+        self.assertEqual(file.download(stream=True).save(out), 1024)
+        self.assertEqual(out.getvalue(), file.download().content)
+
+        # a broken connection is resumed with a range request
+        archive = self.gerrit.patch(1, sha) * 100
+        self.gerrit.cut_after = 100000
+        path = os.path.join(self.dir, "change.tgz")
+        self.assertEqual(revision.archive(format="tgz", stream=True).save(path), len(archive))
+
+    def testThrottling(self):
+        self.gerrit.throttle = 2
+        self.assertEqual(self.client.change(3).detail()._number, 3)
+        self.assertEqual(self.client.adapter.throttled, 2)
+        self.gerrit.throttle, self.gerrit.retry_after = 1, "3600"
+        with self.assertRaises(requests.HTTPError):
+            self.client.change(4).detail()
+
+    def testMetrics(self):
+        client = GerritClient(self.gerrit.url, verify=False, transport=self.transport, metrics=True, cache=False)
+        client.change(5).detail()
+        stats = client.metrics.endpoints["/a/changes/{}/detail"]
+        self.assertEqual(stats.calls, 1)
+        self.assertGreater(stats.bytes_in, 0)
+
+    def testErrors(self):
+        with self.assertRaises(ValueError):
+            GerritClient(self.gerrit.url, transport="carrier-pigeon")
+        with self.assertRaises(ValueError):
+            GerritClient(self.gerrit.url, transport=self.transport, adapter=requests.adapters.HTTPAdapter())
+        with self.assertRaises(requests.ConnectionError):
+            GerritClient("https://127.0.0.1:9", transport=self.transport).change(1).detail()
+
+    @unittest.skipIf(installed("h2"), "h2 is installed")
+    def testHttp2NeedsH2(self):
+        # httpx itself would silently send HTTP/1.1 requests
+        with self.assertRaises(ImportError):
+            GerritClient(self.gerrit.url, transport="http2")
+
+@unittest.skipUnless(installed("h2"), "h2 is needed by the http2 transport")
+class TestHttp2Transport(TestHttpxTransport):
+    # the stand-in speaks HTTP/2 to the clients asking for it
+    transport = "http2"
+    http_version = "HTTP/2"
+
+    def testMultiplexing(self):
+        client = GerritClient(self.gerrit.url, verify=False, transport="http2", cache=False, coalesce=False, pool_maxsize=16)
+        client.change(0).detail()
+        connections = self.gerrit.connections
+        self.gerrit.latency = 0.05
+        try:
+            with ThreadPoolExecutor(16) as executor:
+                details = list(executor.map(lambda n: client.change(n).detail(), range(32)))
+        finally:
+            self.gerrit.latency = 0
+        self.assertEqual([d._number for d in details], list(range(32)))
+        # every request in flight went over the connection of the first one
+        self.assertEqual(self.gerrit.connections, connections)
+        self.assertEqual(client.session.http_versions, {"HTTP/2": 33})
+
+    def testHttp1Clients(self):
+        # the default transport does not ask for HTTP/2
+        client = GerritClient(self.gerrit.url, verify=False)
+        self.assertEqual(client.change(1).detail()._number, 1)
+
+if __name__ == '__main__':
+    unittest.main()